@@ -0,0 +1,66 @@
+"""Benchmark the allocation solvers on a synthetic customers x offers propensity matrix.
+
+Usage: python scripts/benchmark_allocation.py [--customers 1000000] [--budget-share 0.3]
+Offer terms come from app.yaml; capacities are rescaled to the same share of customers as
+configured for the raw file. Runs greedy and lagrangian with and without a budget
+(budget = budget_share x the cost of the unbudgeted greedy plan). Writes
+artifacts/metrics/allocation_benchmark.json.
+"""
+import argparse
+import json
+
+import numpy as np
+
+from src.serving.allocation import allocate, get_allocation_config, summary
+from src.utils.paths import get_metrics_dir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--budget-share", type=float, default=0.3)
+    parser.add_argument(
+        "--reference-customers",
+        type=int,
+        default=5000,
+        help="customers the configured capacities are for",
+    )
+    args = parser.parse_args()
+
+    cfg = dict(get_allocation_config())
+    scale = args.customers / args.reference_customers
+    cfg["offers"] = {
+        o: {**t, "capacity": None if t.get("capacity") is None else int(t["capacity"] * scale)}
+        for o, t in cfg["offers"].items()
+    }
+    offer_ids = list(cfg["offers"])
+    rng = np.random.default_rng(0)
+    # correlated per-offer propensities: a shared customer factor plus offer-specific noise
+    base = rng.beta(1.2, 8.0, (args.customers, 1))
+    propensity = np.clip(
+        base * rng.lognormal(0.0, 0.5, (args.customers, len(offer_ids))), 0, 1
+    ).astype(np.float32)
+
+    runs = {}
+    plan_cost = None
+    for budget_name in ("unbudgeted", "budgeted"):
+        budget = None if budget_name == "unbudgeted" else args.budget_share * plan_cost
+        for method in ("greedy", "lagrangian"):
+            res = summary(allocate(propensity, offer_ids, method=method, budget=budget, cfg=cfg))
+            plan_cost = plan_cost if plan_cost is not None else res["cost"]
+            runs[f"{budget_name}_{method}"] = {"budget": budget, **res}
+            print(
+                f"{budget_name:>10} {method:>10}: objective {res['objective']:.0f}  "
+                f"bound {res.get('upper_bound') or float('nan'):.0f}  "
+                f"gap {res['gap'] if res['gap'] is not None else float('nan'):.4%}  "
+                f"{res['solve_s']:.2f}s"
+            )
+    result = {"customers": args.customers, "offers": offer_ids, "runs": runs}
+    path = get_metrics_dir() / "allocation_benchmark.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"Benchmark saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
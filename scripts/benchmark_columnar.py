@@ -0,0 +1,89 @@
+"""Benchmark predict_batch on a Parquet batch: pandas DataFrame input vs Arrow columnar input.
+
+Usage: python scripts/benchmark_columnar.py [--rows 1000000]
+Each mode runs in its own process so peak RSS is comparable. Writes
+artifacts/metrics/columnar_benchmark.json.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from src.pipelines.features import get_feature_columns
+from src.pipelines.ingest import get_raw_csv_path
+from src.utils.paths import get_metrics_dir, get_project_root
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_mode(mode: str, path: str) -> dict:
+    """Read the Parquet file and score it; runs in a child process."""
+    import pyarrow.parquet as pq
+
+    from src.serving.predict import load_model, predict_batch
+
+    load_model()
+    _, cat_cols = get_feature_columns()
+    predict_batch(pq.read_table(path).slice(0, 100).to_pandas(), log=False)  # warm up
+    base_rss = _rss_mb()
+    t0 = time.perf_counter()
+    if mode == "pandas":
+        scores = predict_batch(pq.read_table(path).to_pandas(), log=False)
+    else:
+        scores = predict_batch(pq.read_table(path, read_dictionary=cat_cols), log=False)
+    elapsed = time.perf_counter() - t0
+    return {
+        "seconds": elapsed,
+        "us_per_row": elapsed / len(scores) * 1e6,
+        "peak_rss_mb": _rss_mb(),
+        "peak_rss_over_loaded_mb": _rss_mb() - base_rss,
+        "score_sum": float(scores.sum()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, default=1_000_000, help="batch size (resampled from raw data)"
+    )
+    parser.add_argument("--mode", choices=["pandas", "arrow"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(_run_mode(args.mode, args.path)))
+        return
+
+    raw = pd.read_csv(get_raw_csv_path(), sep=";")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "batch.parquet")
+        raw.sample(n=args.rows, replace=True, random_state=0).to_parquet(path, index=False)
+        results = {}
+        for mode in ("pandas", "arrow"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--path", path],
+                check=True, capture_output=True, text=True, cwd=get_project_root(),
+            )
+            results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+    result = {
+        "rows": args.rows,
+        **results,
+        "speedup": results["pandas"]["seconds"] / results["arrow"]["seconds"],
+        "score_sum_diff": abs(results["pandas"]["score_sum"] - results["arrow"]["score_sum"]),
+    }
+    path = get_metrics_dir() / "columnar_benchmark.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(json.dumps(result, indent=2))
+    print(f"Benchmark saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Benchmark categorical encodings on high-cardinality columns: width, fit time, size, AUC.
+
+Usage: python scripts/benchmark_encoding.py [--rows 20000] [--cardinality 200 2000 20000]
+Raw rows are resampled and given three synthetic high-cardinality columns (branch,
+product_code, postcode) whose Zipf-distributed levels carry some target signal. For each
+cardinality, one-hot and the bounded encoder (hash, count, target) are compared on
+feature width, preprocessor fit time, model fit time, transform time per row, pickled
+preprocessor + model size and holdout AUC. Gradient boosting is skipped on matrices
+wider than --gb-max-width. Writes artifacts/metrics/encoding_benchmark.json.
+"""
+import argparse
+import json
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from src.pipelines.features import (
+    fit_transform_preprocessor,
+    get_encoding_config,
+    get_feature_columns,
+)
+from src.pipelines.ingest import get_raw_csv_path
+from src.utils.config import get_model_config
+from src.utils.paths import get_metrics_dir
+
+HIGH_CARDINALITY = {"branch": 0.05, "product_code": 0.2, "postcode": 1.0}  # share of --cardinality
+
+
+def _with_high_cardinality(
+    df: pd.DataFrame, y: np.ndarray, cardinality: int, rs: np.random.RandomState
+) -> pd.DataFrame:
+    """Add Zipf-distributed columns whose levels lean towards one class or the other."""
+    df = df.copy()
+    for col, share in HIGH_CARDINALITY.items():
+        n_levels = max(int(cardinality * share), 2)
+        base = 1.0 / np.arange(1, n_levels + 1) ** 1.1
+        effect = rs.normal(0.0, 1.0, n_levels)
+        values = np.empty(len(df), dtype=object)
+        for label, sign in ((1, 1.0), (0, -1.0)):
+            rows = np.flatnonzero(y == label)
+            p = base * np.exp(0.5 * sign * effect)
+            values[rows] = np.char.add(
+                f"{col[:2]}", rs.choice(n_levels, len(rows), p=p / p.sum()).astype(str)
+            )
+        df[col] = values
+    return df
+
+
+def _run(name: str, encoding: dict, train: pd.DataFrame, test: pd.DataFrame, y_train: np.ndarray,
+         y_test: np.ndarray, num_cols: list, cat_cols: list, gb_max_width: int) -> dict:
+    t0 = time.perf_counter()
+    preprocessor, names, X_train = fit_transform_preprocessor(
+        train, num_cols, cat_cols, y=y_train, encoding=encoding
+    )
+    fit_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    X_test = preprocessor.transform(test)
+    transform_us = (time.perf_counter() - t0) / len(test) * 1e6
+    params = get_model_config().get("models", {})
+    out = {
+        "encoding": name,
+        "width": len(names),
+        "preprocessor_fit_s": fit_s,
+        "transform_us_per_row": transform_us,
+        "matrix_mb": X_train.nbytes / 2**20,
+        "preprocessor_kb": len(pickle.dumps(preprocessor)) / 1024,
+    }
+    models = {"logistic_regression": LogisticRegression(**params.get("logistic_regression", {}))}
+    if len(names) <= gb_max_width:
+        models["gradient_boosting"] = GradientBoostingClassifier(
+            **params.get("gradient_boosting", {})
+        )
+    for model_name, model in models.items():
+        t0 = time.perf_counter()
+        model.fit(X_train, y_train)
+        out[model_name] = {
+            "fit_s": time.perf_counter() - t0,
+            "model_kb": len(pickle.dumps(model)) / 1024,
+            "roc_auc": float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])),
+        }
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000, help="rows (resampled from raw data)")
+    parser.add_argument("--cardinality", type=int, nargs="+", default=[200, 2000, 20000],
+                        help="distinct postcodes (branch and product_code scale with it)")
+    parser.add_argument("--gb-max-width", type=int, default=500)
+    args = parser.parse_args()
+
+    cfg = get_model_config()
+    rs = np.random.RandomState(cfg.get("random_state", 42))
+    raw = pd.read_csv(get_raw_csv_path(), sep=";").sample(
+        n=args.rows, replace=True, random_state=rs
+    )
+    raw = raw.reset_index(drop=True)
+    y = (raw[cfg["target"]].astype(str).str.lower() == "yes").astype(int).to_numpy()
+    num_cols, cat_cols = get_feature_columns()
+    cat_cols = cat_cols + list(HIGH_CARDINALITY)
+    bounded = {**get_encoding_config(), "mode": "bounded", "columns": {}}
+    encodings = {
+        "onehot": {"mode": "onehot"},
+        "bounded_hash": {**bounded, "high_cardinality": "hash"},
+        "bounded_count": {**bounded, "high_cardinality": "count"},
+        "bounded_target": {**bounded, "high_cardinality": "target"},
+    }
+
+    results = []
+    for cardinality in args.cardinality:
+        df = _with_high_cardinality(raw, y, cardinality, rs)
+        train, test, y_train, y_test = train_test_split(
+            df,
+            y,
+            train_size=cfg.get("train_split_ratio", 0.8),
+            random_state=cfg.get("random_state", 42),
+            stratify=y,
+        )
+        for name, encoding in encodings.items():
+            r = {"cardinality": cardinality, **_run(name, encoding, train, test, y_train, y_test,
+                                                    num_cols, cat_cols, args.gb_max_width)}
+            results.append(r)
+            gb = r.get("gradient_boosting", {})
+            print(
+                f"cardinality {cardinality:>6} {name:<15} width {r['width']:>6}  "
+                f"fit {r['preprocessor_fit_s']:.2f}s  "
+                f"LR AUC {r['logistic_regression']['roc_auc']:.4f} "
+                f"({r['logistic_regression']['fit_s']:.1f}s)  "
+                f"GB AUC {gb.get('roc_auc', float('nan')):.4f} "
+                f"({gb.get('fit_s', float('nan')):.1f}s)"
+            )
+
+    path = get_metrics_dir() / "encoding_benchmark.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"rows": args.rows, "results": results}, indent=2), encoding="utf-8")
+    print(f"Benchmark saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark lookalike index build and query throughput (exact vs ivf) on the customer base.
+
+Usage: python scripts/benchmark_lookalike.py [--rows 200000] [--seeds 2000] [--k 50]
+Writes artifacts/metrics/lookalike_benchmark.json.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.pipelines.ingest import get_raw_csv_path
+from src.serving.lookalike import build_index, embed, search
+from src.utils.paths import get_metrics_dir
+
+
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, default=200_000, help="customer base size (resampled from raw data)"
+    )
+    parser.add_argument("--seeds", type=int, default=2_000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--n-probe", type=int, default=None)
+    parser.add_argument("--embedding", choices=["features", "leaves"], default="features")
+    args = parser.parse_args()
+
+    raw = pd.read_csv(get_raw_csv_path(), sep=";")
+    base = raw.sample(n=args.rows, replace=True, random_state=0).reset_index(drop=True)
+    vectors, embed_s = _timed(embed, base, args.embedding)
+    # jitter so resampled duplicates are distinct points
+    vectors += np.random.RandomState(1).normal(0, 0.01, vectors.shape).astype(np.float32)
+    seeds = vectors[np.random.RandomState(2).choice(len(vectors), args.seeds, replace=False)]
+
+    exact, exact_build_s = _timed(build_index, vectors, method="exact")
+    (exact_d, _), exact_query_s = _timed(search, exact, seeds, args.k)
+    ivf, ivf_build_s = _timed(build_index, vectors, method="ivf")
+    (ivf_d, _), ivf_query_s = _timed(search, ivf, seeds, args.k, n_probe=args.n_probe)
+    # tie-robust recall: share of ivf neighbours within the exact k-th distance
+    recall = float(np.mean(ivf_d <= exact_d[:, -1:] * (1 + 1e-5) + 1e-6))
+
+    result = {
+        "rows": args.rows,
+        "dims": int(vectors.shape[1]),
+        "embedding": args.embedding,
+        "seeds": args.seeds,
+        "k": args.k,
+        "index_mb": float(vectors.nbytes / (1024 * 1024)),
+        "embed_s": embed_s,
+        "exact": {
+            "build_s": exact_build_s,
+            "query_s": exact_query_s,
+            "queries_per_s": args.seeds / exact_query_s,
+        },
+        "ivf": {
+            "n_lists": int(len(ivf["centroids"])),
+            "build_s": ivf_build_s,
+            "query_s": ivf_query_s,
+            "queries_per_s": args.seeds / ivf_query_s,
+            "recall_at_k": recall,
+        },
+    }
+    path = get_metrics_dir() / "lookalike_benchmark.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(json.dumps(result, indent=2))
+    print(f"Benchmark saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark the pre-forking server: throughput and memory vs worker count.
+
+Usage: python scripts/benchmark_serving.py [--workers 1 2 4] [--seconds 10] [--batch 100]
+For each worker count, starts src.serving.server, drives it with one client process
+per worker (each POSTs --batch rows per request, back to back), and measures
+rows/s. Memory is the total PSS of the supervisor and its workers (shared pages
+counted once), compared with N x the RSS of a single server process (N independent
+containers). Writes artifacts/metrics/serving_benchmark.json.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+
+from src.pipelines.ingest import get_raw_csv_path
+from src.utils.paths import get_metrics_dir, get_project_root
+
+
+def _pss_mb(pid: int) -> float:
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        if line.startswith("Pss:"):
+            return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _rss_mb(pid: int) -> float:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _children(pid: int) -> list:
+    path = Path(f"/proc/{pid}/task/{pid}/children")
+    return [int(p) for p in path.read_text().split()] if path.exists() else []
+
+
+def _client(url: str, body: bytes, seconds: float, out: "mp.Queue") -> None:
+    n = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        urllib.request.urlopen(urllib.request.Request(url, data=body), timeout=30).read()
+        n += 1
+    out.put(n)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(base: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{base}/health", timeout=5).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base} did not become healthy within {timeout:.0f}s")
+
+
+def _run(workers: int, body: bytes, batch: int, seconds: float) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "src.serving.server",
+            "--workers",
+            str(workers),
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+        ],
+        stdout=subprocess.DEVNULL,
+        cwd=get_project_root(),
+    )
+    try:
+        _wait_ready(base)
+        out: "mp.Queue" = mp.Queue()
+        clients = [
+            mp.Process(target=_client, args=(f"{base}/predict", body, seconds, out))
+            for _ in range(workers)
+        ]
+        t0 = time.perf_counter()
+        for c in clients:
+            c.start()
+        requests = sum(out.get() for _ in clients)
+        elapsed = time.perf_counter() - t0
+        for c in clients:
+            c.join()
+        pids = [proc.pid] + _children(proc.pid)
+        return {
+            "workers": workers,
+            "rows_per_s": requests * batch / elapsed,
+            "requests": requests,
+            "total_pss_mb": sum(_pss_mb(p) for p in pids),
+            "total_rss_mb": sum(_rss_mb(p) for p in pids),
+            "single_process_rss_mb": _rss_mb(pids[-1]),
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch", type=int, default=100, help="rows per request")
+    args = parser.parse_args()
+
+    raw = pd.read_csv(get_raw_csv_path(), sep=";").drop(columns=["y"], errors="ignore")
+    body = raw.sample(n=args.batch, replace=True, random_state=0).to_json(orient="records").encode()
+    runs = [_run(n, body, args.batch, args.seconds) for n in args.workers]
+    for r in runs:
+        r["n_containers_rss_mb"] = r["workers"] * runs[0]["single_process_rss_mb"]
+        print(
+            f"{r['workers']} workers: {r['rows_per_s']:.0f} rows/s, PSS {r['total_pss_mb']:.0f} MB "
+            f"(vs {r['n_containers_rss_mb']:.0f} MB as separate processes)"
+        )
+    result = {"cpus": mp.cpu_count(), "batch_rows": args.batch, "runs": runs}
+    path = get_metrics_dir() / "serving_benchmark.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"Benchmark saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,40 @@
-"""Download UCI Bank Marketing dataset into data/raw/."""
+"""Download UCI Bank Marketing dataset into data/raw/.
+
+--synthetic N writes N synthetic rows (src.pipelines.synthetic, bundled spec) to
+data/raw/synthetic.csv instead, for offline or scale runs; the real extract is left untouched.
+"""
+import argparse
 import zipfile
-from pathlib import Path
 
 import requests
 
-from src.utils.paths import get_raw_data_dir, get_project_root
+from src.utils.paths import get_project_root, get_raw_data_dir
 
 # UCI ML Repository
 UCI_URL = "https://archive.ics.uci.edu/static/public/222/bank+marketing.zip"
 FILENAME_CSV = "bank-additional-full.csv"
+SYNTHETIC_CSV = "synthetic.csv"  # src.pipelines.synthetic's default output
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Fetch the raw dataset into data/raw/")
+    parser.add_argument(
+        "--synthetic", type=int, metavar="ROWS", help="generate ROWS synthetic rows instead"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
     root = get_project_root()
     raw_dir = get_raw_data_dir()
     raw_dir.mkdir(parents=True, exist_ok=True)
+    if args.synthetic:
+        from src.pipelines.synthetic import default_spec, write_dataset
+
+        csv_path = write_dataset(
+            default_spec(), args.synthetic, raw_dir / SYNTHETIC_CSV, seed=args.seed
+        )
+        print(f"Synthetic data ({args.synthetic} rows) saved to {csv_path}")
+        return
     zip_path = root / "bank-marketing.zip"
 
     print("Downloading UCI Bank Marketing dataset...")
@@ -0,0 +1,125 @@
+"""Bulk scoring page: upload a lead list, score in chunks, rank offers, download results."""
+import gzip
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from src.serving.batch import iter_input_chunks, missing_required_columns, score_stream
+from src.serving.predict import load_model
+from src.utils.config import get_app_config
+
+st.set_page_config(page_title="Bulk scoring", page_icon="📊", layout="wide")
+
+app_cfg = get_app_config().get("app", {})
+RESULTS_ROOT = Path(tempfile.gettempdir()) / "offer-ranking-bulk"
+
+
+def _sweep_stale_results() -> None:
+    """Remove other sessions' result directories idle past bulk_result_ttl_h.
+
+    Streamlit has no session-end hook, so abandoned sessions are swept on every page run.
+    """
+    if not RESULTS_ROOT.exists():
+        return
+    ttl_s = app_cfg.get("bulk_result_ttl_h", 6) * 3600
+    own = st.session_state.get("bulk_dir")
+    for d in RESULTS_ROOT.iterdir():
+        if str(d) != own and time.time() - d.stat().st_mtime > ttl_s:
+            shutil.rmtree(d, ignore_errors=True)
+
+
+def _session_dir() -> Path:
+    """This session's result directory (created on first use)."""
+    own = st.session_state.get("bulk_dir")
+    if own is None or not Path(own).exists():
+        RESULTS_ROOT.mkdir(parents=True, exist_ok=True)
+        own = tempfile.mkdtemp(prefix="session-", dir=RESULTS_ROOT)
+        st.session_state["bulk_dir"] = own
+    return Path(own)
+
+
+_sweep_stale_results()
+st.title("Bulk scoring")
+st.markdown(
+    "Upload a CSV (`,` or `;` separated) or Parquet lead list with UCI Bank Marketing columns. "
+    "Rows are validated and scored in chunks; results are written server-side and downloaded "
+    "as gzip CSV."
+)
+
+uploaded = st.file_uploader("Lead list", type=["csv", "parquet"])
+chunk_rows = st.select_slider(
+    "Rows per chunk", options=[10_000, 50_000, 100_000, 250_000], value=100_000
+)
+
+if uploaded is not None and st.button("Score file"):
+    try:
+        load_model()  # fail fast before reading the upload; cached in the server process
+        first = next(iter_input_chunks(uploaded, chunk_rows=1_000))
+        missing = missing_required_columns(list(first.columns))
+        if missing:
+            st.error(f"Missing required columns: {', '.join(missing)}")
+            st.stop()
+        uploaded.seek(0)
+        total = None
+        if uploaded.name.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            total = pq.ParquetFile(uploaded).metadata.num_rows
+            uploaded.seek(0)
+        bar = st.progress(0.0, text="Scoring...")
+
+        def _progress(rows: int) -> None:
+            frac = rows / total if total else uploaded.tell() / max(uploaded.size, 1)
+            bar.progress(min(1.0, frac), text=f"Scored {rows:,} rows")
+
+        session_dir = _session_dir()
+        for old in session_dir.glob("*.csv.gz"):  # one result per session
+            old.unlink(missing_ok=True)
+        out_path = session_dir / (Path(uploaded.name).stem + "_scored.csv.gz")
+        with gzip.open(out_path, "wb", compresslevel=3) as sink:
+            summary = score_stream(
+                iter_input_chunks(uploaded, chunk_rows=chunk_rows), sink, progress=_progress
+            )
+        bar.progress(1.0, text=f"Scored {summary['rows']:,} rows")
+        st.session_state["bulk_result"] = {
+            "path": str(out_path),
+            "name": uploaded.name,
+            "summary": summary,
+        }
+    except FileNotFoundError as e:
+        st.error(f"Model not found. Train first: `make train` — {e}")
+
+result = st.session_state.get("bulk_result")
+if result and Path(result["path"]).exists():
+    summary = result["summary"]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Rows", f"{summary['rows']:,}")
+    c2.metric("Scored", f"{summary['valid_rows']:,}")
+    c3.metric("Invalid", f"{summary['rows'] - summary['valid_rows']:,}")
+    if summary["errors"]:
+        st.caption("Invalid values by column")
+        st.json(summary["errors"])
+    if summary["top_offer_counts"]:
+        st.caption("Top-ranked offer distribution")
+        st.bar_chart(summary["top_offer_counts"])
+    st.caption("Preview (first 20 rows)")
+    st.dataframe(pd.read_csv(result["path"], nrows=20), use_container_width=True)
+    size_mb = Path(result["path"]).stat().st_size / 2**20
+    max_mb = app_cfg.get("bulk_download_max_mb", 200)
+    if size_mb <= max_mb:
+        # Streamlit serves download data from memory; the file is read whole, not streamed
+        st.download_button(
+            "Download scored & ranked CSV",
+            data=Path(result["path"]).read_bytes(),
+            file_name=Path(result["name"]).stem + "_scored.csv.gz",
+            mime="application/gzip",
+        )
+    else:
+        st.warning(
+            f"The scored file is {size_mb:,.0f} MB, above the {max_mb} MB in-browser download "
+            f"limit (downloads are held in memory). It is on the server at `{result['path']}`; "
+            "for files this size use the batch job (`python -m src.pipelines.batch_score`)."
+        )
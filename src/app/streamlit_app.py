@@ -1,9 +1,17 @@
 """Streamlit demo: customer profile inputs, propensity score, ranked offers."""
-import pandas as pd
 import streamlit as st
 
-from src.app.ui_components import render_offer_cards, render_propensity
-from src.serving.predict import predict
+from src.app.ui_components import (
+    render_contributions,
+    render_heatmap,
+    render_offer_cards,
+    render_propensity,
+    render_response_curve,
+)
+from src.serving.explain import explain
+from src.serving.predict import predict, predict_offers
+from src.serving.ranking import rank_offers
+from src.serving.sensitivity import get_sweep_features, sensitivity_sweep
 from src.utils.config import get_app_config
 
 st.set_page_config(
@@ -17,7 +25,9 @@ app_cfg = cfg.get("app", {})
 offers = cfg.get("offers", [])
 
 st.title(app_cfg.get("title", "Financial Offer Propensity & Ranking"))
-st.markdown("Simulate a customer profile and see predicted acceptance propensity and ranked offers.")
+st.markdown(
+    "Simulate a customer profile and see predicted acceptance propensity and ranked offers."
+)
 
 # Defaults matching UCI Bank Marketing schema
 defaults = {
@@ -44,24 +54,50 @@ with st.sidebar:
     age = st.number_input("Age", min_value=0, max_value=120, value=defaults["age"])
     job = st.selectbox(
         "Job",
-        ["admin.", "blue-collar", "entrepreneur", "housemaid", "management", "retired", "self-employed", "services", "student", "technician", "unemployed", "unknown"],
+        [
+            "admin.",
+            "blue-collar",
+            "entrepreneur",
+            "housemaid",
+            "management",
+            "retired",
+            "self-employed",
+            "services",
+            "student",
+            "technician",
+            "unemployed",
+            "unknown",
+        ],
         index=0,
     )
     marital = st.selectbox("Marital", ["divorced", "married", "single", "unknown"], index=1)
     education = st.selectbox(
         "Education",
-        ["basic.4y", "basic.6y", "basic.9y", "high.school", "illiterate", "professional.course", "university.degree", "unknown"],
+        [
+            "basic.4y",
+            "basic.6y",
+            "basic.9y",
+            "high.school",
+            "illiterate",
+            "professional.course",
+            "university.degree",
+            "unknown",
+        ],
         index=6,
     )
     balance = st.number_input("Balance", value=defaults["balance"], step=100)
     housing = st.radio("Housing loan", ["yes", "no"], index=1 if defaults["housing"] == "no" else 0)
     loan = st.radio("Personal loan", ["yes", "no"], index=1)
     contact = st.selectbox("Contact", ["cellular", "telephone", "unknown"], index=0)
-    duration = st.number_input("Last contact duration (sec)", min_value=0, value=defaults["duration"])
+    duration = st.number_input(
+        "Last contact duration (sec)", min_value=0, value=defaults["duration"]
+    )
     campaign = st.number_input("Contacts this campaign", min_value=0, value=defaults["campaign"])
     pdays = st.number_input("Days since last contact (-1 = none)", value=defaults["pdays"])
     previous = st.number_input("Contacts before campaign", min_value=0, value=defaults["previous"])
-    poutcome = st.selectbox("Previous outcome", ["failure", "nonexistent", "success", "unknown"], index=1)
+    poutcome = st.selectbox(
+        "Previous outcome", ["failure", "nonexistent", "success", "unknown"], index=1
+    )
     day = 15
     month = "may"
     default = "no"
@@ -89,24 +125,50 @@ if st.button("Get propensity & ranking"):
     try:
         score = predict(features)
         render_propensity(score)
-        # Synthetic ranking: use propensity with small offsets per offer for demo
-        ranked = []
-        for i, off in enumerate(offers):
-            # Slight variation so ranking is visible (term_deposit = base score)
-            delta = 0.02 * (i - 2) if i < len(offers) else 0
-            ranked.append({
-                "rank": i + 1,
-                "offer_id": off.get("id", ""),
-                "label": off.get("label", ""),
-                "description": off.get("description", ""),
-                "score": min(1.0, max(0.0, score + delta)),
-            })
-        ranked.sort(key=lambda x: x["score"], reverse=True)
-        for i, r in enumerate(ranked, 1):
-            r["rank"] = i
+        offer_scores = predict_offers(features)
+        ranked = rank_offers(offer_scores.iloc[0].to_numpy(), offers, list(offer_scores.columns))
         st.subheader("Ranked offers")
         render_offer_cards(ranked)
+        if ranked:
+            st.subheader(f"Why {ranked[0].get('label', ranked[0]['offer_id'])} ranks first")
+            try:
+                render_contributions(explain(features, offer_id=ranked[0]["offer_id"]))
+            except ValueError as e:
+                st.caption(f"Explanations unavailable: {e}")
     except FileNotFoundError as e:
         st.error(f"Model not found. Train first: `make train` — {e}")
     except Exception as e:
         st.exception(e)
+
+with st.expander("What-if sensitivity"):
+    st.caption(
+        "Vary one or two inputs around the current profile; all points are scored in one batch."
+    )
+    sweep_features = list(get_sweep_features())
+    c1, c2, c3 = st.columns(3)
+    x_feature = c1.selectbox("Vary", sweep_features, index=0)
+    y_options = ["(none)"] + [f for f in sweep_features if f != x_feature]
+    y_choice = c2.selectbox("Against", y_options, index=0)
+    n_points = c3.slider("Points per axis", min_value=5, max_value=100, value=40)
+    if st.button("Run sweep"):
+        try:
+            y_feature = None if y_choice == "(none)" else y_choice
+            grid = sensitivity_sweep(features, x_feature, y_feature, n_points=n_points)
+            if y_feature is None:
+                render_response_curve(grid, x_feature)
+            else:
+                render_heatmap(grid, x_feature, y_feature)
+            st.caption(f"{len(grid):,} profiles scored")
+        except FileNotFoundError as e:
+            st.error(f"Model not found. Train first: `make train` — {e}")
+
+with st.expander("Drift history"):
+    from src.monitoring.metrics_store import rollup, top_drifting
+
+    history = rollup(metric="feature_psi", freq="D", agg="max")
+    if history.empty:
+        st.caption("No monitoring history yet. Run `make drift` to record a run.")
+    else:
+        st.caption("Daily max feature PSI across recorded drift runs")
+        st.line_chart(history)
+        st.dataframe(top_drifting(n=10, include_segments=True), use_container_width=True)
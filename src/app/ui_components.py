@@ -1,4 +1,5 @@
 """Shared UI components for Streamlit app."""
+import pandas as pd
 import streamlit as st
 
 
@@ -23,3 +24,57 @@ def render_offer_cards(ranked: list[dict]) -> None:
                 st.caption(item["description"])
             st.caption(f"Score: {item.get('score', 0):.3f}")
             st.divider()
+
+
+def render_contributions(items: list[dict]) -> None:
+    """Bar chart of per-field contributions ({feature, value, contribution}), largest first."""
+    import altair as alt
+
+    data = pd.DataFrame(items)
+    data["label"] = [f"{f} = {v}" for f, v in zip(data["feature"], data["value"])]
+    data["direction"] = ["raises" if c > 0 else "lowers" for c in data["contribution"]]
+    chart = (
+        alt.Chart(data)
+        .mark_bar()
+        .encode(
+            x=alt.X("contribution:Q", title="Contribution (log-odds)"),
+            y=alt.Y("label:N", sort=None, title=None),
+            color=alt.Color(
+                "direction:N",
+                scale=alt.Scale(domain=["raises", "lowers"], range=["#2ca02c", "#d62728"]),
+            ),
+            tooltip=["feature", alt.Tooltip("contribution:Q", format=".3f")],
+        )
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+
+def render_response_curve(grid: pd.DataFrame, feature: str) -> None:
+    """Line chart of score vs one swept feature (bar chart for categorical features)."""
+    data = grid[[feature, "score"]].set_index(feature)
+    if pd.api.types.is_numeric_dtype(grid[feature]):
+        st.line_chart(data)
+    else:
+        st.bar_chart(data)
+
+
+def render_heatmap(grid: pd.DataFrame, x_feature: str, y_feature: str) -> None:
+    """Heatmap of score over a 2-D grid of swept features."""
+    import altair as alt
+
+    def _encoding(feature: str, channel):
+        # Numeric sweeps are evenly spaced, so ordinal bins give one cell per grid point
+        kind = "O" if pd.api.types.is_numeric_dtype(grid[feature]) else "N"
+        return channel(f"{feature}:{kind}", sort=None)
+
+    chart = (
+        alt.Chart(grid[[x_feature, y_feature, "score"]])
+        .mark_rect()
+        .encode(
+            x=_encoding(x_feature, alt.X),
+            y=_encoding(y_feature, alt.Y),
+            color=alt.Color("score:Q", scale=alt.Scale(scheme="viridis")),
+            tooltip=[x_feature, y_feature, alt.Tooltip("score:Q", format=".3f")],
+        )
+    )
+    st.altair_chart(chart, use_container_width=True)
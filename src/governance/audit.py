@@ -1,21 +1,295 @@
-"""Simple append-only audit log for 'who ran what' demo."""
+"""Append-only audit log: buffered writes, rotation, compressed segments and a block index.
+
+Entries are buffered and flushed in groups (one write + fsync per flush). Each flush
+is one block of the active segment (audit_log.jsonl) and gets an index record with
+its byte range, timestamp range and action counts. When the active segment exceeds
+max_bytes or max_age_s it is rotated into audit/ with every block stored as its own
+gzip member, so query_audit() can seek to just the blocks whose timestamp range and
+actions match instead of scanning every segment.
+
+A background thread flushes buffered entries after flush_interval_s and rotates an
+aged segment, so a quiet long-running process does not hold entries until its next
+write. Several processes (e.g. the pre-forked server workers) may share one log: each
+flush and rotation runs under an exclusive lock on audit_log.lock, so offsets in the
+index stay correct and a rotation never unlinks a file another process is writing.
+query_audit() reads the active segment under a shared lock on the same file.
+"""
+import atexit
+import gzip
 import json
 import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
 
-from src.utils.paths import get_artifacts_path
+from src.utils.config import get_app_config
+from src.utils.paths import artifacts_path_from_env
 
 
 def get_audit_log_path() -> Path:
-    return get_artifacts_path() / "audit_log.jsonl"
+    """artifacts/audit_log.jsonl (honours ARTIFACTS_DIR)."""
+    return artifacts_path_from_env() / "audit_log.jsonl"
+
+
+def _index_path(log_path: Path) -> Path:
+    return log_path.with_name(log_path.stem + ".idx.jsonl")
+
+
+def _lock_path(log_path: Path) -> Path:
+    return log_path.with_name(log_path.stem + ".lock")
+
+
+@contextmanager
+def _file_lock(log_path: Path, shared: bool = False) -> Iterator[None]:
+    """Lock on audit_log.lock, shared by every process using the log.
+
+    Writers (flush, rotation) take it exclusively; readers take it shared.
+    """
+    if fcntl is None:
+        yield
+        return
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(_lock_path(log_path), "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+class AuditWriter:
+    """Buffered, rotating writer for the audit log (thread-safe)."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        segments_dir: Optional[Path] = None,
+        flush_every: int = 100,
+        flush_interval_s: float = 1.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age_s: float = 24 * 3600,
+        fsync: bool = True,
+    ) -> None:
+        self.path = Path(path) if path else get_audit_log_path()
+        self.segments_dir = Path(segments_dir) if segments_dir else self.path.parent / "audit"
+        self.flush_every = flush_every
+        self.flush_interval_s = flush_interval_s
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.fsync = fsync
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        """Buffer one entry; flush when the group size or interval is reached."""
+        with self._lock:
+            self._buffer.append(entry)
+            if (
+                len(self._buffer) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval_s
+            ):
+                self._flush_locked()
+            if self._flusher is None and not self._stop.is_set():
+                self._flusher = threading.Thread(
+                    target=self._run_flusher, name="audit-flusher", daemon=True
+                )
+                self._flusher.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Stop the background flusher and flush what is buffered."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+
+    def rotate(self) -> Optional[Path]:
+        """Flush, then move the active segment into segments_dir compressed. Returns new segment."""
+        with self._lock:
+            self._flush_locked()
+            with _file_lock(self.path):
+                return self._rotate_locked()
+
+    def _run_flusher(self) -> None:
+        """Flush buffered entries older than flush_interval_s; rotate aged segments."""
+        while not self._stop.wait(min(self.flush_interval_s, self.max_age_s)):
+            with self._lock:
+                if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval_s:
+                    self._flush_locked()
+                elif (
+                    self.path.exists()
+                    and time.time() - self._read_segment_start() >= self.max_age_s
+                ):
+                    with _file_lock(self.path):
+                        self._rotate_locked()
+
+    def _read_segment_start(self) -> float:
+        idx = _index_path(self.path)
+        if idx.exists():
+            with open(idx, encoding="utf-8") as f:
+                first = f.readline()
+            if first:
+                return json.loads(first).get("created", time.time())
+        return time.time()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        entries, self._buffer = self._buffer, []
+        data = "".join(json.dumps(e) + "\n" for e in entries).encode("utf-8")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self.path):
+            self._append_locked(entries, data)
+
+    def _append_locked(self, entries: List[Dict[str, Any]], data: bytes) -> None:
+        """Append one block and its index record; caller holds the file lock."""
+        # Another process may have rotated the segment since our last flush
+        segment_started = self._read_segment_start()
+        with open(self.path, "ab") as f:
+            offset = os.fstat(f.fileno()).st_size
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        block = {
+            "offset": offset,
+            "length": len(data),
+            "n": len(entries),
+            "min_ts": min(e["timestamp"] for e in entries),
+            "max_ts": max(e["timestamp"] for e in entries),
+            "actions": _action_counts(entries),
+            "created": segment_started,
+        }
+        with open(_index_path(self.path), "a", encoding="utf-8") as f:
+            f.write(json.dumps(block) + "\n")
+        if offset + len(data) >= self.max_bytes or time.time() - segment_started >= self.max_age_s:
+            self._rotate_locked()
+
+    def _rotate_locked(self) -> Optional[Path]:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return None
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(tz=timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        seg_path = self.segments_dir / f"audit_log-{stamp}.jsonl.gz"
+        blocks = []
+        with open(self.path, "rb") as src, open(seg_path, "wb") as dst:
+            for block in _active_blocks(self.path):
+                src.seek(block["offset"])
+                member = gzip.compress(src.read(block["length"]))
+                blocks.append({**block, "offset": dst.tell(), "length": len(member)})
+                dst.write(member)
+            dst.flush()
+            os.fsync(dst.fileno())
+        seg_index = {
+            "segment": seg_path.name,
+            "n": sum(b["n"] or 0 for b in blocks),
+            "min_ts": min(b["min_ts"] for b in blocks),
+            "max_ts": max(b["max_ts"] for b in blocks),
+            "blocks": blocks,
+        }
+        tmp = seg_path.with_name(seg_path.name + ".idx.tmp")
+        tmp.write_text(json.dumps(seg_index), encoding="utf-8")
+        tmp.replace(seg_path.with_name(seg_path.name.replace(".jsonl.gz", ".idx.json")))
+        self.path.unlink()
+        _index_path(self.path).unlink(missing_ok=True)
+        return seg_path
+
+
+def _action_counts(entries: List[Dict[str, Any]]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for e in entries:
+        counts[e.get("action", "")] = counts.get(e.get("action", ""), 0) + 1
+    return counts
+
+
+def _active_blocks(path: Path) -> List[Dict[str, Any]]:
+    """Index records of the active segment, plus blocks covering any unindexed byte ranges."""
+    blocks = []
+    idx = _index_path(path)
+    if idx.exists():
+        with open(idx, encoding="utf-8") as f:
+            blocks = [json.loads(line) for line in f if line.strip()]
+    # Byte ranges written without an index (e.g. by an older writer) are always scanned
+    size = path.stat().st_size if path.exists() else 0
+    out, pos = [], 0
+    for b in sorted(blocks, key=lambda b: b["offset"]) + [{"offset": size, "length": 0}]:
+        if b["offset"] > pos:
+            out.append(
+                {
+                    "offset": pos,
+                    "length": b["offset"] - pos,
+                    "n": None,
+                    "min_ts": "",
+                    "max_ts": "~",
+                    "actions": None,
+                }
+            )
+        if b["length"]:
+            out.append(b)
+        pos = max(pos, b["offset"] + b["length"])
+    return out
+
+
+_writer: Optional[AuditWriter] = None
+_writer_lock = threading.Lock()
+
+
+def close_audit_writer() -> None:
+    """Flush and stop the process-wide writer, if any (registered at exit)."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+def _reset_after_fork() -> None:
+    """A forked child starts without the parent's writer: its lock and thread do not carry over."""
+    global _writer, _writer_lock
+    _writer, _writer_lock = None, threading.Lock()
+
+
+atexit.register(close_audit_writer)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_audit_writer() -> AuditWriter:
+    """Process-wide writer configured from app.yaml audit (flushed at exit)."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.path != get_audit_log_path():
+            if _writer is not None:
+                _writer.close()
+            cfg = get_app_config().get("audit", {})
+            _writer = AuditWriter(
+                flush_every=cfg.get("flush_every", 100),
+                flush_interval_s=cfg.get("flush_interval_s", 1.0),
+                max_bytes=cfg.get("max_segment_mb", 64) * 1024 * 1024,
+                max_age_s=cfg.get("max_segment_age_h", 24) * 3600,
+                fsync=cfg.get("fsync", True),
+            )
+        return _writer
 
 
 def log_action(action: str, outcome: str = "success", metadata: Optional[dict] = None) -> None:
     """Append one audit entry."""
-    path = get_audit_log_path()
-    path.parent.mkdir(parents=True, exist_ok=True)
     entry = {
         "timestamp": datetime.now(tz=timezone.utc).isoformat(),
         "action": action,
@@ -23,5 +297,88 @@ def log_action(action: str, outcome: str = "success", metadata: Optional[dict] =
         "user": os.environ.get("USER", os.environ.get("USERNAME", "unknown")),
         "metadata": metadata or {},
     }
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(entry) + "\n")
+    get_audit_writer().write(entry)
+
+
+def _iter_block_entries(data: bytes) -> Iterator[Dict[str, Any]]:
+    for line in data.decode("utf-8").splitlines():
+        if line.strip():
+            yield json.loads(line)
+
+
+def _block_matches(
+    block: Dict[str, Any], start: Optional[str], end: Optional[str], action: Optional[str]
+) -> bool:
+    if start and block["max_ts"] < start:
+        return False
+    if end and block["min_ts"] > end:
+        return False
+    if action and block.get("actions") is not None and action not in block["actions"]:
+        return False
+    return True
+
+
+def query_audit(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    action: Optional[str] = None,
+    limit: Optional[int] = None,
+    path: Optional[Path] = None,
+    segments_dir: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """Entries with start <= timestamp <= end (ISO strings) and matching action, oldest first.
+
+    Only blocks whose index range/actions can match are read; rotated blocks are
+    decompressed individually.
+    """
+    path = Path(path) if path else get_audit_log_path()
+    segments_dir = Path(segments_dir) if segments_dir else path.parent / "audit"
+    if _writer is not None and _writer.path == path:
+        _writer.flush()
+    out: List[Dict[str, Any]] = []
+    # Rotated segments never change, but writers append to and rotate away the active
+    # one: list segments and read the matching active blocks under the lock, so a
+    # concurrent rotation can neither hide entries nor return them twice.
+    segment_indexes: List[Path] = []
+    active: List[bytes] = []
+    if path.parent.exists():
+        with _file_lock(path, shared=True):
+            if segments_dir.exists():
+                segment_indexes = sorted(segments_dir.glob("audit_log-*.idx.json"))
+            if path.exists():
+                with open(path, "rb") as f:
+                    for block in _active_blocks(path):
+                        if _block_matches(block, start, end, action):
+                            f.seek(block["offset"])
+                            active.append(f.read(block["length"]))
+
+    def _collect(entries: Iterator[Dict[str, Any]]) -> bool:
+        for e in entries:
+            ts = e.get("timestamp", "")
+            if (
+                (start and ts < start)
+                or (end and ts > end)
+                or (action and e.get("action") != action)
+            ):
+                continue
+            out.append(e)
+            if limit is not None and len(out) >= limit:
+                return True
+        return False
+
+    for idx_path in segment_indexes:
+        seg_index = json.loads(idx_path.read_text(encoding="utf-8"))
+        if not _block_matches(seg_index, start, end, None):
+            continue
+        with open(segments_dir / seg_index["segment"], "rb") as f:
+            for block in seg_index["blocks"]:
+                if not _block_matches(block, start, end, action):
+                    continue
+                f.seek(block["offset"])
+                data = zlib.decompress(f.read(block["length"]), wbits=31)
+                if _collect(_iter_block_entries(data)):
+                    return out
+    for data in active:
+        if _collect(_iter_block_entries(data)):
+            return out
+    return out
@@ -5,6 +5,33 @@ from typing import Optional
 from src.utils.paths import get_artifacts_path, get_metrics_dir
 
 
+def _performance_lines(profile: dict) -> list:
+    """Markdown section for performance_profile.json (see src.pipelines.profile_model)."""
+    def _fmt(v, spec):
+        return format(v, spec) if isinstance(v, (int, float)) else "n/a"
+
+    return [
+        "",
+        "## Performance profile",
+        "| Measure | Value |",
+        "|---------|-------|",
+        f"| Model type | {profile.get('model_type', 'n/a')} |",
+        f"| Artifact size | {_fmt(profile.get('artifact_bytes', 0) / (1024 * 1024), '.2f')} MB |",
+        f"| Load time | {_fmt(profile.get('load_time_ms'), '.1f')} ms |",
+        f"| Single-row latency p50 | {_fmt(profile.get('single_row_p50_ms'), '.2f')} ms |",
+        f"| Single-row latency p99 | {_fmt(profile.get('single_row_p99_ms'), '.2f')} ms |",
+        f"| Batch throughput ({profile.get('batch_rows', 'n/a')} rows) | "
+        f"{_fmt(profile.get('batch_throughput_rows_per_s'), ',.0f')} rows/s |",
+        f"| Transform cost | {_fmt(profile.get('transform_us_per_row'), '.2f')} µs/row |",
+        f"| Peak scoring allocations | {_fmt(profile.get('scoring_peak_alloc_mb'), '.1f')} MB |",
+        f"| Peak RSS, fresh process (load + batch score) | "
+        f"{_fmt(profile.get('scoring_peak_rss_mb'), '.1f')} MB |",
+    ] + ([
+        f"| Shadow scoring overhead (p50, {', '.join(profile['shadow_challengers'])}) | "
+        f"{_fmt(profile.get('shadow_overhead_pct'), '+.1f')} % |",
+    ] if profile.get("shadow_challengers") else [])
+
+
 def generate_model_card(output_path: Optional[Path] = None) -> str:
     """Write model_card.md from metrics and config. Returns content."""
     path = output_path or get_artifacts_path() / "model_card.md"
@@ -19,10 +46,12 @@ def generate_model_card(output_path: Optional[Path] = None) -> str:
         "# Model Card: Financial Offer Propensity",
         "",
         "## Overview",
-        "Binary classification model predicting P(customer accepts offer) using UCI Bank Marketing–style features.",
+        "Binary classification model predicting P(customer accepts offer) "
+        "using UCI Bank Marketing–style features.",
         "",
         "## Dataset",
-        "UCI Bank Marketing (bank-additional-full.csv). Target: subscription to term deposit (yes/no).",
+        "UCI Bank Marketing (bank-additional-full.csv). "
+        "Target: subscription to term deposit (yes/no).",
         "",
         "## Metrics",
         "| Metric | Value |",
@@ -31,8 +60,17 @@ def generate_model_card(output_path: Optional[Path] = None) -> str:
     for k, v in metrics.items():
         if isinstance(v, float):
             lines.append(f"| {k} | {v:.4f} |")
+        elif isinstance(v, dict):
+            for sub_k, sub_v in v.items():
+                lines.append(f"| {k}.{sub_k} | {sub_v:.4f} |")
         else:
             lines.append(f"| {k} | {v} |")
+    profile_path = get_metrics_dir() / "performance_profile.json"
+    if profile_path.exists():
+        import json
+        with open(profile_path, encoding="utf-8") as f:
+            profile = json.load(f)
+        lines.extend(_performance_lines(profile))
     lines.extend([
         "",
         "## Limitations",
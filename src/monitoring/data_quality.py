@@ -1,7 +1,20 @@
-"""Basic data quality checks: missing rate, value ranges, forbidden values."""
+"""Config-driven data quality rules: ranges, allowed values, null rates, uniqueness, cross-column.
+
+Rules from monitoring.yaml (data_quality.rules) are compiled once into vectorized checks.
+Each chunk is evaluated in a single scan: every referenced column is converted and
+null-masked once, and all rules on it reuse that. The scan yields a small partial
+result (row, null and violation counts). Partials merge by addition, so large
+CSV/Parquet extracts can be checked chunk by chunk in bounded memory. The outcome
+matches a whole-frame run.
+
+Uniqueness is exact while the distinct row hashes seen fit in unique_exact_limit. Past
+that, the rule switches to a HyperLogLog sketch (2**unique_sketch_precision registers),
+and its duplicate count is an estimate reported with "approximate": true.
+"""
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
+import numpy as np
 import pandas as pd
 
 from src.utils.config import get_monitoring_config
@@ -9,38 +22,404 @@ from src.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+_OPS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
 
-def run_checks(df: pd.DataFrame) -> Dict[str, Any]:
-    """Run configured data quality checks; return pass/fail and summary."""
-    cfg = get_monitoring_config()
-    dq = cfg.get("data_quality", {})
-    max_missing = dq.get("max_missing_rate", 0.05)
-    age_min = dq.get("age_min", 0)
-    age_max = dq.get("age_max", 120)
-    balance_min = dq.get("balance_min", -10000)
-    balance_max = dq.get("balance_max", 10_000_000)
-
-    results = {"passed": True, "checks": [], "summary": []}
-    n = len(df)
-
-    missing = df.isnull().mean()
-    for col in missing.index[missing > max_missing]:
-        results["passed"] = False
-        results["checks"].append({"check": "missing_rate", "column": col, "value": float(missing[col]), "threshold": max_missing})
-        results["summary"].append(f"{col}: missing rate {missing[col]:.2%} > {max_missing:.2%}")
-    if "age" in df.columns:
-        out_of_range = (df["age"] < age_min) | (df["age"] > age_max)
-        if out_of_range.any():
+
+def _legacy_rules(dq: dict) -> List[dict]:
+    """Translate the flat age_*/balance_* thresholds into range rules."""
+    return [
+        {
+            "type": "range",
+            "column": "age",
+            "min": dq.get("age_min", 0),
+            "max": dq.get("age_max", 120),
+        },
+        {
+            "type": "range",
+            "column": "balance",
+            "min": dq.get("balance_min", -10000),
+            "max": dq.get("balance_max", 10_000_000),
+        },
+    ]
+
+
+def _numeric(values: np.ndarray) -> np.ndarray:
+    """values as float; entries that are not numbers become NaN."""
+    if values.dtype.kind in "biuf":
+        return values.astype(float, copy=False)
+    return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+
+
+def _compile_rule(rule: dict, categorical: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Compile one rule spec into {name, kind, columns, violations(cols) -> bool mask, ...}.
+
+    violations takes the chunk's shared column scan ({column: (values, null mask)}).
+    """
+    kind = rule["type"]
+    out: Dict[str, Any] = {"kind": kind, "spec": rule}
+    if kind == "range":
+        col, lo, hi = rule["column"], rule.get("min", -np.inf), rule.get("max", np.inf)
+        if col in (categorical or []):
+            raise ValueError(f"range rule on categorical column {col!r}")
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (lo, hi)):
+            raise ValueError(
+                f"range rule on {col!r}: min and max must be numbers, got {lo!r}, {hi!r}"
+            )
+        out["name"] = rule.get("name", f"{col}_range")
+        out["columns"] = [col]
+        out["expected"] = [lo, hi]
+
+        def _range(cols: Dict[str, Any]) -> np.ndarray:
+            values, null = cols[col]
+            x = _numeric(values)
+            # Non-numeric values (NaN after coercion but not null) are out of range too
+            return (x < lo) | (x > hi) | (np.isnan(x) & ~null)
+
+        out["violations"] = _range
+    elif kind == "allowed":
+        col = rule["column"]
+        allowed = pd.Index([str(v) for v in rule["values"]])
+        out["name"] = rule.get("name", f"{col}_allowed")
+        out["columns"] = [col]
+        out["expected"] = list(allowed)
+
+        def _allowed(cols: Dict[str, Any]) -> np.ndarray:
+            # Look up the distinct values only, then map back through the codes
+            codes, uniques = pd.factorize(cols[col][0], use_na_sentinel=True)
+            bad = np.append(allowed.get_indexer(pd.Index(uniques).astype(str)) < 0, False)
+            return bad[codes]
+
+        out["violations"] = _allowed
+    elif kind == "null_rate":
+        col = rule["column"]
+        out["name"] = rule.get("name", f"{col}_null_rate")
+        out["columns"] = [col]
+        out["max_rate"] = rule.get("max_rate", 0.0)
+    elif kind == "unique":
+        cols = [rule["column"]] if "column" in rule else list(rule["columns"])
+        out["name"] = rule.get("name", f"{'_'.join(cols)}_unique")
+        out["columns"] = cols
+    elif kind == "compare":
+        # Cross-column: left <op> right, where right is a column name or a constant
+        left, right = rule["left"], rule["right"]
+        if rule["op"] not in _OPS:
+            raise ValueError(f"compare rule: unknown op {rule['op']!r}")
+        op = _OPS[rule["op"]]
+        columns = [left] + ([right] if isinstance(right, str) else [])
+        bad = [c for c in columns if c in (categorical or [])]
+        if bad:
+            raise ValueError(f"compare rule on categorical column {bad[0]!r}")
+        if not isinstance(right, str) and (
+            not isinstance(right, (int, float)) or isinstance(right, bool)
+        ):
+            raise ValueError(f"compare rule on {left!r}: right must be a column or a number")
+        out["name"] = rule.get("name", f"{left}_{rule['op']}_{right}")
+        out["columns"] = columns
+        out["expected"] = f"{left} {rule['op']} {right}"
+
+        def _compare(cols: Dict[str, Any]) -> np.ndarray:
+            # Rows with a null on either side are skipped (null_rate covers them);
+            # non-numeric values that are not null violate the rule, as for range
+            values, null = cols[left]
+            x = _numeric(values)
+            skip, unparsed = null.copy(), np.isnan(x) & ~null
+            if isinstance(right, str):
+                rhs_values, rhs_null = cols[right]
+                rhs = _numeric(rhs_values)
+                skip |= rhs_null
+                unparsed |= np.isnan(rhs) & ~rhs_null
+            else:
+                rhs = right
+            with np.errstate(invalid="ignore"):
+                ok = op(x, rhs)
+            return ~skip & (unparsed | ~ok)
+
+        out["violations"] = _compare
+    elif kind == "expression":
+        # Cross-column: rows where the pandas expression is False violate the rule.
+        # The one rule type that needs the frame rather than the shared column scan.
+        expr = rule["expr"]
+        out["name"] = rule.get("name", expr)
+        out["columns"] = rule.get("columns", [])
+        out["expected"] = expr
+        out["violations_df"] = lambda df: ~df.eval(expr).to_numpy(dtype=bool)
+    else:
+        raise ValueError(f"Unknown data quality rule type: {kind}")
+    return out
+
+
+def compile_rules(
+    dq_cfg: Optional[dict] = None, categorical: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """Compile data_quality config (rules list, or legacy flat thresholds) into checks.
+
+    categorical (default: model.yaml categorical features) are columns a range or
+    compare rule may not target. Invalid specs raise ValueError here rather than at check time.
+    """
+    dq = dq_cfg if dq_cfg is not None else get_monitoring_config().get("data_quality", {})
+    if categorical is None:
+        from src.pipelines.features import get_feature_columns
+        categorical = get_feature_columns()[1]
+    specs = dq.get("rules") or _legacy_rules(dq)
+    rules = [_compile_rule(r, categorical) for r in specs]
+    for rule in rules:
+        if rule["kind"] == "unique":
+            rule["exact_limit"] = int(
+                rule["spec"].get("exact_limit", dq.get("unique_exact_limit", 1_000_000))
+            )
+            rule["precision"] = int(
+                rule["spec"].get("sketch_precision", dq.get("unique_sketch_precision", 14))
+            )
+    return rules
+
+
+def _clz64(x: np.ndarray) -> np.ndarray:
+    """Leading zero bits of each uint64."""
+    x = x.copy()
+    n = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        small = x < (np.uint64(1) << np.uint64(64 - shift))
+        n[small] += shift
+        x[small] <<= np.uint64(shift)
+    n[x == 0] = 64
+    return n
+
+
+def _sketch(hashes: np.ndarray, precision: int) -> np.ndarray:
+    """HyperLogLog registers of a uint64 hash array."""
+    registers = np.zeros(2**precision, dtype=np.uint8)
+    idx = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rank = np.minimum(_clz64(hashes << np.uint64(precision)), 64 - precision) + 1
+    np.maximum.at(registers, idx, rank.astype(np.uint8))
+    return registers
+
+
+def _sketch_distinct(registers: np.ndarray) -> float:
+    m = len(registers)
+    estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(2.0 ** -registers.astype(float))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)  # small-range (linear counting) correction
+    return float(estimate)
+
+
+def _unique_state(
+    hashes: np.ndarray, duplicates: int, n: int, limit: int, precision: int
+) -> Dict[str, Any]:
+    """Exact state (sorted distinct hashes), or a sketch once past limit distinct hashes."""
+    state = {"n": n, "limit": limit, "precision": precision, "hashes": hashes, "sketch": None,
+             "duplicates": duplicates}
+    if len(hashes) > limit:
+        state.update(hashes=None, sketch=_sketch(hashes, precision), duplicates=0)
+    return state
+
+
+def _merge_unique(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    n, limit, precision = a["n"] + b["n"], a["limit"], a["precision"]
+    if a["sketch"] is None and b["sketch"] is None:
+        merged = np.union1d(a["hashes"], b["hashes"])
+        duplicates = (
+            a["duplicates"] + b["duplicates"] + len(a["hashes"]) + len(b["hashes"]) - len(merged)
+        )
+        return _unique_state(merged, duplicates, n, limit, precision)
+    sketches = [
+        s["sketch"] if s["sketch"] is not None else _sketch(s["hashes"], precision) for s in (a, b)
+    ]
+    return {"n": n, "limit": limit, "precision": precision, "hashes": None,
+            "sketch": np.maximum(*sketches), "duplicates": 0}
+
+
+def empty_partial(rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Identity element for merge_partials."""
+    return {
+        "n_rows": 0,
+        "null_counts": {},
+        "violations": [0] * len(rules),
+        "unique": [None] * len(rules),
+    }
+
+
+def check_chunk(df: pd.DataFrame, rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Evaluate all compiled rules on one chunk; return a mergeable partial result.
+
+    Each column is converted and null-masked once; null counts and every rule on the
+    column share that scan.
+    """
+    partial = empty_partial(rules)
+    partial["n_rows"] = len(df)
+    cols: Dict[str, Any] = {}
+    for c in df.columns:
+        values = df[c].to_numpy()
+        null = (
+            pd.isna(values) if values.dtype.kind not in "biu" else np.zeros(len(values), dtype=bool)
+        )
+        cols[c] = (values, null)
+        partial["null_counts"][c] = int(np.count_nonzero(null))
+    for i, rule in enumerate(rules):
+        if not all(c in cols for c in rule["columns"]):
+            continue
+        if "violations" in rule:
+            partial["violations"][i] = int(np.count_nonzero(rule["violations"](cols)))
+        elif "violations_df" in rule:
+            partial["violations"][i] = int(np.count_nonzero(rule["violations_df"](df)))
+        elif rule["kind"] == "unique":
+            h = pd.util.hash_pandas_object(df[rule["columns"]], index=False).to_numpy()
+            uniq = np.unique(h)
+            # Duplicates within the chunk are counted now; cross-chunk ones at merge
+            partial["unique"][i] = _unique_state(
+                uniq, len(h) - len(uniq), len(h), rule["exact_limit"], rule["precision"]
+            )
+    return partial
+
+
+def merge_partials(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine two partial results (associative; order does not matter)."""
+    null_counts = dict(a["null_counts"])
+    for c, v in b["null_counts"].items():
+        null_counts[c] = null_counts.get(c, 0) + v
+    unique = [
+        ua if ub is None else ub if ua is None else _merge_unique(ua, ub)
+        for ua, ub in zip(a["unique"], b["unique"])
+    ]
+    return {
+        "n_rows": a["n_rows"] + b["n_rows"],
+        "null_counts": null_counts,
+        "violations": [x + y for x, y in zip(a["violations"], b["violations"])],
+        "unique": unique,
+    }
+
+
+def finalize(
+    partial: Dict[str, Any],
+    rules: List[Dict[str, Any]],
+    max_missing: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Turn a (merged) partial result into the pass/fail report."""
+    if max_missing is None:
+        max_missing = get_monitoring_config().get("data_quality", {}).get("max_missing_rate", 0.05)
+    results = {"passed": True, "checks": [], "summary": [], "n_rows": partial["n_rows"]}
+    n = max(partial["n_rows"], 1)
+    rate_overrides = {r["columns"][0]: r for r in rules if r["kind"] == "null_rate"}
+
+    for col, count in partial["null_counts"].items():
+        rule = rate_overrides.get(col)
+        threshold = rule["max_rate"] if rule else max_missing
+        rate = count / n
+        if rate > threshold:
             results["passed"] = False
-            results["checks"].append({"check": "age_range", "violations": int(out_of_range.sum()), "expected": [age_min, age_max]})
-            results["summary"].append(f"age: {out_of_range.sum()} values outside [{age_min}, {age_max}]")
-    if "balance" in df.columns:
-        out_of_range = (df["balance"] < balance_min) | (df["balance"] > balance_max)
-        if out_of_range.any():
+            name = rule["name"] if rule else "missing_rate"
+            results["checks"].append(
+                {"check": name, "column": col, "value": float(rate), "threshold": threshold}
+            )
+            results["summary"].append(f"{col}: missing rate {rate:.2%} > {threshold:.2%}")
+
+    for rule, count, state in zip(rules, partial["violations"], partial["unique"]):
+        if rule["kind"] == "unique":
+            if state is None:
+                continue
+            check = {
+                "check": rule["name"],
+                "columns": rule["columns"],
+                "duplicates": state["duplicates"],
+            }
+            if state["sketch"] is not None:
+                # Estimated from the sketch; only fail beyond 3 standard errors of the estimate
+                m = len(state["sketch"])
+                check["duplicates"] = max(
+                    0, int(round(state["n"] - _sketch_distinct(state["sketch"])))
+                )
+                check["approximate"] = True
+                if check["duplicates"] <= 3 * 1.04 / np.sqrt(m) * state["n"]:
+                    continue
+            elif not check["duplicates"]:
+                continue
             results["passed"] = False
-            results["checks"].append({"check": "balance_range", "violations": int(out_of_range.sum()), "expected": [balance_min, balance_max]})
-            results["summary"].append(f"balance: {out_of_range.sum()} values outside [{balance_min}, {balance_max}]")
+            results["checks"].append(check)
+            approx = "~" if check.get("approximate") else ""
+            results["summary"].append(
+                f"{', '.join(rule['columns'])}: {approx}{check['duplicates']} duplicate values"
+            )
+            continue
+        if rule["kind"] == "null_rate" or not count:
+            continue
+        results["passed"] = False
+        results["checks"].append(
+            {"check": rule["name"], "violations": count, "expected": rule["expected"]}
+        )
+        if rule["kind"] == "range":
+            lo, hi = rule["expected"]
+            results["summary"].append(f"{rule['columns'][0]}: {count} values outside [{lo}, {hi}]")
+        elif rule["kind"] == "allowed":
+            results["summary"].append(f"{rule['columns'][0]}: {count} values not in allowed set")
+        else:
+            results["summary"].append(f"{rule['name']}: {count} rows violate {rule['expected']}")
 
     if not results["summary"]:
         results["summary"].append("All checks passed")
     return results
+
+
+def run_checks(df: pd.DataFrame) -> Dict[str, Any]:
+    """Run configured data quality checks; return pass/fail and summary."""
+    rules = compile_rules()
+    return finalize(check_chunk(df, rules), rules)
+
+
+def run_checks_chunked(chunks: Iterable[pd.DataFrame]) -> Dict[str, Any]:
+    """Run configured checks over an iterable of DataFrame chunks, merging partial results."""
+    rules = compile_rules()
+    partial = empty_partial(rules)
+    for chunk in chunks:
+        partial = merge_partials(partial, check_chunk(chunk, rules))
+    return finalize(partial, rules)
+
+
+def iter_chunks(path: Path, chunksize: int = 1_000_000, sep: str = ";") -> Iterator[pd.DataFrame]:
+    """Stream a CSV or Parquet file as DataFrame chunks of at most chunksize rows."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, sep=sep, chunksize=chunksize)
+
+
+def check_file(path: Path, chunksize: int = 1_000_000, sep: str = ";") -> Dict[str, Any]:
+    """Run configured checks over a CSV/Parquet file in chunks (bounded memory)."""
+    return run_checks_chunked(iter_chunks(path, chunksize=chunksize, sep=sep))
+
+
+def main() -> None:
+    """CLI: check the raw training extract; report and append to the metrics store."""
+    from src.monitoring.metrics_store import append_results
+    from src.monitoring.report import write_quality_report
+    from src.pipelines.ingest import get_raw_csv_path
+    from src.serving.manifest import load_manifest
+    from src.utils.paths import get_model_dir
+
+    path = get_raw_csv_path()
+    if not path.exists():
+        logger.warning("No raw data at %s; skipping data quality check", path)
+        return
+    results = check_file(path)
+    write_quality_report(results)
+    append_results(
+        {},
+        quality_results=results,
+        model_version=(load_manifest(get_model_dir()) or {}).get("model_version"),
+    )
+    logger.info("Data quality results: %s", results["summary"])
+    if not results["passed"]:
+        logger.warning("Data quality checks failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 """PSI and KS drift checks vs baseline."""
+import importlib.util
 import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -9,16 +13,22 @@ import pandas as pd
 from src.utils.config import get_monitoring_config
 from src.utils.logging import get_logger
 from src.utils.paths import get_baselines_dir
+from src.utils.profiling import profiled, stage
 
 logger = get_logger(__name__)
 
+# (frame, scores) the segment workers read rows from; set per compute_segment_drift call
+_segment_source: Optional[Tuple[pd.DataFrame, Optional[np.ndarray]]] = None
+
 
 def _psi(expected: np.ndarray, actual: np.ndarray, n_bins: int = 10) -> float:
     """Population Stability Index between two 1d arrays."""
     breakpoints = np.percentile(expected, np.linspace(0, 100, n_bins + 1)[1:-1])
     breakpoints = np.unique(breakpoints)
     if len(breakpoints) < 2:
-        breakpoints = np.percentile(np.concatenate([expected, actual]), np.linspace(0, 100, n_bins + 1)[1:-1])
+        breakpoints = np.percentile(
+            np.concatenate([expected, actual]), np.linspace(0, 100, n_bins + 1)[1:-1]
+        )
     bins = np.clip(np.searchsorted(breakpoints, expected, side="right"), 0, len(breakpoints))
     bin_expected = np.bincount(bins, minlength=len(breakpoints) + 1) / len(expected)
     bins_actual = np.clip(np.searchsorted(breakpoints, actual, side="right"), 0, len(breakpoints))
@@ -34,10 +44,76 @@ def _ks(expected: np.ndarray, actual: np.ndarray) -> float:
     return float(stats.ks_2samp(expected, actual).statistic)
 
 
-def compute_baseline_stats(df: pd.DataFrame, scores: Optional[np.ndarray] = None) -> dict:
+def _category_counts(values: Any, categories: List[str]) -> Tuple[np.ndarray, int]:
+    """Count values per category via integer codes + bincount; return (counts, n_unseen).
+
+    Values are mapped to codes in the fitted vocabulary (-1 = unseen), so the cost is
+    a single hash pass plus a linear bincount regardless of cardinality. Nulls are skipped.
+    """
+    values = pd.Series(values).dropna().astype(str)
+    codes = pd.Index(categories).get_indexer(values)
+    counts = np.bincount(codes + 1, minlength=len(categories) + 1)
+    return counts[1:], int(counts[0])
+
+
+def _categorical_psi(
+    expected_counts: np.ndarray, actual_counts: np.ndarray, actual_unseen: int = 0
+) -> float:
+    """PSI over category frequencies; unseen categories form an extra bucket."""
+    expected = np.append(expected_counts, 0).astype(float)
+    actual = np.append(actual_counts, actual_unseen).astype(float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return 0.0
+    expected = expected / expected.sum()
+    actual = actual / actual.sum()
+    expected = np.where(expected == 0, 1e-6, expected)
+    actual = np.where(actual == 0, 1e-6, actual)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _chi2(expected_counts: np.ndarray, actual_counts: np.ndarray) -> Dict[str, float]:
+    """Chi-square test of homogeneity between baseline and current category counts."""
+    from scipy import stats
+    table = np.vstack([expected_counts, actual_counts])
+    table = table[:, table.sum(axis=0) > 0]
+    if table.shape[1] < 2 or (table.sum(axis=1) == 0).any():
+        return {"statistic": 0.0, "p_value": 1.0}
+    statistic, p_value, _, _ = stats.chi2_contingency(table)
+    return {"statistic": float(statistic), "p_value": float(p_value)}
+
+
+def compute_category_stats(
+    df: pd.DataFrame,
+    vocabulary: Optional[Dict[str, List[str]]] = None,
+) -> dict:
+    """Baseline category counts for monitored categoricals.
+
+    vocabulary is the fitted OneHotEncoder vocabulary (see get_category_vocabulary);
+    columns missing from it fall back to the categories observed in df.
+    """
+    cfg = get_monitoring_config()
+    monitor_cats = cfg.get("drift", {}).get("monitor_categorical", [])
+    vocabulary = vocabulary or {}
+    category_stats = {}
+    for c in monitor_cats:
+        if c not in df.columns:
+            continue
+        categories = vocabulary.get(c) or sorted(df[c].dropna().astype(str).unique().tolist())
+        counts, _ = _category_counts(df[c], categories)
+        category_stats[c] = {"categories": list(categories), "counts": counts.tolist()}
+    return category_stats
+
+
+def compute_baseline_stats(
+    df: pd.DataFrame,
+    scores: Optional[np.ndarray] = None,
+    vocabulary: Optional[Dict[str, List[str]]] = None,
+) -> dict:
     """Compute feature and score stats for drift baseline (used by package_model)."""
     cfg = get_monitoring_config()
-    monitor_cols = cfg.get("drift", {}).get("monitor_features", ["age", "balance", "duration", "campaign", "pdays"])
+    monitor_cols = cfg.get("drift", {}).get(
+        "monitor_features", ["age", "balance", "duration", "campaign", "pdays"]
+    )
     monitor_cols = [c for c in monitor_cols if c in df.columns]
     feature_stats = {}
     for c in monitor_cols:
@@ -47,7 +123,7 @@ def compute_baseline_stats(df: pd.DataFrame, scores: Optional[np.ndarray] = None
             "min": float(df[c].min()),
             "max": float(df[c].max()),
         }
-    out = {"feature_stats": feature_stats}
+    out = {"feature_stats": feature_stats, "category_stats": compute_category_stats(df, vocabulary)}
     if scores is not None and len(scores):
         out["score_mean"] = float(np.mean(scores))
         out["score_std"] = float(np.std(scores))
@@ -66,27 +142,33 @@ def load_baseline(path: Optional[Path] = None) -> dict:
         return json.load(f)
 
 
-def compute_drift(
+def _compare_to_baseline(
     current_df: pd.DataFrame,
-    current_scores: Optional[np.ndarray] = None,
-    baseline_path: Optional[Path] = None,
+    current_scores: Optional[np.ndarray],
+    baseline: dict,
+    drift_cfg: dict,
 ) -> Dict[str, Any]:
-    """Compare current data/scores to baseline; return metrics and drift_detected."""
-    baseline = load_baseline(baseline_path)
-    cfg = get_monitoring_config()
-    drift_cfg = cfg.get("drift", {})
+    """Drift metrics of one frame (global or a single segment) against one baseline."""
     psi_threshold = drift_cfg.get("psi_threshold", 0.2)
     ks_threshold = drift_cfg.get("ks_threshold", 0.1)
     score_psi_threshold = drift_cfg.get("score_psi_threshold", 0.15)
-    monitor_cols = drift_cfg.get("monitor_features", ["age", "balance", "duration", "campaign", "pdays"])
+    monitor_cols = drift_cfg.get(
+        "monitor_features", ["age", "balance", "duration", "campaign", "pdays"]
+    )
     monitor_cols = [c for c in monitor_cols if c in current_df.columns]
+    cat_psi_threshold = drift_cfg.get("categorical_psi_threshold", psi_threshold)
+    unseen_threshold = drift_cfg.get("unseen_rate_threshold", 0.01)
 
-    results = {"feature_psi": {}, "feature_ks": {}, "score_psi": None, "drift_detected": False}
-    try:
-        from scipy import stats
-        has_scipy = True
-    except ImportError:
-        has_scipy = False
+    results = {
+        "feature_psi": {},
+        "feature_ks": {},
+        "category_psi": {},
+        "category_chi2": {},
+        "category_unseen_rate": {},
+        "score_psi": None,
+        "drift_detected": False,
+    }
+    has_scipy = importlib.util.find_spec("scipy") is not None
 
     for col in monitor_cols:
         current = current_df[col].dropna().values
@@ -111,6 +193,23 @@ def compute_drift(
         if psi > psi_threshold:
             results["drift_detected"] = True
 
+    for col, cs in baseline.get("category_stats", {}).items():
+        if col not in current_df.columns:
+            continue
+        expected_counts = np.asarray(cs.get("counts", []), dtype=np.int64)
+        counts, unseen = _category_counts(current_df[col], cs.get("categories", []))
+        n = int(counts.sum()) + unseen
+        if not n or not len(expected_counts):
+            continue
+        psi = _categorical_psi(expected_counts, counts, unseen)
+        unseen_rate = unseen / n
+        results["category_psi"][col] = psi
+        results["category_unseen_rate"][col] = unseen_rate
+        if has_scipy:
+            results["category_chi2"][col] = _chi2(expected_counts, counts)
+        if psi > cat_psi_threshold or unseen_rate > unseen_threshold:
+            results["drift_detected"] = True
+
     if current_scores is not None and len(current_scores) and "score_mean" in baseline:
         base_mean = baseline["score_mean"]
         base_std = max(baseline.get("score_std", 0), 1e-6)
@@ -123,35 +222,200 @@ def compute_drift(
     return results
 
 
+def _segment_labels(df: pd.DataFrame, key: List[str]) -> Dict[str, np.ndarray]:
+    """Map segment label ('a' or 'a|b' for multi-column keys) -> row positions."""
+    groups = df.groupby(
+        key if len(key) > 1 else key[0], sort=False, observed=True, dropna=True
+    ).indices
+    return {
+        "|".join(str(v) for v in (g if isinstance(g, tuple) else (g,))): idx
+        for g, idx in groups.items()
+    }
+
+
+def _segment_keys(drift_cfg: dict, columns: Any) -> List[List[str]]:
+    """Configured group-by keys (str or list of str) present in columns."""
+    keys = []
+    for k in drift_cfg.get("segments", {}).get("group_by", []):
+        key = [k] if isinstance(k, str) else list(k)
+        if all(c in columns for c in key):
+            keys.append(key)
+    return keys
+
+
+def compute_segment_stats(
+    df: pd.DataFrame,
+    scores: Optional[np.ndarray] = None,
+    vocabulary: Optional[Dict[str, List[str]]] = None,
+) -> dict:
+    """Per-segment baseline stats: {key: {segment: baseline_stats}} for configured group-by keys.
+
+    Segments below segments.min_rows are skipped; their drift would be mostly noise.
+    """
+    drift_cfg = get_monitoring_config().get("drift", {})
+    min_rows = drift_cfg.get("segments", {}).get("min_rows", 200)
+    out = {}
+    for key in _segment_keys(drift_cfg, df.columns):
+        per_segment = {}
+        for label, idx in _segment_labels(df, key).items():
+            if len(idx) < min_rows:
+                continue
+            seg_scores = scores[idx] if scores is not None and len(scores) == len(df) else None
+            stats = compute_baseline_stats(df.iloc[idx], seg_scores, vocabulary=vocabulary)
+            stats["n"] = int(len(idx))
+            per_segment[label] = stats
+        out["|".join(key)] = per_segment
+    return out
+
+
+def _set_segment_source(df: pd.DataFrame, scores: Optional[np.ndarray]) -> None:
+    global _segment_source
+    _segment_source = (df, scores)
+
+
+def _segment_drift_task(tasks: List[tuple], drift_cfg: dict) -> List[tuple]:
+    """Worker: drift for a chunk of (key, segment, row indices, baseline) tasks.
+
+    Rows come from the shared frame set by _set_segment_source, so only indices and
+    per-segment results cross the process boundary.
+    """
+    df, scores = _segment_source
+    out = []
+    for key, label, idx, seg_baseline in tasks:
+        seg_scores = scores[idx] if scores is not None else None
+        res = _compare_to_baseline(df.iloc[idx], seg_scores, seg_baseline, drift_cfg)
+        res["n"] = int(len(idx))
+        out.append((key, label, res))
+    return out
+
+
+def compute_segment_drift(
+    current_df: pd.DataFrame,
+    current_scores: Optional[np.ndarray],
+    segment_stats: dict,
+    drift_cfg: Optional[dict] = None,
+    n_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Drift per segment against per-segment baselines, fanned out over a process pool.
+
+    Segments are grouped once per key and batched into a few chunks per worker, so
+    thousands of small segments cost a handful of task round-trips rather than one each.
+    Workers get the frame once (inherited on fork, else pickled once per worker via the
+    pool initializer); tasks carry only row indices.
+    """
+    drift_cfg = drift_cfg if drift_cfg is not None else get_monitoring_config().get("drift", {})
+    seg_cfg = drift_cfg.get("segments", {})
+    min_rows = seg_cfg.get("min_rows", 200)
+    if n_workers is None:
+        n_workers = seg_cfg.get("n_workers") or os.cpu_count() or 1
+    scores = None
+    if current_scores is not None and len(current_scores) == len(current_df):
+        scores = np.asarray(current_scores)
+
+    tasks = []
+    for key_name, per_segment in segment_stats.items():
+        key = key_name.split("|")
+        if not all(c in current_df.columns for c in key):
+            continue
+        for label, idx in _segment_labels(current_df, key).items():
+            if len(idx) < min_rows or label not in per_segment:
+                continue
+            tasks.append((key_name, label, idx, per_segment[label]))
+
+    results: Dict[str, Any] = {k: {} for k in segment_stats}
+    if not tasks:
+        return results
+    n_chunks = min(len(tasks), max(1, n_workers) * 4)
+    chunks = [tasks[i::n_chunks] for i in range(n_chunks)]
+    if n_workers <= 1 or len(tasks) < 2:
+        _set_segment_source(current_df, scores)
+        try:
+            outputs = [_segment_drift_task(c, drift_cfg) for c in chunks]
+        finally:
+            _set_segment_source(None, None)
+    else:
+        method = "fork" if "fork" in mp.get_all_start_methods() else None
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=mp.get_context(method),
+            initializer=_set_segment_source,
+            initargs=(current_df, scores),
+        ) as pool:
+            outputs = list(pool.map(_segment_drift_task, chunks, [drift_cfg] * len(chunks)))
+    for chunk_out in outputs:
+        for key_name, label, res in chunk_out:
+            results[key_name][label] = res
+    return results
+
+
+def compute_drift(
+    current_df: pd.DataFrame,
+    current_scores: Optional[np.ndarray] = None,
+    baseline_path: Optional[Path] = None,
+    n_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Compare current data/scores to baseline; return metrics and drift_detected.
+
+    When the baseline carries segment_stats, drift is also computed per segment
+    (see compute_segment_drift) and any drifted segment sets drift_detected.
+    """
+    baseline = load_baseline(baseline_path)
+    drift_cfg = get_monitoring_config().get("drift", {})
+    results = _compare_to_baseline(current_df, current_scores, baseline, drift_cfg)
+    if baseline.get("segment_stats"):
+        segments = compute_segment_drift(
+            current_df, current_scores, baseline["segment_stats"], drift_cfg, n_workers
+        )
+        results["segment_drift"] = segments
+        results["drifted_segments"] = [
+            f"{key}={label}"
+            for key, per_segment in segments.items()
+            for label, res in per_segment.items()
+            if res["drift_detected"]
+        ]
+        if results["drifted_segments"]:
+            results["drift_detected"] = True
+    return results
+
+
+@profiled("drift")
 def main() -> None:
     """CLI: run drift on recent data (e.g. test set)."""
-    from src.utils.paths import get_processed_data_dir
     import joblib
-    from src.utils.paths import get_model_dir
+
     from src.pipelines.features import load_preprocessor, transform
+    from src.utils.paths import get_model_dir, get_processed_data_dir
 
     proc_dir = get_processed_data_dir()
     model_dir = get_model_dir()
     if not (proc_dir / "train_raw.parquet").exists() or not (model_dir / "model.joblib").exists():
         logger.warning("No training data or model; skipping drift check")
         return
-    df = pd.read_parquet(proc_dir / "train_raw.parquet")
-    # Use last 20% as "current" for demo
-    n = len(df)
-    current_df = df.iloc[-int(n * 0.2) :]
-    model = joblib.load(model_dir / "model.joblib")
-    preprocessor, _ = load_preprocessor(model_dir)
-    X = transform(preprocessor, current_df)
-    if hasattr(X, "toarray"):
-        X = X.toarray()
-    current_scores = model.predict_proba(X)[:, 1]
-    results = compute_drift(current_df, current_scores)
+    with stage("load") as st:
+        df = pd.read_parquet(proc_dir / "train_raw.parquet")
+        # Use last 20% as "current" for demo
+        n = len(df)
+        current_df = df.iloc[-int(n * 0.2) :]
+        model = joblib.load(model_dir / "model.joblib")
+        preprocessor, _ = load_preprocessor(model_dir)
+        st.rows = len(current_df)
+    with stage("score", rows=len(current_df)):
+        X = transform(preprocessor, current_df)
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        current_scores = model.predict_proba(X)[:, 1]
+    with stage("compute_drift", rows=len(current_df)):
+        results = compute_drift(current_df, current_scores)
     logger.info("Drift results: %s", results)
     from src.utils.paths import get_metrics_dir
-    report_path = get_metrics_dir() / "drift_report.json"
-    report_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(report_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2)
+    with stage("write_results"):
+        report_path = get_metrics_dir() / "drift_report.json"
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        from src.monitoring.metrics_store import append_results
+        from src.serving.manifest import load_manifest
+        append_results(results, model_version=(load_manifest(model_dir) or {}).get("model_version"))
     if results["drift_detected"]:
         logger.warning("Drift detected above threshold")
 
@@ -0,0 +1,168 @@
+"""Append-only Parquet store of monitoring metrics, partitioned by date and model version.
+
+Every drift/quality run is flattened to long rows (metric, feature, segment, value) and
+written as one part file under <store>/date=YYYY-MM-DD/model_version=<v>/. Nothing is
+rewritten, and queries prune partitions via Parquet filters, so months of history load
+without parsing per-run JSON reports.
+"""
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.utils.logging import get_logger
+from src.utils.paths import get_metrics_dir
+
+logger = get_logger(__name__)
+
+STORE_COLUMNS = ["run_id", "run_at", "metric", "feature", "segment", "value", "drift_detected"]
+
+
+def get_store_dir() -> Path:
+    """artifacts/metrics/history/."""
+    return get_metrics_dir() / "history"
+
+
+def _flatten(
+    drift_results: Dict[str, Any], quality_results: Optional[Dict[str, Any]]
+) -> List[tuple]:
+    """(metric, feature, segment, value) rows from drift and quality result dicts."""
+    rows = []
+    for metric in ("feature_psi", "feature_ks", "category_psi", "category_unseen_rate"):
+        for feature, value in drift_results.get(metric, {}).items():
+            rows.append((metric, feature, "", float(value)))
+    for feature, res in drift_results.get("category_chi2", {}).items():
+        rows.append(("category_chi2_p_value", feature, "", float(res["p_value"])))
+    if drift_results.get("score_psi") is not None:
+        rows.append(("score_psi", "score", "", float(drift_results["score_psi"])))
+    for key, per_segment in drift_results.get("segment_drift", {}).items():
+        for label, res in per_segment.items():
+            segment = f"{key}={label}"
+            for metric in ("feature_psi", "category_psi"):
+                for feature, value in res.get(metric, {}).items():
+                    rows.append((f"segment_{metric}", feature, segment, float(value)))
+            if res.get("score_psi") is not None:
+                rows.append(("segment_score_psi", "score", segment, float(res["score_psi"])))
+    for metric, value in drift_results.get("live_performance", {}).items():
+        rows.append((f"live_{metric}", "score", "", float(value)))
+    if "decay_detected" in drift_results:  # performance decay, kept apart from drift_detected
+        rows.append(
+            ("live_decay_detected", "score", "", float(bool(drift_results["decay_detected"])))
+        )
+    if quality_results is not None:
+        rows.append(("dq_passed", "", "", float(bool(quality_results.get("passed", False)))))
+        for check in quality_results.get("checks", []):
+            count = check.get("violations", check.get("duplicates", check.get("value", 0)))
+            column = check.get("column") or ",".join(check.get("columns", []))
+            rows.append(("dq_violations", check.get("check", ""), column, float(count)))
+    return rows
+
+
+def append_results(
+    drift_results: Dict[str, Any],
+    quality_results: Optional[Dict[str, Any]] = None,
+    model_version: Optional[str] = None,
+    run_at: Optional[datetime] = None,
+    store_dir: Optional[Path] = None,
+) -> Path:
+    """Append one monitoring run as a new part file; return its path."""
+    store_dir = store_dir or get_store_dir()
+    run_at = run_at or datetime.now(tz=timezone.utc)
+    model_version = model_version or os.environ.get("MODEL_VERSION", "unknown")
+    run_id = uuid.uuid4().hex[:12]
+    rows = _flatten(drift_results, quality_results)
+    df = pd.DataFrame(rows, columns=["metric", "feature", "segment", "value"])
+    df.insert(0, "run_at", pd.Timestamp(run_at))
+    df.insert(0, "run_id", run_id)
+    df["drift_detected"] = bool(drift_results.get("drift_detected", False))
+    part_dir = store_dir / f"date={run_at:%Y-%m-%d}" / f"model_version={model_version}"
+    part_dir.mkdir(parents=True, exist_ok=True)
+    path = part_dir / f"part-{run_at:%H%M%S}-{run_id}.parquet"
+    tmp = part_dir / f".{path.name}.tmp"
+    df[STORE_COLUMNS].to_parquet(tmp, index=False)
+    tmp.replace(path)
+    logger.info("Appended %d monitoring metrics to %s", len(df), path)
+    return path
+
+
+def query(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    model_version: Optional[str] = None,
+    metric: Optional[str] = None,
+    feature: Optional[str] = None,
+    store_dir: Optional[Path] = None,
+) -> pd.DataFrame:
+    """Rows for dates in [start, end] (YYYY-MM-DD), filtered by model version/metric/feature."""
+    store_dir = store_dir or get_store_dir()
+    if not store_dir.exists() or not any(store_dir.glob("date=*")):
+        return pd.DataFrame(columns=STORE_COLUMNS + ["date", "model_version"])
+    filters = []
+    if start:
+        filters.append(("date", ">=", start))
+    if end:
+        filters.append(("date", "<=", end))
+    if model_version:
+        filters.append(("model_version", "==", model_version))
+    if metric:
+        filters.append(("metric", "==", metric))
+    if feature:
+        filters.append(("feature", "==", feature))
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    partitioning = ds.partitioning(
+        pa.schema([("date", pa.string()), ("model_version", pa.string())]), flavor="hive"
+    )
+    dataset = ds.dataset(store_dir, format="parquet", partitioning=partitioning)
+    expr = None
+    for col, op, val in filters:
+        field = ds.field(col)
+        cond = {">=": field >= val, "<=": field <= val, "==": field == val}[op]
+        expr = cond if expr is None else expr & cond
+    df = dataset.to_table(filter=expr).to_pandas()
+    return df.sort_values("run_at").reset_index(drop=True)
+
+
+def rollup(
+    metric: str = "feature_psi",
+    freq: str = "D",
+    agg: str = "max",
+    **filters: Any,
+) -> pd.DataFrame:
+    """Feature x period table of metric aggregated with agg (e.g. daily max PSI)."""
+    df = query(metric=metric, **filters)
+    if df.empty:
+        return pd.DataFrame()
+    df = df[df["segment"] == ""]
+    period = (
+        pd.to_datetime(df["run_at"], utc=True).dt.tz_localize(None).dt.to_period(freq).dt.start_time
+    )
+    return df.assign(period=period).pivot_table(
+        index="period", columns="feature", values="value", aggfunc=agg
+    )
+
+
+def top_drifting(
+    n: int = 10,
+    metric: str = "feature_psi",
+    include_segments: bool = False,
+    **filters: Any,
+) -> pd.DataFrame:
+    """Features (or feature/segment pairs) ranked by mean metric value over the range."""
+    df = query(metric=metric, **filters)
+    if include_segments:
+        df = pd.concat([df, query(metric=f"segment_{metric}", **filters)], ignore_index=True)
+    if df.empty:
+        return pd.DataFrame(columns=["feature", "segment", "mean", "max", "last", "runs"])
+    out = (
+        df.groupby(["feature", "segment"], sort=False)["value"]
+        .agg(["mean", "max", "last", "count"])
+        .rename(columns={"count": "runs"})
+        .sort_values("mean", ascending=False)
+        .head(n)
+        .reset_index()
+    )
+    return out
@@ -0,0 +1,409 @@
+"""Live model performance from delayed outcome labels.
+
+Campaign outcomes arrive days after scoring, as files under artifacts/outcomes/ (CSV,
+Parquet or JSONL). Each file has a customer id, an outcome time and a label. Each
+outcome is joined to the latest logged prediction (artifacts/predictions/) for the
+same customer made at or before the outcome and within max_delay_days. Logged
+feature frames must carry the id column.
+
+The join is one sort, not repeated merges. Predictions and outcomes become a single
+event list, lexsorted by (customer key, time, prediction first). A running maximum
+then gives every outcome its customer's latest earlier prediction.
+
+Matched pairs go into per (window, model_version) score histograms: positives,
+negatives and score sum per fine score bin. The histograms are additive, so each
+outcome file is processed once, late labels just add to their window, and trailing
+windows merge by summing. A file is folded in only once every row has joined or is
+older than max_delay_days: an outcome that arrives before its prediction is logged
+keeps its file pending until a later run can match it. ROC-AUC, precision@k and
+calibration are read off the histograms (exact up to the bin width). Writes
+live_performance.json/.md next to the drift reports and appends the rolling metrics
+to the metrics history store.
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.config import get_monitoring_config
+from src.utils.logging import get_logger
+from src.utils.paths import artifacts_path_from_env, get_metrics_dir
+from src.utils.profiling import profiled, stage
+
+logger = get_logger(__name__)
+
+HIST_COLUMNS = ["window", "model_version", "bin", "positives", "negatives", "score_sum"]
+
+
+def get_performance_config() -> Dict[str, Any]:
+    """performance section of monitoring.yaml."""
+    return get_monitoring_config().get("performance", {})
+
+
+def get_outcomes_dir() -> Path:
+    """artifacts/outcomes/ (honours ARTIFACTS_DIR)."""
+    return artifacts_path_from_env() / "outcomes"
+
+
+def get_state_dir() -> Path:
+    """artifacts/metrics/live_performance_state/: histograms + processed outcome files."""
+    return get_metrics_dir() / "live_performance_state"
+
+
+def _id_keys(values: pd.Series) -> np.ndarray:
+    """uint64 keys that agree for the same id logged as int, float or numeric string."""
+    from src.pipelines.feature_store import id_keys
+
+    if not pd.api.types.is_numeric_dtype(values):
+        parsed = pd.to_numeric(values, errors="coerce")
+        if parsed.isna().any():
+            return id_keys(values.to_numpy(), "hash")
+        values = parsed
+    return values.to_numpy().astype(np.int64).view(np.uint64)
+
+
+def _time_ns(values: pd.Series) -> np.ndarray:
+    return pd.DatetimeIndex(pd.to_datetime(values, utc=True)).as_unit("ns").asi8
+
+
+def join_outcomes(
+    predictions: pd.DataFrame,
+    outcomes: pd.DataFrame,
+    id_column: str = "customer_id",
+    time_column: str = "observed_at",
+    max_delay_days: float = 30.0,
+) -> pd.DataFrame:
+    """Outcome rows with the matched prediction's score, model_version and logged_at.
+
+    Each outcome takes its customer's latest prediction logged at or before it (and at
+    most max_delay_days earlier); a prediction is credited to its first outcome only.
+    Outcomes without such a prediction are dropped.
+    """
+    predictions = predictions.dropna(subset=[id_column, "logged_at"]).reset_index(drop=True)
+    outcomes = outcomes.dropna(subset=[id_column, time_column]).reset_index(drop=True)
+    n_pred = len(predictions)
+    keys = np.concatenate([_id_keys(predictions[id_column]), _id_keys(outcomes[id_column])])
+    times = np.concatenate([_time_ns(predictions["logged_at"]), _time_ns(outcomes[time_column])])
+    is_outcome = np.repeat([0, 1], [n_pred, len(outcomes)])
+    order = np.lexsort((times * 2 + is_outcome, keys))  # predictions sort before same-time outcomes
+    keys, times, is_outcome = keys[order], times[order], is_outcome[order]
+    pos = np.arange(len(order))
+    last_pred = np.maximum.accumulate(np.where(is_outcome == 0, pos, -1))
+    group_start = np.maximum.accumulate(np.where(np.r_[True, keys[1:] != keys[:-1]], pos, 0))
+    hit = (is_outcome == 1) & (last_pred >= group_start)
+    hit &= times - times[np.maximum(last_pred, 0)] <= int(max_delay_days * 86400e9)
+    out_rows = order[hit] - n_pred
+    pred_rows = order[last_pred[hit]]
+    first = pd.Series(pred_rows).duplicated().to_numpy()  # outcomes are time-ordered per customer
+    out_rows, pred_rows = out_rows[~first], pred_rows[~first]
+    joined = outcomes.iloc[out_rows].reset_index(drop=True)
+    for col in ("score", "model_version", "logged_at"):
+        joined[col] = predictions[col].iloc[pred_rows].reset_index(drop=True)
+    return joined
+
+
+def outcome_labels(values: pd.Series, positive_label: Any = "yes") -> np.ndarray:
+    """0/1 labels from 'yes'/'no' strings, booleans or 0/1 numbers."""
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return values.astype(int).to_numpy()
+    return (values.astype(str).str.lower() == str(positive_label).lower()).to_numpy().astype(int)
+
+
+def histogram_rows(
+    joined: pd.DataFrame, labels: np.ndarray, window: str, n_bins: int
+) -> pd.DataFrame:
+    """Per (window, model_version, score bin) label counts and score sums."""
+    scores = joined["score"].to_numpy(dtype=float)
+    logged = pd.to_datetime(joined["logged_at"], utc=True)
+    frame = pd.DataFrame({
+        "window": logged.dt.floor(window).dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "model_version": joined["model_version"].astype(str).to_numpy(),
+        "bin": np.clip((scores * n_bins).astype(np.int64), 0, n_bins - 1),
+        "positives": labels,
+        "negatives": 1 - labels,
+        "score_sum": scores,
+    })
+    return frame.groupby(HIST_COLUMNS[:3], as_index=False).sum()
+
+
+def merge_histograms(state: Optional[pd.DataFrame], rows: pd.DataFrame) -> pd.DataFrame:
+    """Add new histogram rows into the accumulated state."""
+    if state is None or state.empty:
+        return rows[HIST_COLUMNS].reset_index(drop=True)
+    return (
+        pd.concat([state, rows], ignore_index=True)
+        .groupby(HIST_COLUMNS[:3], as_index=False)
+        .sum()[HIST_COLUMNS]
+    )
+
+
+def histogram_metrics(
+    positives: np.ndarray,
+    negatives: np.ndarray,
+    score_sum: np.ndarray,
+    top_fractions: List[float],
+    calibration_bins: int = 10,
+) -> Dict[str, Any]:
+    """ROC-AUC, precision@k, ECE and reliability table from fine score-bin counts."""
+    pos, neg = positives.astype(float), negatives.astype(float)
+    count = pos + neg
+    n, n_pos = count.sum(), pos.sum()
+    out: Dict[str, Any] = {"n": int(n), "positives": int(n_pos)}
+    if n == 0:
+        return out
+    out["positive_rate"] = float(n_pos / n)
+    out["mean_score"] = float(score_sum.sum() / n)
+    # AUC: P(score_pos > score_neg) + 0.5 P(tie), with ties at bin resolution
+    pos_above = np.cumsum(pos[::-1])[::-1] - pos
+    out["roc_auc"] = (
+        float((neg * (pos_above + 0.5 * pos)).sum() / (n_pos * (n - n_pos)))
+        if 0 < n_pos < n
+        else None
+    )
+    cum_n, cum_pos = np.cumsum(count[::-1]), np.cumsum(pos[::-1])
+    for frac in top_fractions:
+        k = max(frac * n, 1.0)
+        i = int(np.searchsorted(cum_n, k))
+        prev_n = cum_n[i - 1] if i else 0.0
+        prev_pos = cum_pos[i - 1] if i else 0.0
+        bin_n = count[::-1][i]
+        # interpolate inside the bin
+        hits = prev_pos + (k - prev_n) * (pos[::-1][i] / bin_n if bin_n else 0.0)
+        out[f"precision_at_{frac:g}"] = float(hits / k)
+    groups = np.array_split(np.arange(len(count)), calibration_bins)
+    reliability = []
+    ece = 0.0
+    for g in groups:
+        g_n = count[g].sum()
+        if g_n == 0:
+            continue
+        mean_score, rate = score_sum[g].sum() / g_n, pos[g].sum() / g_n
+        ece += g_n / n * abs(mean_score - rate)
+        reliability.append(
+            {"mean_score": float(mean_score), "positive_rate": float(rate), "n": int(g_n)}
+        )
+    out["ece"] = float(ece)
+    out["reliability"] = reliability
+    return out
+
+
+def summarize(
+    state: pd.DataFrame,
+    n_bins: int,
+    top_fractions: List[float],
+    calibration_bins: int = 10,
+    rolling_windows: int = 7,
+    reference_auc: Optional[float] = None,
+    max_auc_drop: float = 0.05,
+    min_labels: int = 200,
+) -> Dict[str, Any]:
+    """Per model version: metrics per window and over the trailing rolling_windows windows.
+
+    decay_detected is set when a version's rolling AUC (over >= min_labels outcomes) is
+    more than max_auc_drop below reference_auc.
+    """
+    versions: Dict[str, Any] = {}
+    decayed = []
+    for version, vdf in state.groupby("model_version", sort=True):
+        windows = sorted(vdf["window"].unique())
+        per_window = {}
+        dense = {}
+        for window, wdf in vdf.groupby("window", sort=True):
+            arrays = [
+                np.bincount(wdf["bin"], weights=wdf[c], minlength=n_bins) for c in HIST_COLUMNS[3:]
+            ]
+            dense[window] = arrays
+            per_window[window] = histogram_metrics(*arrays, top_fractions, calibration_bins)
+        recent = windows[-rolling_windows:]
+        rolling = histogram_metrics(
+            *[sum(dense[w][i] for w in recent) for i in range(3)], top_fractions, calibration_bins
+        )
+        rolling["windows"] = recent
+        decay = (
+            reference_auc is not None and rolling.get("roc_auc") is not None
+            and rolling["n"] >= min_labels and rolling["roc_auc"] < reference_auc - max_auc_drop
+        )
+        if decay:
+            decayed.append(version)
+        versions[version] = {
+            "rolling": rolling,
+            "windows": per_window,
+            "decay_detected": bool(decay),
+        }
+    return {
+        "reference_auc": reference_auc,
+        "max_auc_drop": max_auc_drop,
+        "model_versions": versions,
+        "decayed_versions": decayed,
+        "decay_detected": bool(decayed),
+    }
+
+
+def _read_table(path: Path) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    if path.suffix == ".jsonl":
+        return pd.read_json(path, lines=True)
+    from src.serving.batch import iter_input_chunks
+    return pd.concat(list(iter_input_chunks(str(path))), ignore_index=True)
+
+
+def _load_state(state_dir: Path) -> Tuple[Optional[pd.DataFrame], List[str]]:
+    hist, files = state_dir / "histograms.parquet", state_dir / "processed_files.json"
+    if not hist.exists() or not files.exists():
+        return None, []
+    return pd.read_parquet(hist), json.loads(files.read_text(encoding="utf-8"))
+
+
+def _save_state(state_dir: Path, state: pd.DataFrame, processed: List[str]) -> None:
+    state_dir.mkdir(parents=True, exist_ok=True)
+    tmp = state_dir / ".histograms.parquet.tmp"
+    state.to_parquet(tmp, index=False)
+    tmp.replace(state_dir / "histograms.parquet")
+    (state_dir / "processed_files.json").write_text(
+        json.dumps(processed, indent=2), encoding="utf-8"
+    )
+
+
+def update_live_performance(
+    outcomes_dir: Optional[Path] = None,
+    predictions_dir: Optional[Path] = None,
+    state_dir: Optional[Path] = None,
+    cfg: Optional[Dict[str, Any]] = None,
+    reference_auc: Optional[float] = None,
+    now: Optional[pd.Timestamp] = None,
+) -> Dict[str, Any]:
+    """Join outcome files not seen before, fold the settled ones into the state, summarize.
+
+    A file is settled when each of its rows has joined a prediction or is more than
+    max_delay_days old (as of now); other files stay pending and are joined again later.
+    """
+    from src.serving.prediction_log import read_prediction_logs
+
+    cfg = cfg if cfg is not None else get_performance_config()
+    outcomes_dir = Path(outcomes_dir) if outcomes_dir else get_outcomes_dir()
+    state_dir = state_dir or get_state_dir()
+    id_column = cfg.get("id_column", "customer_id")
+    time_column = cfg.get("time_column", "observed_at")
+    n_bins = cfg.get("score_bins", 1000)
+    top_fractions = cfg.get("precision_at", [0.1])
+    state, processed = _load_state(state_dir)
+    seen = set(processed)
+    new_files = (
+        sorted(
+            p
+            for p in outcomes_dir.rglob("*")
+            if p.suffix in (".csv", ".parquet", ".jsonl")
+            and str(p.relative_to(outcomes_dir)) not in seen
+        )
+        if outcomes_dir.exists()
+        else []
+    )
+    max_delay_days = cfg.get("max_delay_days", 30)
+    matched = 0
+    settled: List[Path] = []
+    if new_files:
+        with stage("load_outcomes"):
+            tables = [_read_table(p) for p in new_files]
+            outcomes = pd.concat(tables, ignore_index=True)
+            outcomes["_row"] = np.arange(len(outcomes))
+            file_of = np.repeat(np.arange(len(new_files)), [len(t) for t in tables])
+            observed = pd.to_datetime(outcomes[time_column], utc=True)
+            first_day = observed.min() - pd.Timedelta(days=max_delay_days)
+            predictions = read_prediction_logs(predictions_dir, start_date=f"{first_day:%Y-%m-%d}")
+        joined = None
+        if predictions.empty or id_column not in predictions.columns:
+            logger.warning(
+                "No logged predictions with a %r column; cannot join %d outcomes",
+                id_column,
+                len(outcomes),
+            )
+        else:
+            with stage("join", rows=len(outcomes)):
+                joined = join_outcomes(
+                    predictions, outcomes, id_column, time_column, max_delay_days
+                )
+        has_match = np.zeros(len(outcomes), dtype=bool)
+        if joined is not None:
+            has_match[joined["_row"].to_numpy()] = True
+        # Unmatched outcomes younger than max_delay_days may still meet their prediction
+        cutoff = (now or pd.Timestamp.now(tz="UTC")) - pd.Timedelta(days=max_delay_days)
+        waiting = ~has_match & (observed > cutoff).to_numpy()
+        ready = np.bincount(file_of[waiting], minlength=len(new_files)) == 0
+        settled = [p for p, r in zip(new_files, ready) if r]
+        if len(settled) < len(new_files):
+            logger.info(
+                "%d outcome files wait for %d outcomes without a logged prediction yet",
+                len(new_files) - len(settled),
+                int(waiting.sum()),
+            )
+        if joined is not None:
+            joined = joined[ready[file_of[joined["_row"].to_numpy()]]]
+            with stage("fold", rows=len(joined)):
+                labels = outcome_labels(
+                    joined[cfg.get("label_column", "y")], cfg.get("positive_label", "yes")
+                )
+                state = merge_histograms(
+                    state, histogram_rows(joined, labels, cfg.get("window", "1D"), n_bins)
+                )
+            matched = len(joined)
+        if settled:
+            processed += [str(p.relative_to(outcomes_dir)) for p in settled]
+            _save_state(
+                state_dir,
+                state if state is not None else pd.DataFrame(columns=HIST_COLUMNS),
+                processed,
+            )
+    summary = summarize(
+        state if state is not None else pd.DataFrame(columns=HIST_COLUMNS),
+        n_bins, top_fractions, cfg.get("calibration_bins", 10), cfg.get("rolling_windows", 7),
+        reference_auc, cfg.get("max_auc_drop", 0.05), cfg.get("min_labels", 200),
+    )
+    summary["new_outcome_files"] = len(settled)
+    summary["pending_outcome_files"] = len(new_files) - len(settled)
+    summary["new_matched_outcomes"] = matched
+    return summary
+
+
+@profiled("live_performance")
+def main() -> None:
+    """CLI: fold new outcome files into the live metrics; write reports next to drift's."""
+    from src.monitoring.metrics_store import append_results
+    from src.monitoring.report import write_performance_report
+
+    metrics_path = get_metrics_dir() / "metrics.json"
+    reference_auc = (
+        json.loads(metrics_path.read_text(encoding="utf-8")).get("roc_auc")
+        if metrics_path.exists()
+        else None
+    )
+    results = update_live_performance(reference_auc=reference_auc)
+    with stage("write_results"):
+        path = get_metrics_dir() / "live_performance.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        write_performance_report(results)
+        if results["new_matched_outcomes"]:
+            for version, res in results["model_versions"].items():
+                rolling = {
+                    k: v
+                    for k, v in res["rolling"].items()
+                    if isinstance(v, (int, float)) and v is not None
+                }
+                append_results(
+                    {"live_performance": rolling, "decay_detected": res["decay_detected"]},
+                    model_version=version,
+                )
+    if results["decay_detected"]:
+        logger.warning("Live performance decay for model versions %s", results["decayed_versions"])
+    logger.info(
+        "Live performance: %d new labelled predictions; report at %s",
+        results["new_matched_outcomes"],
+        path,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 """Consume drift + data quality results; output markdown or JSON for Actions."""
 import json
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from src.utils.paths import get_baselines_dir, get_metrics_dir
+from src.utils.paths import get_metrics_dir
 
 
 def write_drift_report(drift_results: Dict[str, Any], output_path: Optional[Path] = None) -> str:
@@ -20,15 +20,59 @@ def write_drift_report(drift_results: Dict[str, Any], output_path: Optional[Path
         for col, psi in drift_results["feature_psi"].items():
             lines.append(f"| {col} | {psi:.4f} |")
         lines.append("")
+    if drift_results.get("category_psi"):
+        chi2 = drift_results.get("category_chi2", {})
+        unseen = drift_results.get("category_unseen_rate", {})
+        lines.append("## Categorical drift")
+        lines.append("| Feature | PSI | Chi2 p-value | Unseen rate |")
+        lines.append("|---------|-----|--------------|-------------|")
+        for col, psi in drift_results["category_psi"].items():
+            p_value = chi2.get(col, {}).get("p_value")
+            p_str = f"{p_value:.4g}" if p_value is not None else "-"
+            lines.append(f"| {col} | {psi:.4f} | {p_str} | {unseen.get(col, 0.0):.2%} |")
+        lines.append("")
     if drift_results.get("score_psi") is not None:
         lines.append(f"## Score PSI: {drift_results['score_psi']:.4f}")
         lines.append("")
+    if drift_results.get("segment_drift"):
+        lines.extend(_segment_drift_lines(drift_results))
     md = "\n".join(lines)
     path.write_text(md, encoding="utf-8")
     return md
 
 
-def write_quality_report(quality_results: Dict[str, Any], output_path: Optional[Path] = None) -> str:
+def _segment_drift_lines(drift_results: Dict[str, Any], top_n: int = 20) -> List[str]:
+    """Markdown table of the segments with the largest feature/score PSI."""
+    rows = []
+    for key, per_segment in drift_results["segment_drift"].items():
+        for label, res in per_segment.items():
+            psis = {**res.get("feature_psi", {}), **res.get("category_psi", {})}
+            if res.get("score_psi") is not None:
+                psis["score"] = res["score_psi"]
+            if not psis:
+                continue
+            worst = max(psis, key=psis.get)
+            rows.append(
+                (psis[worst], key, label, worst, res.get("n", 0), res.get("drift_detected", False))
+            )
+    rows.sort(reverse=True)
+    n_segments = sum(len(v) for v in drift_results["segment_drift"].values())
+    lines = [
+        "## Segment drift",
+        f"{len(drift_results.get('drifted_segments', []))} of {n_segments} segments drifted.",
+        "",
+        "| Segment | Rows | Max PSI | Feature | Drift |",
+        "|---------|------|---------|---------|-------|",
+    ]
+    for psi, key, label, worst, n, drifted in rows[:top_n]:
+        lines.append(f"| {key}={label} | {n} | {psi:.4f} | {worst} | {drifted} |")
+    lines.append("")
+    return lines
+
+
+def write_quality_report(
+    quality_results: Dict[str, Any], output_path: Optional[Path] = None
+) -> str:
     """Format data quality results as markdown. Returns markdown string."""
     path = output_path or get_metrics_dir() / "quality_report.md"
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -42,7 +86,37 @@ def write_quality_report(quality_results: Dict[str, Any], output_path: Optional[
     return md
 
 
-def write_combined_json(drift_results: Dict[str, Any], quality_results: Optional[Dict[str, Any]] = None, output_path: Optional[Path] = None) -> Path:
+def write_performance_report(results: Dict[str, Any], output_path: Optional[Path] = None) -> str:
+    """Format live performance (see src.monitoring.performance) as markdown; returns it."""
+    path = output_path or get_metrics_dir() / "live_performance.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = ["# Live Performance", ""]
+    lines.append(f"**Decay detected:** {results.get('decay_detected', False)}")
+    if results.get("reference_auc") is not None:
+        lines.append(f"**Reference (test) AUC:** {results['reference_auc']:.4f}")
+    lines.append("")
+    for version, res in results.get("model_versions", {}).items():
+        lines.append(f"## Model {version}")
+        lines.append("| Window | Labels | Positive rate | ROC-AUC | ECE |")
+        lines.append("|--------|--------|---------------|---------|-----|")
+        rows = list(res["windows"].items()) + [("rolling", res["rolling"])]
+        for window, m in rows:
+            auc = f"{m['roc_auc']:.4f}" if m.get("roc_auc") is not None else "-"
+            lines.append(
+                f"| {window} | {m['n']} | {m.get('positive_rate', 0.0):.2%} | {auc} "
+                f"| {m.get('ece', 0.0):.4f} |"
+            )
+        lines.append("")
+    md = "\n".join(lines)
+    path.write_text(md, encoding="utf-8")
+    return md
+
+
+def write_combined_json(
+    drift_results: Dict[str, Any],
+    quality_results: Optional[Dict[str, Any]] = None,
+    output_path: Optional[Path] = None,
+) -> Path:
     """Write drift + optional quality to a single JSON for Actions."""
     path = output_path or get_metrics_dir() / "monitoring_report.json"
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,270 @@
+"""Checkpointed, resumable batch scoring of a full customer file.
+
+The input is cut into fixed-size row partitions (partition i = rows [i*P, (i+1)*P)),
+so the same file always yields the same partitions. Each partition is scored with the
+bulk-scoring path (src.serving.batch.score_chunk), written atomically (temp file, fsync,
+rename) as part-NNNNN.parquet, and then gets a part-NNNNN.done marker holding its
+summary. A partition counts as finished only when its marker exists. A rerun of the
+same job skips finished partitions, jumping over the finished leading partitions without
+parsing them, so recovery cost scales with the unfinished work. _SUCCESS is written once
+every partition is done.
+
+A job is identified by a fingerprint of the input (its size and a fixed number of evenly
+spaced blocks, first and last included), model version, partition size and top_k. Keying
+a job reads the same few MiB whatever the file size, and re-fetching an identical file
+(new path or mtime) still resumes the same job; an edit that keeps the size and misses
+every sampled block does not change the key. Reruns of the same job land in the same
+directory and are no-ops once complete.
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from src.utils.config import get_app_config
+from src.utils.logging import get_logger
+from src.utils.paths import get_artifacts_path
+
+logger = get_logger(__name__)
+
+JOB_NAME = "_job.json"
+SUCCESS_NAME = "_SUCCESS"
+
+ScoreFn = Callable[[pd.DataFrame, Optional[int]], Tuple[pd.DataFrame, Dict[str, int]]]
+
+
+def get_batch_scoring_config() -> Dict[str, Any]:
+    """batch_scoring section of app.yaml."""
+    return get_app_config().get("batch_scoring", {})
+
+
+def _part_name(i: int) -> str:
+    return f"part-{i:05d}"
+
+
+def input_fingerprint(input_path: Path, samples: int = 16, block_bytes: int = 1 << 16) -> str:
+    """sha256 of the file size and `samples` evenly spaced blocks (first and last included).
+
+    Reads at most samples * block_bytes bytes, however large the file; smaller files
+    are hashed whole.
+    """
+    size = os.path.getsize(input_path)
+    h = hashlib.sha256(str(size).encode("utf-8"))
+    with open(input_path, "rb") as f:
+        if size <= samples * block_bytes:
+            h.update(f.read())
+        else:
+            for k in range(samples):
+                f.seek((size - block_bytes) * k // (samples - 1))
+                h.update(f.read(block_bytes))
+    return h.hexdigest()
+
+
+def job_id(input_path: Path, model_version: str, partition_rows: int, top_k: Optional[int]) -> str:
+    """Deterministic id of a scoring job (input fingerprint, model version, partitioning)."""
+    key = json.dumps([input_fingerprint(input_path), model_version, partition_rows, top_k])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _write_atomic(path: Path, write: Callable[[Path], None]) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    write(tmp)
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    tmp.replace(path)
+
+
+def _write_json_atomic(path: Path, obj: Dict[str, Any]) -> None:
+    _write_atomic(path, lambda p: p.write_text(json.dumps(obj, indent=2), encoding="utf-8"))
+
+
+def completed_partitions(job_dir: Path) -> Dict[int, Dict[str, Any]]:
+    """{partition index: marker} for partitions whose marker and output both exist."""
+    done = {}
+    for marker in job_dir.glob("part-*.done"):
+        info = json.loads(marker.read_text(encoding="utf-8"))
+        if (job_dir / info["output"]).exists():
+            done[int(info["partition"])] = info
+    return done
+
+
+def _exact_partitions(chunks: Iterator[pd.DataFrame], rows: int) -> Iterator[pd.DataFrame]:
+    """Re-cut a chunk stream into frames of exactly `rows` rows (last one may be shorter)."""
+    pending = []
+    n_pending = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        n_pending += len(chunk)
+        while n_pending >= rows:
+            frame = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            yield frame.iloc[:rows].reset_index(drop=True)
+            rest = frame.iloc[rows:]
+            pending, n_pending = ([rest], len(rest)) if len(rest) else ([], 0)
+    if n_pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def score_partition(
+    job_dir: Path,
+    index: int,
+    df: pd.DataFrame,
+    top_k: Optional[int] = None,
+    score_fn: Optional[ScoreFn] = None,
+) -> Dict[str, Any]:
+    """Score one partition, write its output atomically, then its completion marker."""
+    if score_fn is None:
+        from src.serving.batch import score_chunk as score_fn
+    out, errors = score_fn(df, top_k)
+    name = _part_name(index)
+    output = job_dir / f"{name}.parquet"
+    _write_atomic(output, lambda p: out.to_parquet(p, index=False))
+    marker = {
+        "partition": index,
+        "output": output.name,
+        "rows": len(out),
+        "valid_rows": int(out["valid"].sum()) if "valid" in out else len(out),
+        "errors": errors,
+        "top_offer_counts": (
+            {k: int(v) for k, v in out.loc[out["valid"], "top_offer"].value_counts().items()}
+            if "top_offer" in out else {}
+        ),
+        "bytes": output.stat().st_size,
+    }
+    _write_json_atomic(job_dir / f"{name}.done", marker)
+    return marker
+
+
+def _summarize(done: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "partitions": len(done),
+        "rows": 0,
+        "valid_rows": 0,
+        "errors": {},
+        "top_offer_counts": {},
+    }
+    for info in done.values():
+        summary["rows"] += info["rows"]
+        summary["valid_rows"] += info["valid_rows"]
+        for key in ("errors", "top_offer_counts"):
+            for k, n in info[key].items():
+                summary[key][k] = summary[key].get(k, 0) + n
+    return summary
+
+
+def run_job(
+    input_path: Path,
+    output_dir: Optional[Path] = None,
+    partition_rows: Optional[int] = None,
+    top_k: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    model_version: Optional[str] = None,
+    score_fn: Optional[ScoreFn] = None,
+) -> Dict[str, Any]:
+    """Score input_path into output_dir/<job id>/, resuming any earlier partial run of the same job.
+
+    Returns the job summary (also written to _SUCCESS). score_fn defaults to the
+    bulk-scoring path; n_workers > 1 scores partitions in a process pool.
+    """
+    cfg = get_batch_scoring_config()
+    input_path = Path(input_path)
+    output_dir = (
+        Path(output_dir) if output_dir else get_artifacts_path() / cfg.get("output_dir", "scoring")
+    )
+    partition_rows = partition_rows or cfg.get("partition_rows", 100_000)
+    top_k = top_k if top_k is not None else cfg.get("top_k")
+    n_workers = n_workers or cfg.get("n_workers") or 1
+    if model_version is None:
+        from src.serving.predict import get_model_version, load_model
+        load_model()
+        model_version = get_model_version()
+
+    job_dir = output_dir / job_id(input_path, model_version, partition_rows, top_k)
+    job_dir.mkdir(parents=True, exist_ok=True)
+    if (job_dir / SUCCESS_NAME).exists():
+        logger.info("Scoring job %s already complete", job_dir.name)
+        return json.loads((job_dir / SUCCESS_NAME).read_text(encoding="utf-8"))
+    if not (job_dir / JOB_NAME).exists():
+        _write_json_atomic(job_dir / JOB_NAME, {
+            "input": str(input_path.resolve()),
+            "model_version": model_version,
+            "partition_rows": partition_rows,
+            "top_k": top_k,
+        })
+
+    done = completed_partitions(job_dir)
+    prefix = 0
+    while prefix in done:
+        prefix += 1
+    if done:
+        logger.info("Resuming job %s: %d partitions already done", job_dir.name, len(done))
+
+    from src.serving.batch import iter_input_chunks
+
+    chunks = iter_input_chunks(
+        str(input_path), chunk_rows=partition_rows, skip_rows=prefix * partition_rows
+    )
+    partitions = enumerate(_exact_partitions(chunks, partition_rows), start=prefix)
+    if n_workers <= 1:
+        for i, df in partitions:
+            if i not in done:
+                done[i] = score_partition(job_dir, i, df, top_k, score_fn)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            pending = set()
+            for i, df in partitions:
+                if i in done:
+                    continue
+                if len(pending) >= 2 * n_workers:  # bound partitions held in memory
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in finished:
+                        info = f.result()
+                        done[info["partition"]] = info
+                pending.add(pool.submit(score_partition, job_dir, i, df, top_k, score_fn))
+            for f in pending:
+                info = f.result()
+                done[info["partition"]] = info
+
+    summary = {**_summarize(done), "job_id": job_dir.name, "model_version": model_version}
+    _write_json_atomic(job_dir / SUCCESS_NAME, summary)
+    logger.info(
+        "Scoring job %s complete: %d rows in %d partitions",
+        job_dir.name,
+        summary["rows"],
+        summary["partitions"],
+    )
+    return summary
+
+
+def read_scores(job_dir: Path) -> pd.DataFrame:
+    """Concatenate a completed job's partition outputs in partition order."""
+    if not (Path(job_dir) / SUCCESS_NAME).exists():
+        raise FileNotFoundError(f"Scoring job at {job_dir} has not completed")
+    parts = sorted(Path(job_dir).glob("part-*.parquet"))
+    return pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+
+
+def main() -> None:
+    """CLI: score the configured input (default: raw training extract); rerun to resume."""
+    from src.pipelines.ingest import get_raw_csv_path
+
+    parser = argparse.ArgumentParser(description="Checkpointed batch scoring")
+    parser.add_argument("--input", type=Path, default=None, help="CSV or Parquet file to score")
+    parser.add_argument("--output-dir", type=Path, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    cfg_input = get_batch_scoring_config().get("input")
+    input_path = args.input or (Path(cfg_input) if cfg_input else get_raw_csv_path())
+    if not input_path.exists():
+        logger.warning("No scoring input at %s; skipping batch scoring", input_path)
+        return
+    run_job(input_path, output_dir=args.output_dir, n_workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,29 +12,33 @@ from sklearn.metrics import (
     roc_auc_score,
 )
 
-from src.utils.config import get_model_config
+from src.pipelines.offer_models import load_offer_bundle, score_offer_matrix
 from src.utils.logging import get_logger
 from src.utils.paths import (
     get_metrics_dir,
     get_model_dir,
     get_processed_data_dir,
 )
+from src.utils.profiling import profiled, stage
 
 logger = get_logger(__name__)
 
 
+@profiled("evaluate")
 def main() -> None:
     model_dir = get_model_dir()
     proc_dir = get_processed_data_dir()
     metrics_dir = get_metrics_dir()
     metrics_dir.mkdir(parents=True, exist_ok=True)
 
-    model = joblib.load(model_dir / "model.joblib")
-    X_test = np.load(proc_dir / "X_test.npy")
-    y_test = np.load(proc_dir / "y_test.npy")
+    with stage("load"):
+        model = joblib.load(model_dir / "model.joblib")
+        X_test = np.load(proc_dir / "X_test.npy")
+        y_test = np.load(proc_dir / "y_test.npy")
 
-    y_pred = model.predict(X_test)
-    y_prob = model.predict_proba(X_test)[:, 1]
+    with stage("score", rows=len(X_test)):
+        y_pred = model.predict(X_test)
+        y_prob = model.predict_proba(X_test)[:, 1]
 
     metrics = {
         "roc_auc": float(roc_auc_score(y_test, y_prob)),
@@ -58,6 +62,11 @@ def main() -> None:
     # So we skip segment metrics unless we load raw; keep metrics simple
     metrics["n_test"] = int(len(y_test))
 
+    with stage("offer_metrics", rows=len(X_test)):
+        offer_metrics = _offer_metrics(model_dir, proc_dir, X_test)
+    if offer_metrics:
+        metrics["offer_roc_auc"] = offer_metrics
+
     out_path = metrics_dir / "metrics.json"
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(metrics, f, indent=2)
@@ -70,6 +79,21 @@ def main() -> None:
     logger.info("Report written to %s", report_path)
 
 
+def _offer_metrics(model_dir: Path, proc_dir: Path, X_test: np.ndarray) -> dict:
+    """Per-offer ROC-AUC on the shared test split (empty without offer models)."""
+    bundle = load_offer_bundle(model_dir)
+    labels_path = proc_dir / "Y_offers_test.npy"
+    if bundle is None or not labels_path.exists():
+        return {}
+    Y = np.load(labels_path)
+    scores = score_offer_matrix(bundle, X_test)
+    out = {}
+    for j, offer_id in enumerate(bundle["offers"]):
+        if len(np.unique(Y[:, j])) == 2:
+            out[offer_id] = float(roc_auc_score(Y[:, j], scores[:, j]))
+    return out
+
+
 def _eval_report(metrics: dict) -> str:
     lines = [
         "# Evaluation Report",
@@ -80,6 +104,13 @@ def _eval_report(metrics: dict) -> str:
     for k, v in metrics.items():
         if isinstance(v, float):
             lines.append(f"| {k} | {v:.4f} |")
+        elif isinstance(v, dict):
+            for sub_k, sub_v in v.items():
+                lines.append(f"| {k}.{sub_k} | {sub_v:.4f} |")
         else:
             lines.append(f"| {k} | {v} |")
     return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""Precomputed customer feature store: transformed vectors in a memory-mapped float32 matrix.
+
+The customer base is transformed once, chunk by chunk, into vectors.f32 (rows x
+n_features, row-major float32). Customer ids map to rows through a linear-probing
+hash table kept as two .npy arrays (keys, rows), so a batch of ids resolves in a few
+vectorized probes regardless of store size. Integer ids are used as keys directly;
+other ids are keyed by their 64-bit hash.
+
+refresh_feature_store re-reads the source and re-transforms only rows whose content
+hash changed (overwritten) or whose id is new (appended). Ids missing from the source
+drop out of the hash table. A store built with a different preprocessor is rebuilt from
+scratch. Build and refresh both write a complete new generation next to the store (the
+refresh starts from a copy of the matrix) and swap it in with a rename, so readers and
+failed runs never see a mix of generations. Readers pick up a new generation via
+meta.json.
+
+Usage: python -m src.pipelines.feature_store [--source data.parquet] [--rebuild]
+"""
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.pipelines.features import transform
+from src.utils.config import get_app_config
+from src.utils.logging import get_logger
+from src.utils.paths import artifacts_path_from_env
+
+logger = get_logger(__name__)
+
+VECTORS_NAME = "vectors.f32"
+META_NAME = "meta.json"
+_EMPTY = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def get_feature_store_config() -> Dict[str, Any]:
+    """feature_store section of app.yaml."""
+    return get_app_config().get("feature_store", {})
+
+
+def get_feature_store_dir() -> Path:
+    return artifacts_path_from_env() / get_feature_store_config().get("dir", "feature_store")
+
+
+# --- id hash table -----------------------------------------------------------------
+
+def id_keys(ids: Any, kind: str) -> np.ndarray:
+    """uint64 table keys for ids: the integer itself ("int") or its 64-bit hash ("hash")."""
+    if kind == "int":
+        keys = np.asarray(ids, dtype=np.int64).view(np.uint64)
+        if (keys == _EMPTY).any():
+            raise ValueError("Customer id -1 is reserved")
+        return keys
+    return pd.util.hash_array(np.asarray(ids, dtype=object).astype(str))
+
+
+def _slots(keys: np.ndarray, mask: int) -> np.ndarray:
+    """splitmix64 finalizer: spreads sequential ids over the table."""
+    h = keys ^ (keys >> np.uint64(30))
+    h = h * np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h = h * np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return (h & np.uint64(mask)).astype(np.int64)
+
+
+def _mask(table_keys: np.ndarray) -> int:
+    # the table is a power-of-two home range plus an overflow tail shorter than it
+    return (1 << (len(table_keys).bit_length() - 1)) - 1
+
+
+def build_table(keys: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Linear-probing table (load <= 0.5) mapping keys -> rows; keys must be unique.
+
+    Probing runs past the home range into an overflow tail instead of wrapping, which
+    lets the whole table be placed at once: in home-slot order, each key lands at
+    max(its home, previous key's slot + 1), a running maximum.
+    """
+    sorted_keys = np.sort(keys)
+    if (sorted_keys[1:] == sorted_keys[:-1]).any():
+        raise ValueError("Duplicate customer ids in feature store source")
+    del sorted_keys
+    capacity = 1 << max(4, int(np.ceil(np.log2(2 * len(keys) + 1))))
+    home = _slots(keys, capacity - 1)
+    order = np.argsort(home)
+    rank = np.arange(len(keys))
+    slot = np.maximum.accumulate(home[order] - rank) + rank if len(keys) else rank
+    size = max(capacity, int(slot[-1]) + 1 if len(slot) else 0) + 1  # always ends in an empty slot
+    table_keys = np.full(size, _EMPTY, dtype=np.uint64)
+    table_rows = np.full(size, -1, dtype=np.int64)
+    table_keys[slot] = keys[order]
+    table_rows[slot] = rows[order]
+    return table_keys, table_rows
+
+
+def lookup_table(table_keys: np.ndarray, table_rows: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Row per key, -1 where absent."""
+    out = np.full(len(keys), -1, dtype=np.int64)
+    pending = np.arange(len(keys))
+    pos = _slots(keys, _mask(table_keys))
+    while len(pending):
+        k = table_keys[pos]
+        hit = k == keys[pending]
+        out[pending[hit]] = table_rows[pos[hit]]
+        more = ~hit & (k != _EMPTY)
+        pending, pos = pending[more], pos[more] + 1
+    return out
+
+
+# --- build / refresh ---------------------------------------------------------------
+
+def _write_meta(store_dir: Path, meta: Dict[str, Any]) -> None:
+    tmp = store_dir / (META_NAME + ".tmp")
+    tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    os.replace(tmp, store_dir / META_NAME)
+
+
+def _new_generation(store_dir: Path) -> Path:
+    building = store_dir.with_name(store_dir.name + ".building")
+    shutil.rmtree(building, ignore_errors=True)
+    building.mkdir(parents=True)
+    return building
+
+
+def _swap_in(building: Path, store_dir: Path) -> None:
+    old = store_dir.with_name(store_dir.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if store_dir.exists():
+        os.replace(store_dir, old)
+    os.replace(building, store_dir)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def preprocessor_fingerprint(preprocessor: Any) -> str:
+    """Content hash of a fitted preprocessor; a store is valid only for its own."""
+    import joblib
+    return joblib.hash(preprocessor)
+
+
+def _load_preprocessor(
+    preprocessor: Any, feature_names: Optional[List[str]]
+) -> Tuple[Any, List[str]]:
+    """(preprocessor, feature names); defaults to the served artifacts."""
+    if preprocessor is None:
+        from src.serving.predict import load_model
+        _, preprocessor, feature_names = load_model()
+    return preprocessor, list(feature_names)
+
+
+def _chunks(
+    source: Path, chunk_rows: int, id_column: Optional[str]
+) -> Iterator[Tuple[np.ndarray, pd.DataFrame]]:
+    """(ids, frame) per chunk; ids default to the 0-based row number without an id column."""
+    from src.serving.batch import iter_input_chunks
+
+    start = 0
+    for df in iter_input_chunks(str(source), chunk_rows=chunk_rows):
+        if id_column and id_column in df.columns:
+            ids = df[id_column].to_numpy()
+        else:
+            ids = np.arange(start, start + len(df))
+        start += len(df)
+        yield ids, df
+
+
+def _content_hash(preprocessor: Any, df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(
+        df[list(preprocessor.feature_names_in_)], index=False
+    ).to_numpy()
+
+
+def _vectors(preprocessor: Any, df: pd.DataFrame) -> np.ndarray:
+    X = transform(preprocessor, df)
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
+def build_feature_store(
+    source: Optional[Path] = None,
+    store_dir: Optional[Path] = None,
+    id_column: Optional[str] = None,
+    chunk_rows: Optional[int] = None,
+    preprocessor: Any = None,
+    feature_names: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Transform the whole source into a fresh store (swapped in when complete); return meta."""
+    from src.pipelines.ingest import get_raw_csv_path
+
+    cfg = get_feature_store_config()
+    source = Path(source or cfg.get("source") or get_raw_csv_path())
+    store_dir = Path(store_dir or get_feature_store_dir())
+    id_column = id_column if id_column is not None else cfg.get("id_column")
+    chunk_rows = chunk_rows or cfg.get("chunk_rows", 500_000)
+    preprocessor, feature_names = _load_preprocessor(preprocessor, feature_names)
+    fingerprint = preprocessor_fingerprint(preprocessor)
+
+    building = _new_generation(store_dir)
+    ids, hashes, kind = [], [], None
+    with open(building / VECTORS_NAME, "wb") as f:
+        for chunk_ids, df in _chunks(source, chunk_rows, id_column):
+            kind = kind or (
+                "int" if np.issubdtype(np.asarray(chunk_ids).dtype, np.integer) else "hash"
+            )
+            ids.append(id_keys(chunk_ids, kind))
+            hashes.append(_content_hash(preprocessor, df))
+            f.write(_vectors(preprocessor, df).tobytes())
+    keys = np.concatenate(ids) if ids else np.empty(0, dtype=np.uint64)
+    table_keys, table_rows = build_table(keys, np.arange(len(keys)))
+    np.save(building / "ids.npy", keys)
+    np.save(
+        building / "row_hash.npy",
+        np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64),
+    )
+    np.save(building / "table_keys.npy", table_keys)
+    np.save(building / "table_rows.npy", table_rows)
+    now = datetime.now(tz=timezone.utc).isoformat()
+    meta = {
+        "n_rows": int(len(keys)),
+        "n_live": int(len(keys)),
+        "n_features": len(feature_names),
+        "feature_names": feature_names,
+        "preprocessor_fingerprint": fingerprint,
+        "id_column": id_column,
+        "id_kind": kind or "int",
+        "source": str(source),
+        "built_at": now,
+        "refreshed_at": now,
+        "generation": 0,
+    }
+    _write_meta(building, meta)
+    _swap_in(building, store_dir)
+    logger.info(
+        "Feature store built: %d customers x %d features at %s",
+        len(keys),
+        len(feature_names),
+        store_dir,
+    )
+    return meta
+
+
+def refresh_feature_store(
+    source: Optional[Path] = None,
+    store_dir: Optional[Path] = None,
+    chunk_rows: Optional[int] = None,
+    preprocessor: Any = None,
+    feature_names: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Re-transform only changed or new customers; full build if missing or stale. Returns meta."""
+    cfg = get_feature_store_config()
+    store_dir = Path(store_dir or get_feature_store_dir())
+    chunk_rows = chunk_rows or cfg.get("chunk_rows", 500_000)
+    preprocessor, feature_names = _load_preprocessor(preprocessor, feature_names)
+    fingerprint = preprocessor_fingerprint(preprocessor)
+    meta_path = store_dir / META_NAME
+    meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else None
+    if (
+        meta is None
+        or meta["preprocessor_fingerprint"] != fingerprint
+        or meta["feature_names"] != feature_names
+    ):
+        logger.info("Feature store missing or built with another preprocessor; rebuilding")
+        return build_feature_store(
+            source, store_dir, cfg.get("id_column"), chunk_rows, preprocessor, feature_names
+        )
+
+    source = Path(source or meta["source"])
+    n_features = meta["n_features"]
+    keys = np.load(store_dir / "ids.npy")
+    row_hash = np.load(store_dir / "row_hash.npy")
+    table_keys, table_rows = (
+        np.load(store_dir / "table_keys.npy"),
+        np.load(store_dir / "table_rows.npy"),
+    )
+    n_old = len(keys)
+    building = _new_generation(store_dir)
+    try:
+        # Sequential copy of the matrix: far cheaper than re-transforming it
+        shutil.copyfile(store_dir / VECTORS_NAME, building / VECTORS_NAME)
+        vectors = None
+        if n_old:
+            vectors = np.memmap(
+                building / VECTORS_NAME, dtype=np.float32, mode="r+", shape=(n_old, n_features)
+            )
+        seen = np.zeros(n_old, dtype=bool)
+        new_keys, new_hashes = [], []
+        stats = {"unchanged": 0, "updated": 0, "added": 0, "removed": 0}
+        with open(building / VECTORS_NAME, "ab") as appended:
+            for chunk_ids, df in _chunks(source, chunk_rows, meta["id_column"]):
+                chunk_keys = id_keys(chunk_ids, meta["id_kind"])
+                hashes = _content_hash(preprocessor, df)
+                rows = lookup_table(table_keys, table_rows, chunk_keys)
+                known = rows >= 0
+                seen[rows[known]] = True
+                changed = known & (row_hash[np.maximum(rows, 0)] != hashes)
+                if changed.any():
+                    vectors[rows[changed]] = _vectors(preprocessor, df.loc[changed])
+                    row_hash[rows[changed]] = hashes[changed]
+                if (~known).any():
+                    appended.write(_vectors(preprocessor, df.loc[~known]).tobytes())
+                    new_keys.append(chunk_keys[~known])
+                    new_hashes.append(hashes[~known])
+                stats["unchanged"] += int((known & ~changed).sum())
+                stats["updated"] += int(changed.sum())
+                stats["added"] += int((~known).sum())
+        if vectors is not None:
+            vectors.flush()
+            del vectors
+        live = np.flatnonzero(lookup_table(table_keys, table_rows, keys) >= 0)
+        stats["removed"] = int(len(live) - seen[live].sum())
+        if new_keys or stats["removed"]:
+            keys = np.concatenate([keys] + new_keys)
+            row_hash = np.concatenate([row_hash] + new_hashes)
+            live = np.concatenate([live[seen[live]], np.arange(n_old, len(keys))])
+            table_keys, table_rows = build_table(keys[live], live)
+        np.save(building / "ids.npy", keys)
+        np.save(building / "row_hash.npy", row_hash)
+        np.save(building / "table_keys.npy", table_keys)
+        np.save(building / "table_rows.npy", table_rows)
+    except BaseException:
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+    meta.update({
+        "n_rows": int(len(keys)),
+        "n_live": int(len(live)),
+        "source": str(source),
+        "refreshed_at": datetime.now(tz=timezone.utc).isoformat(),
+        "generation": meta["generation"] + 1,
+        "last_refresh": stats,
+    })
+    _write_meta(building, meta)
+    _swap_in(building, store_dir)
+    logger.info("Feature store refreshed: %s", stats)
+    return meta
+
+
+# --- reader ------------------------------------------------------------------------
+
+class FeatureStore:
+    """Read-only view of a store: id lookup and vector gather over the memory-mapped matrix."""
+
+    def __init__(self, store_dir: Optional[Path] = None) -> None:
+        self.store_dir = Path(store_dir or get_feature_store_dir())
+        if not (self.store_dir / META_NAME).exists():
+            raise FileNotFoundError(
+                f"Feature store not found at {self.store_dir}. Run 'make feature-store' first."
+            )
+        self.preprocessor: Any = None  # set by the serving layer once the fingerprint is checked
+        self._open()
+
+    def _meta_stamp(self) -> Tuple[int, int]:
+        st = os.stat(self.store_dir / META_NAME)
+        return st.st_ino, st.st_mtime_ns
+
+    def _open(self) -> None:
+        while True:
+            stamp = self._meta_stamp()
+            table_keys = np.load(self.store_dir / "table_keys.npy", mmap_mode="r")
+            table_rows = np.load(self.store_dir / "table_rows.npy", mmap_mode="r")
+            meta = json.loads((self.store_dir / META_NAME).read_text(encoding="utf-8"))
+            n_features = meta["n_features"]
+            n_rows = (
+                os.path.getsize(self.store_dir / VECTORS_NAME) // (4 * n_features)
+                if n_features
+                else 0
+            )
+            vectors = (
+                np.memmap(
+                    self.store_dir / VECTORS_NAME,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(n_rows, n_features),
+                )
+                if n_rows
+                else np.empty((0, n_features), dtype=np.float32)
+            )
+            if self._meta_stamp() == stamp:  # no swap while opening: all files from one generation
+                break
+        self._stamp, self.meta = stamp, meta
+        self.table_keys, self.table_rows, self.vectors = table_keys, table_rows, vectors
+
+    def reopen_if_changed(self) -> bool:
+        """Pick up a new generation (meta.json replaced); True if reopened."""
+        try:
+            if self._meta_stamp() == self._stamp:
+                return False
+            self._open()
+        except FileNotFoundError:  # mid-swap: keep serving the open generation
+            return False
+        return True
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.meta["feature_names"]
+
+    def rows(self, ids: Sequence[Any]) -> np.ndarray:
+        """Matrix row per id, -1 for unknown ids."""
+        keys = id_keys(np.atleast_1d(np.asarray(ids)), self.meta["id_kind"])
+        return lookup_table(self.table_keys, self.table_rows, keys)
+
+    def get(self, ids: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """(vectors for the found ids, found mask over ids)."""
+        rows = self.rows(ids)
+        found = rows >= 0
+        return self.vectors[rows[found]], found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or refresh the customer feature store")
+    parser.add_argument(
+        "--source", type=Path, default=None, help="CSV or Parquet (default: app.yaml / raw CSV)"
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="full rebuild instead of an incremental refresh"
+    )
+    args = parser.parse_args()
+    if args.rebuild:
+        meta = build_feature_store(args.source)
+    else:
+        meta = refresh_feature_store(args.source)
+    logger.info(
+        "Feature store: %d customers x %d features at %s",
+        meta["n_live"],
+        meta["n_features"],
+        get_feature_store_dir(),
+    )
+
+
+if __name__ == "__main__":
+    main()
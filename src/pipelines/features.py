@@ -1,11 +1,19 @@
-"""Feature engineering: encode categoricals, scale numericals."""
+"""Feature engineering: encode categoricals, scale numericals.
+
+Categoricals are one-hot encoded (first level dropped) by default. With
+categorical_encoding.mode: bounded in model.yaml they use BoundedCategoricalEncoder,
+whose width and fitted state do not grow with cardinality (rare-level pooling,
+hashing, count or target encoding).
+"""
 from pathlib import Path
-from typing import Any, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import joblib
 import numpy as np
 import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin, clone
 from sklearn.compose import ColumnTransformer
+from sklearn.model_selection import KFold
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
 from src.utils.config import get_model_config
@@ -14,6 +22,9 @@ from src.utils.paths import get_model_dir
 
 logger = get_logger(__name__)
 
+# Name prefix of the encoders extend_preprocessor appends for new category levels
+EXTENSION_PREFIX = "cat_ext_"
+
 
 def get_feature_columns() -> Tuple[List[str], List[str]]:
     """Return (numerical_cols, categorical_cols) from config."""
@@ -24,12 +35,34 @@ def get_feature_columns() -> Tuple[List[str], List[str]]:
     return num, cat
 
 
-def build_preprocessor(
+def get_encoding_config() -> Dict[str, Any]:
+    """categorical_encoding section of model.yaml."""
+    return get_model_config().get("categorical_encoding", {})
+
+
+def _categorical_encoder(cfg: Dict[str, Any]) -> Any:
+    mode = cfg.get("mode", "onehot")
+    if mode == "onehot":
+        return OneHotEncoder(drop="first", handle_unknown="ignore")
+    if mode == "bounded":
+        return BoundedCategoricalEncoder(
+            min_frequency=cfg.get("min_frequency", 0.005),
+            max_onehot_levels=cfg.get("max_onehot_levels", 30),
+            high_cardinality=cfg.get("high_cardinality", "hash"),
+            hash_width=cfg.get("hash_width", 32),
+            target_smoothing=cfg.get("target_smoothing", 20.0),
+            target_folds=cfg.get("target_folds", 5),
+            strategies=cfg.get("columns") or None,
+        )
+    raise ValueError(f"Unknown categorical_encoding mode {mode!r}; expected onehot or bounded")
+
+
+def _new_preprocessor(
     df: pd.DataFrame,
-    numerical: Optional[List[str]] = None,
-    categorical: Optional[List[str]] = None,
-) -> Tuple[ColumnTransformer, List[str]]:
-    """Build and fit a ColumnTransformer; return transformer and feature names out."""
+    numerical: Optional[List[str]],
+    categorical: Optional[List[str]],
+    encoding: Optional[Dict[str, Any]],
+) -> Tuple[ColumnTransformer, List[str], List[str]]:
     num_cols, cat_cols = get_feature_columns()
     if numerical is not None:
         num_cols = [c for c in numerical if c in df.columns]
@@ -41,19 +74,62 @@ def build_preprocessor(
     transformer = ColumnTransformer(
         [
             ("num", StandardScaler(), num_cols),
-            ("cat", OneHotEncoder(drop="first", handle_unknown="ignore"), cat_cols),
+            (
+                "cat",
+                _categorical_encoder(encoding if encoding is not None else get_encoding_config()),
+                cat_cols,
+            ),
         ],
         remainder="drop",
+        # always dense: every consumer scores dense matrices, and the sparse/dense choice
+        # would otherwise flip with the one-hot density of the training data
+        sparse_threshold=0.0,
     )
-    X = df[num_cols + cat_cols]
-    transformer.fit(X)
-    # Get output feature names
-    num_names = num_cols
+    return transformer, num_cols, cat_cols
+
+
+def _feature_names(
+    transformer: ColumnTransformer, num_cols: List[str], cat_cols: List[str]
+) -> List[str]:
     cat_enc = transformer.named_transformers_["cat"]
-    cat_names = cat_enc.get_feature_names_out(cat_cols).tolist()
-    feature_names = num_names + cat_names
+    feature_names = num_cols + cat_enc.get_feature_names_out(cat_cols).tolist()
     logger.info("Preprocessor fitted: %d features", len(feature_names))
-    return transformer, feature_names
+    return feature_names
+
+
+def build_preprocessor(
+    df: pd.DataFrame,
+    numerical: Optional[List[str]] = None,
+    categorical: Optional[List[str]] = None,
+    y: Optional[np.ndarray] = None,
+    encoding: Optional[Dict[str, Any]] = None,
+) -> Tuple[ColumnTransformer, List[str]]:
+    """Build and fit a ColumnTransformer; return transformer and feature names out.
+
+    encoding overrides the categorical_encoding config; y (binary target) is only
+    needed for target encoding.
+    """
+    transformer, num_cols, cat_cols = _new_preprocessor(df, numerical, categorical, encoding)
+    transformer.fit(df[num_cols + cat_cols], y)
+    return transformer, _feature_names(transformer, num_cols, cat_cols)
+
+
+def fit_transform_preprocessor(
+    df: pd.DataFrame,
+    numerical: Optional[List[str]] = None,
+    categorical: Optional[List[str]] = None,
+    y: Optional[np.ndarray] = None,
+    encoding: Optional[Dict[str, Any]] = None,
+) -> Tuple[ColumnTransformer, List[str], np.ndarray]:
+    """build_preprocessor plus the model input matrix for the rows it was fitted on.
+
+    Train models on this matrix rather than on transform(df): target-encoded columns
+    in it are out of fold (see BoundedCategoricalEncoder.fit_transform), so no row
+    sees its own label.
+    """
+    transformer, num_cols, cat_cols = _new_preprocessor(df, numerical, categorical, encoding)
+    X = transformer.fit_transform(df[num_cols + cat_cols], y)
+    return transformer, _feature_names(transformer, num_cols, cat_cols), np.asarray(X)
 
 
 def transform(
@@ -69,6 +145,308 @@ def transform(
     return preprocessor.transform(X)
 
 
+class LevelIndicators(TransformerMixin, BaseEstimator):
+    """One 0/1 column per (column, level) in `levels`; any other value encodes as zeros.
+
+    Used for category levels added after the main encoder was fitted. Unlike a
+    OneHotEncoder with handle_unknown="ignore" it does not warn about the (expected)
+    levels it does not cover.
+    """
+
+    def __init__(self, levels: Optional[Dict[str, List[str]]] = None) -> None:
+        self.levels = levels
+
+    def fit(self, X: pd.DataFrame, y: Any = None) -> "LevelIndicators":
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.categories_ = [np.asarray(self.levels[c], dtype=object) for c in X.columns]
+        return self
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        blocks = [
+            X[c].astype(str).to_numpy()[:, None] == cats[None, :].astype(str)
+            for c, cats in zip(self.feature_names_in_, self.categories_)
+        ]
+        return np.hstack(blocks).astype(float)
+
+    def get_feature_names_out(self, input_features: Any = None) -> np.ndarray:
+        return np.asarray(
+            [f"{c}_{v}" for c, cats in zip(self.feature_names_in_, self.categories_) for v in cats],
+            dtype=object,
+        )
+
+
+class BoundedCategoricalEncoder(TransformerMixin, BaseEstimator):
+    """Categorical encoder whose output width does not grow with cardinality.
+
+    Levels seen in fewer than min_frequency of the training rows (a fraction, or a row
+    count when >= 1) are pooled, and only the remaining levels are stored. Each column
+    is then encoded as one of:
+
+    - onehot: one column per kept level plus "<col>_infrequent" for pooled and unseen levels
+    - hash: hash_width columns; a level sets the column its (process-stable) hash selects
+    - count: one column, the level's training frequency
+    - target: one column, the level's target rate shrunk towards the overall rate with
+      target_smoothing pseudo-rows (m-estimate); needs y at fit. fit_transform encodes
+      the training rows out of fold (target_folds folds) so they do not see their own
+      label; transform uses the rates from all training rows.
+
+    Columns with at most max_onehot_levels distinct levels use onehot, wider ones use
+    high_cardinality; strategies ({column: strategy}) fixes the choice per column.
+    Nulls encode like unseen levels (all zeros when hashed).
+    """
+
+    STRATEGIES = ("onehot", "hash", "count", "target")
+
+    def __init__(
+        self,
+        min_frequency: float = 0.005,
+        max_onehot_levels: int = 30,
+        high_cardinality: str = "hash",
+        hash_width: int = 32,
+        target_smoothing: float = 20.0,
+        strategies: Optional[Dict[str, str]] = None,
+        target_folds: int = 5,
+        random_state: Optional[int] = 0,
+    ) -> None:
+        self.min_frequency = min_frequency
+        self.max_onehot_levels = max_onehot_levels
+        self.high_cardinality = high_cardinality
+        self.hash_width = hash_width
+        self.target_smoothing = target_smoothing
+        self.strategies = strategies
+        self.target_folds = target_folds
+        self.random_state = random_state
+
+    def fit(self, X: pd.DataFrame, y: Any = None) -> "BoundedCategoricalEncoder":
+        n = len(X)
+        min_count = max(
+            self.min_frequency if self.min_frequency >= 1 else self.min_frequency * n, 1
+        )
+        y = None if y is None else np.asarray(y, dtype=float)
+        m = float(self.target_smoothing)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.categories_, self.encodings_, self.offsets_ = [], [], []
+        offset = 0
+        for c in self.feature_names_in_:
+            s = X[c]
+            valid = s.notna().to_numpy()
+            codes, levels = pd.factorize(s[valid].astype(str).to_numpy())
+            counts = np.bincount(codes, minlength=len(levels))
+            keep = np.flatnonzero(counts >= min_count)
+            keep = keep[np.argsort(levels[keep])]
+            strategy = (self.strategies or {}).get(c) or (
+                "onehot" if len(levels) <= self.max_onehot_levels else self.high_cardinality
+            )
+            if strategy not in self.STRATEGIES:
+                raise ValueError(
+                    f"{c}: unknown encoding {strategy!r}; expected one of {self.STRATEGIES}"
+                )
+            pooled = np.ones(len(levels), dtype=bool)
+            pooled[keep] = False
+            enc: Dict[str, Any] = {"strategy": strategy, "values": None, "default": 0.0}
+            if strategy == "onehot":
+                enc["width"] = len(keep) + 1
+            elif strategy == "hash":
+                enc["width"] = int(self.hash_width)
+            else:
+                enc["width"] = 1
+            if strategy == "count":
+                enc["values"] = counts[keep] / n
+                enc["default"] = counts[pooled].sum() / max(pooled.sum(), 1) / n
+            elif strategy == "target":
+                if y is None:
+                    raise ValueError(f"{c}: target encoding needs y")
+                prior = float(y.mean())
+                sums = np.bincount(codes, weights=y[valid], minlength=len(levels))
+                enc["values"] = (sums[keep] + m * prior) / (counts[keep] + m)
+                enc["default"] = float((sums[pooled].sum() + (y[~valid].sum()) + m * prior)
+                                       / (counts[pooled].sum() + (~valid).sum() + m))
+            self.categories_.append(np.asarray(levels[keep], dtype=object))
+            self.encodings_.append(enc)
+            self.offsets_.append(offset)
+            offset += enc["width"]
+        return self
+
+    def fit_transform(self, X: pd.DataFrame, y: Any = None, **fit_params: Any) -> np.ndarray:
+        """fit(X, y).transform(X), except that target columns are encoded out of fold.
+
+        Each row gets the rates fitted on the other folds, so the training matrix does
+        not leak its own labels into the target columns.
+        """
+        out = self.fit(X, y).transform(X)
+        target = [i for i, e in enumerate(self.encodings_) if e["strategy"] == "target"]
+        if not target or self.target_folds < 2 or len(X) < 2:
+            return out
+        names = [self.feature_names_in_[i] for i in target]
+        # same strategy as the full fit, whatever the fold's cardinality
+        fold_encoder = clone(self).set_params(strategies={c: "target" for c in names})
+        y = np.asarray(y, dtype=float)
+        cols = [self.offsets_[i] for i in target]
+        folds = KFold(min(self.target_folds, len(X)), shuffle=True, random_state=self.random_state)
+        for fit_rows, held_rows in folds.split(X):
+            fold_encoder.fit(X.iloc[fit_rows][names], y[fit_rows])
+            out[np.ix_(held_rows, cols)] = fold_encoder.transform(X.iloc[held_rows][names])
+        return out
+
+    def encode_levels(self, i: int, levels: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """(output offset within column i's block, value) per level; offset -1 = no output.
+
+        None / NaN levels are nulls. Shared by transform and the columnar path, which
+        both call it on the distinct levels of a batch rather than on every row.
+        """
+        enc, cats = self.encodings_[i], self.categories_[i]
+        null = np.asarray(
+            [v is None or (isinstance(v, float) and np.isnan(v)) for v in levels], dtype=bool
+        )
+        names = np.asarray([str(v) for v in levels], dtype=object)
+        idx = pd.Index(cats).get_indexer(names)
+        idx[null] = -1
+        values = np.ones(len(levels))
+        if enc["strategy"] == "onehot":
+            offsets = np.where(idx >= 0, idx, len(cats))
+        elif enc["strategy"] == "hash":
+            offsets = (pd.util.hash_array(names) % np.uint64(enc["width"])).astype(np.int64)
+            offsets[null] = -1
+        else:
+            offsets = np.zeros(len(levels), dtype=np.int64)
+            values = np.append(enc["values"], enc["default"])[idx]  # idx -1: pooled, unseen or null
+        return offsets.astype(np.int64), values
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        out = np.zeros((len(X), sum(e["width"] for e in self.encodings_)))
+        rows = np.arange(len(X))
+        for i, c in enumerate(self.feature_names_in_):
+            codes, levels = pd.factorize(X[c].to_numpy(dtype=object), use_na_sentinel=True)
+            offsets, values = self.encode_levels(i, list(levels) + [None])  # codes == -1 -> last
+            target = offsets[codes]
+            hit = target >= 0
+            out[rows[hit], self.offsets_[i] + target[hit]] = values[codes][hit]
+        return out
+
+    def get_feature_names_out(self, input_features: Any = None) -> np.ndarray:
+        names = []
+        for c, cats, enc in zip(self.feature_names_in_, self.categories_, self.encodings_):
+            if enc["strategy"] == "onehot":
+                names += [f"{c}_{v}" for v in cats] + [f"{c}_infrequent"]
+            elif enc["strategy"] == "hash":
+                names += [f"{c}_hash{j}" for j in range(enc["width"])]
+            else:
+                names.append(f"{c}_{enc['strategy']}")
+        return np.asarray(names, dtype=object)
+
+
+class ExtendedPreprocessor(TransformerMixin, BaseEstimator):
+    """A fitted ColumnTransformer followed by encoders for category levels added later.
+
+    extensions is a list of fitted (name, transformer, columns); their outputs are
+    appended after the preprocessor's, so its output columns keep their positions. The
+    fitted-ColumnTransformer attributes the rest of the code reads (transformers_,
+    output_indices_, ...) are derived from the parts, leaving sklearn's state untouched.
+    """
+
+    def __init__(
+        self,
+        preprocessor: Optional[ColumnTransformer] = None,
+        extensions: Optional[List[Tuple[str, Any, List[str]]]] = None,
+    ) -> None:
+        self.preprocessor = preprocessor
+        self.extensions = extensions
+
+    def fit(self, X: pd.DataFrame, y: Any = None) -> "ExtendedPreprocessor":
+        return self  # the parts are already fitted
+
+    @property
+    def feature_names_in_(self) -> np.ndarray:
+        return self.preprocessor.feature_names_in_
+
+    @property
+    def n_features_in_(self) -> int:
+        return self.preprocessor.n_features_in_
+
+    @property
+    def transformers_(self) -> List[Tuple[str, Any, List[str]]]:
+        return list(self.preprocessor.transformers_) + list(self.extensions or [])
+
+    @property
+    def named_transformers_(self) -> Dict[str, Any]:
+        return {name: t for name, t, _ in self.transformers_}
+
+    @property
+    def output_indices_(self) -> Dict[str, slice]:
+        indices = dict(self.preprocessor.output_indices_)
+        start = max((s.stop for s in indices.values()), default=0)
+        for name, t, _ in self.extensions or []:
+            width = len(t.get_feature_names_out())
+            indices[name] = slice(start, start + width)
+            start += width
+        return indices
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        blocks = [np.asarray(self.preprocessor.transform(X))]
+        blocks += [t.transform(X[cols]) for _, t, cols in self.extensions or []]
+        return np.hstack(blocks)
+
+
+def get_category_vocabulary(preprocessor: Any) -> Dict[str, List[str]]:
+    """Return {column: categories} from the fitted categorical encoder (encoder order).
+
+    Levels added later by extend_preprocessor follow the original ones. For a
+    BoundedCategoricalEncoder these are the kept (non-pooled) levels.
+    """
+    vocab: Dict[str, List[str]] = {}
+    for name, enc, cols in preprocessor.transformers_:
+        if name == "cat" or name.startswith(EXTENSION_PREFIX):
+            for c, cats in zip(cols, enc.categories_):
+                vocab.setdefault(c, []).extend(str(v) for v in cats)
+    return vocab
+
+
+def extend_preprocessor(
+    preprocessor: Any,
+    feature_names: List[str],
+    df: pd.DataFrame,
+) -> Tuple[Any, List[str], Dict[str, List[str]]]:
+    """Add one-hot columns for category levels in df the preprocessor has not seen.
+
+    New levels get their own encoder ("cat_ext_<n>"), appended after the existing ones
+    by an ExtendedPreprocessor, so every current output column keeps its position and
+    models fitted on the old matrix stay valid on the wider one. Returns (preprocessor,
+    feature_names, {column: new levels}). A BoundedCategoricalEncoder already maps new
+    levels (pooled or hashed), so such a preprocessor is returned unchanged.
+    """
+    if isinstance(preprocessor.named_transformers_.get("cat"), BoundedCategoricalEncoder):
+        return preprocessor, feature_names, {}
+    vocab = get_category_vocabulary(preprocessor)
+    new_levels = {}
+    for col, known in vocab.items():
+        if col in df.columns:
+            levels = sorted(set(df[col].dropna().astype(str)) - set(known))
+            if levels:
+                new_levels[col] = levels
+    if not new_levels:
+        return preprocessor, feature_names, {}
+
+    cols = list(new_levels)
+    n_ext = sum(name.startswith(EXTENSION_PREFIX) for name, _, _ in preprocessor.transformers_)
+    ext_name = f"{EXTENSION_PREFIX}{n_ext + 1}"
+    ext = LevelIndicators(new_levels).fit(df[cols])
+    if isinstance(preprocessor, ExtendedPreprocessor):
+        base, extensions = preprocessor.preprocessor, list(preprocessor.extensions or [])
+    else:
+        base, extensions = preprocessor, []
+    extended = ExtendedPreprocessor(base, extensions + [(ext_name, ext, cols)])
+
+    feature_names = list(feature_names) + ext.get_feature_names_out().tolist()
+    logger.info(
+        "Preprocessor extended with %d new levels: %s",
+        sum(len(v) for v in new_levels.values()),
+        ", ".join(f"{c}={v}" for c, v in new_levels.items()),
+    )
+    return extended, feature_names, new_levels
+
+
 def save_preprocessor(
     preprocessor: ColumnTransformer,
     feature_names: List[str],
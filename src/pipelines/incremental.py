@@ -0,0 +1,364 @@
+"""Incremental retrain: extend the current model with only the rows added since the last run.
+
+train.py records how many raw rows it consumed in training_state.json. This entry point
+reads only the rows after that watermark, appends one-hot columns for any new category
+levels (features.extend_preprocessor), and updates the fitted models in place:
+- Gradient boosting gets `add_estimators` more stages via warm start, fitted to the
+  residuals of the current ensemble on the new rows.
+- Logistic regression continues from its current weights for a capped number of
+  iterations.
+Offer models and challengers are extended the same way. New rows are split into
+train/holdout, and the holdout compares the previous, incremental and (optionally) a
+from-scratch full retrain model in artifacts/metrics/incremental_report.json.
+
+The raw file must be append-only history that grows between runs; the UCI download is
+a fixed snapshot, so against it every run after the first full one is skipped.
+"""
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from src.governance.audit import log_action
+from src.pipelines.features import (
+    extend_preprocessor,
+    fit_transform_preprocessor,
+    load_preprocessor,
+    save_preprocessor,
+    transform,
+)
+from src.pipelines.ingest import get_raw_csv_path, load_raw
+from src.pipelines.offer_models import (
+    get_offer_config,
+    load_offer_bundle,
+    offer_feature_index,
+    offer_labels,
+    save_offer_bundle,
+)
+from src.serving.manifest import MANIFEST_NAME
+from src.serving.shadow import CHALLENGER_DIR
+from src.utils.config import get_model_config
+from src.utils.logging import get_logger
+from src.utils.paths import get_metrics_dir, get_model_dir, get_processed_data_dir
+from src.utils.profiling import profiled, stage
+
+logger = get_logger(__name__)
+
+STATE_NAME = "training_state.json"
+
+
+def get_incremental_config() -> Dict[str, Any]:
+    """incremental section of model.yaml."""
+    return get_model_config().get("incremental", {})
+
+
+def read_training_state(model_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """training_state.json from the model dir, or {} if no run has recorded one."""
+    path = (model_dir or get_model_dir()) / STATE_NAME
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_training_state(
+    model_dir: Path, rows_seen: int, mode: str, rows_added: int
+) -> Dict[str, Any]:
+    """Record the raw-row watermark and append this run to the history."""
+    state = read_training_state(model_dir) if mode == "incremental" else {}
+    run = {"mode": mode, "rows": rows_added, "at": datetime.now(tz=timezone.utc).isoformat()}
+    state = {"rows_seen": int(rows_seen), "runs": state.get("runs", []) + [run]}
+    (model_dir / STATE_NAME).write_text(json.dumps(state, indent=2), encoding="utf-8")
+    return state
+
+
+def load_new_rows(rows_seen: int, path: Optional[Path] = None) -> pd.DataFrame:
+    """Raw rows after the first rows_seen (the raw file is append-only campaign history)."""
+    p = path or get_raw_csv_path()
+    df = load_raw(p, skip_rows=rows_seen)
+    if len(df) == 0:
+        with open(p, "rb") as f:
+            n_rows = sum(1 for _ in f) - 1
+        if n_rows < rows_seen:
+            raise ValueError(
+                f"{p} has {n_rows} rows but {rows_seen} were already trained on; run a full retrain"
+            )
+    return df
+
+
+def widen_model(model: Any, n_features: int) -> Any:
+    """Let a fitted model accept n_features inputs; the added trailing inputs get no weight.
+
+    Old trees never split on the new columns and linear weights for them start at zero,
+    so predictions on the original columns are unchanged. Trees are rebuilt from their
+    pickled state, which is sklearn-internal; hence the exact scikit-learn pin.
+    """
+    from sklearn.tree._tree import Tree
+
+    n_old = model.n_features_in_
+    if n_features == n_old:
+        return model
+    if n_features < n_old:
+        raise ValueError(f"Cannot narrow a model from {n_old} to {n_features} features")
+    if isinstance(model, GradientBoostingClassifier):
+        for est in model.estimators_.ravel():
+            tree = Tree(n_features, est.tree_.n_classes, est.tree_.n_outputs)
+            tree.__setstate__(est.tree_.__getstate__())
+            est.tree_ = tree
+            est.n_features_in_ = n_features
+    elif isinstance(model, LogisticRegression):
+        model.coef_ = np.hstack([model.coef_, np.zeros((model.coef_.shape[0], n_features - n_old))])
+    else:
+        raise ValueError(
+            "Incremental retrain supports gradient boosting and logistic regression, "
+            f"got {type(model).__name__}"
+        )
+    model.n_features_in_ = n_features
+    return model
+
+
+def extend_model(
+    model: Any, X: np.ndarray, y: np.ndarray, add_estimators: int, linear_max_iter: int
+) -> bool:
+    """Widen model to X and continue fitting it on (X, y); False if y has a single class."""
+    widen_model(model, X.shape[1])
+    if len(np.unique(y)) < 2:
+        return False
+    if isinstance(model, GradientBoostingClassifier):
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + add_estimators)
+        model.fit(X, y)
+        model.set_params(warm_start=False)
+    else:
+        max_iter = model.max_iter
+        model.set_params(warm_start=True, max_iter=linear_max_iter)
+        model.fit(X, y)
+        model.set_params(warm_start=False, max_iter=max_iter)
+    return True
+
+
+def extend_offer_bundle(
+    bundle: Dict[str, Any],
+    X: np.ndarray,
+    labels: Dict[str, np.ndarray],
+    feature_names: List[str],
+    add_estimators: int,
+    linear_max_iter: int,
+) -> Dict[str, Any]:
+    """Extend each offer model on its column subset of the widened matrix."""
+    targets = get_offer_config().get("targets", {})
+    for offer_id in bundle["offers"]:
+        idx = offer_feature_index(feature_names, targets.get(offer_id, {}).get("exclude_features"))
+        old = bundle["feature_idx"][offer_id]
+        if not np.array_equal(idx[: len(old)], old):
+            raise ValueError(f"Offer {offer_id!r} column layout changed; run a full retrain")
+        bundle["feature_idx"][offer_id] = idx
+        model = widen_model(bundle["models"][offer_id], len(idx))
+        y = labels.get(offer_id)
+        if y is None or not extend_model(model, X[:, idx], y, add_estimators, linear_max_iter):
+            logger.info("Offer %s: no usable labels in the new rows; only widened", offer_id)
+    bundle["n_features"] = len(feature_names)
+    return bundle
+
+
+def _auc(y: np.ndarray, scores: np.ndarray) -> Optional[float]:
+    return float(roc_auc_score(y, scores)) if len(np.unique(y)) == 2 else None
+
+
+def _full_retrain_auc(
+    history: pd.DataFrame, new_train: pd.DataFrame, holdout: pd.DataFrame, model: Any
+) -> Dict[str, Any]:
+    """Holdout AUC and fit time of the same model type trained from scratch on all rows."""
+    target = get_model_config()["target"]
+    started = time.perf_counter()
+    full = pd.concat([history, new_train], ignore_index=True)
+    y = (full[target].astype(str).str.lower() == "yes").astype(int).values
+    preprocessor, _, X = fit_transform_preprocessor(full, y=y)
+    params = get_model_config().get("models", {})
+    name = (
+        "gradient_boosting"
+        if isinstance(model, GradientBoostingClassifier)
+        else "logistic_regression"
+    )
+    fresh = type(model)(**params.get(name, {})).fit(X, y)
+    fit_s = time.perf_counter() - started
+    y_hold = (holdout[target].astype(str).str.lower() == "yes").astype(int).values
+    scores = fresh.predict_proba(np.asarray(transform(preprocessor, holdout)))[:, 1]
+    return {"roc_auc": _auc(y_hold, scores), "fit_s": fit_s, "rows": int(len(full))}
+
+
+def _append_processed(
+    proc_dir: Path,
+    n_features: int,
+    X_new: Dict[str, np.ndarray],
+    y_new: Dict[str, np.ndarray],
+    Y_offers_test: Optional[np.ndarray],
+    new_rows: pd.DataFrame,
+) -> None:
+    """Widen the saved train/test matrices and append the new rows for evaluate/package_model.
+
+    Without earlier processed data (e.g. a fresh CI checkout) only the new rows are saved.
+    """
+    proc_dir.mkdir(parents=True, exist_ok=True)
+    if not (proc_dir / "X_train.npy").exists():
+        logger.warning(
+            "No processed data in %s; evaluate and baselines will cover the new rows only", proc_dir
+        )
+
+    def _load(name: str, empty: np.ndarray) -> np.ndarray:
+        return np.load(proc_dir / name) if (proc_dir / name).exists() else empty
+
+    for split in ("train", "test"):
+        X = _load(f"X_{split}.npy", np.empty((0, n_features)))
+        X = np.pad(X, ((0, 0), (0, n_features - X.shape[1])))
+        np.save(proc_dir / f"X_{split}.npy", np.vstack([X, X_new[split]]))
+        y = _load(f"y_{split}.npy", np.empty(0, dtype=y_new[split].dtype))
+        np.save(proc_dir / f"y_{split}.npy", np.concatenate([y, y_new[split]]))
+    if Y_offers_test is not None:
+        Y = _load(
+            "Y_offers_test.npy", np.empty((0, Y_offers_test.shape[1]), dtype=Y_offers_test.dtype)
+        )
+        np.save(proc_dir / "Y_offers_test.npy", np.vstack([Y, Y_offers_test]))
+    # Saved scores are from the model before this run
+    (proc_dir / "scores_raw.npy").unlink(missing_ok=True)
+    raw_path = proc_dir / "train_raw.parquet"
+    if raw_path.exists():
+        new_rows = pd.concat([pd.read_parquet(raw_path), new_rows], ignore_index=True)
+    new_rows.to_parquet(raw_path, index=False)
+
+
+@profiled("incremental_train")
+def main() -> Optional[Dict[str, Any]]:
+    cfg = get_model_config()
+    inc_cfg = get_incremental_config()
+    target = cfg["target"]
+    add_estimators = inc_cfg.get("add_estimators", 20)
+    linear_max_iter = inc_cfg.get("linear_max_iter", 20)
+    model_dir = get_model_dir()
+    proc_dir = get_processed_data_dir()
+
+    state = read_training_state(model_dir)
+    if "rows_seen" not in state:
+        raise FileNotFoundError(
+            f"No {STATE_NAME} in {model_dir}; run a full retrain (make train) first"
+        )
+    rows_seen = state["rows_seen"]
+    with stage("load_new_rows") as st:
+        new_df = load_new_rows(rows_seen)
+        st.rows = len(new_df)
+    if len(new_df) < inc_cfg.get("min_new_rows", 100):
+        logger.info("%d new rows since the last run; nothing to do", len(new_df))
+        log_action("incremental_retrain", "skipped", {"rows_new": len(new_df)})
+        return None
+
+    with stage("load_artifacts"):
+        model = joblib.load(model_dir / "model.joblib")
+        preprocessor, feature_names = load_preprocessor(model_dir)
+        challenger_paths = sorted((model_dir / CHALLENGER_DIR).glob("*.joblib"))
+        challengers = {p.stem: joblib.load(p) for p in challenger_paths}
+        bundle = load_offer_bundle(model_dir)
+
+    y = (new_df[target].astype(str).str.lower() == "yes").astype(int).values
+    stratify = y if np.bincount(y, minlength=2).min() >= 2 else None
+    idx_train, idx_test = train_test_split(
+        np.arange(len(new_df)), train_size=cfg.get("train_split_ratio", 0.8),
+        random_state=cfg.get("random_state", 42), stratify=stratify,
+    )
+    new_train, holdout = new_df.iloc[idx_train], new_df.iloc[idx_test]
+
+    with stage("extend_preprocessor", rows=len(new_df)):
+        n_old = len(feature_names)
+        preprocessor, feature_names, new_levels = extend_preprocessor(
+            preprocessor, feature_names, new_train
+        )
+        X = np.asarray(transform(preprocessor, new_df))
+    X_train, X_test, y_train, y_test = X[idx_train], X[idx_test], y[idx_train], y[idx_test]
+    previous_scores = model.predict_proba(X_test[:, :n_old])[:, 1]
+
+    with stage("extend_models", rows=len(X_train)):
+        started = time.perf_counter()
+        extend_model(model, X_train, y_train, add_estimators, linear_max_iter)
+        incremental_fit_s = time.perf_counter() - started
+        for challenger in challengers.values():
+            extend_model(challenger, X_train, y_train, add_estimators, linear_max_iter)
+    incremental_scores = model.predict_proba(X_test)[:, 1]
+
+    Y_offers_test = None
+    if bundle is not None:
+        with stage("extend_offer_models", rows=len(X_train)):
+            labels = offer_labels(new_df, get_offer_config().get("targets", {}))
+            extend_offer_bundle(
+                bundle, X_train, {o: y_o[idx_train] for o, y_o in labels.items()},
+                feature_names, add_estimators, linear_max_iter,
+            )
+            Y_offers_test = np.column_stack([labels[o][idx_test] for o in bundle["offers"]])
+
+    report = {
+        "created_at": datetime.now(tz=timezone.utc).isoformat(),
+        "model_type": type(model).__name__,
+        "rows_history": int(rows_seen),
+        "rows_new": int(len(new_df)),
+        "rows_holdout": int(len(holdout)),
+        "new_levels": new_levels,
+        "n_features": {"before": n_old, "after": len(feature_names)},
+        "n_estimators": int(len(model.estimators_)) if hasattr(model, "estimators_") else None,
+        "roc_auc": {
+            "previous": _auc(y_test, previous_scores),
+            "incremental": _auc(y_test, incremental_scores),
+        },
+        "fit_s": {"incremental": incremental_fit_s},
+    }
+    if inc_cfg.get("compare_full_retrain", True) and len(holdout):
+        with stage("full_retrain_baseline", rows=rows_seen + len(new_train)):
+            history = load_raw(n_rows=rows_seen)
+            full = _full_retrain_auc(history, new_train, holdout, model)
+        report["roc_auc"]["full_retrain"] = full["roc_auc"]
+        report["fit_s"]["full_retrain"] = full["fit_s"]
+        if full["roc_auc"] is not None and report["roc_auc"]["incremental"] is not None:
+            report["roc_auc_gap_vs_full"] = full["roc_auc"] - report["roc_auc"]["incremental"]
+
+    with stage("save_artifacts"):
+        # Manifest describes the previous artifacts; package_model writes a fresh one
+        (model_dir / MANIFEST_NAME).unlink(missing_ok=True)
+        joblib.dump(model, model_dir / "model.joblib")
+        save_preprocessor(preprocessor, feature_names, model_dir)
+        for path in challenger_paths:
+            joblib.dump(challengers[path.stem], path)
+        if bundle is not None:
+            save_offer_bundle(bundle, model_dir)
+        _append_processed(
+            proc_dir, len(feature_names),
+            {"train": X_train, "test": X_test}, {"train": y_train, "test": y_test},
+            Y_offers_test, new_df,
+        )
+        write_training_state(model_dir, rows_seen + len(new_df), "incremental", len(new_df))
+
+    metrics_dir = get_metrics_dir()
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    out_path = metrics_dir / "incremental_report.json"
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    logger.info(
+        "Incremental retrain on %d new rows: holdout AUC %s (previous %s, full retrain %s); "
+        "report at %s",
+        len(new_df),
+        report["roc_auc"]["incremental"],
+        report["roc_auc"]["previous"],
+        report["roc_auc"].get("full_retrain"),
+        out_path,
+    )
+    log_action(
+        "incremental_retrain",
+        metadata={"rows_new": len(new_df), "roc_auc": report["roc_auc"]["incremental"]},
+    )
+    return report
+
+
+if __name__ == "__main__":
+    main()
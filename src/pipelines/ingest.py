@@ -4,7 +4,6 @@ from typing import Optional
 
 import pandas as pd
 
-from src.utils.config import get_model_config
 from src.utils.logging import get_logger
 from src.utils.paths import get_raw_data_dir
 
@@ -26,14 +25,22 @@ def get_raw_csv_path() -> Path:
 def load_raw(
     path: Optional[Path] = None,
     validate: bool = True,
+    skip_rows: int = 0,
+    n_rows: Optional[int] = None,
 ) -> pd.DataFrame:
-    """Load raw CSV and optionally validate schema."""
+    """Load raw CSV (n_rows data rows after the first skip_rows) and optionally validate schema."""
     p = path or get_raw_csv_path()
     if not p.exists():
         raise FileNotFoundError(f"Raw data not found: {p}. Run 'make data' first.")
-    df = pd.read_csv(p, sep=";", encoding="utf-8")
+    df = pd.read_csv(
+        p,
+        sep=";",
+        encoding="utf-8",
+        skiprows=range(1, skip_rows + 1) if skip_rows else None,
+        nrows=n_rows,
+    )
     logger.info("Loaded %s rows from %s", len(df), p)
-    if validate:
+    if validate and len(df):
         _validate_schema(df)
     return df
 
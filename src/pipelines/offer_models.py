@@ -0,0 +1,125 @@
+"""Per-offer propensity models trained in parallel over one shared feature matrix.
+
+The preprocessor output is built once; each offer's model sees a column subset of it
+(offers can exclude raw features their label is derived from). Models are fitted in
+parallel with joblib, which memory-maps the shared matrix for worker processes, and
+are packaged together as offer_models.joblib.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+
+from src.utils.config import get_model_config
+from src.utils.logging import get_logger
+from src.utils.paths import get_model_dir
+
+logger = get_logger(__name__)
+
+BUNDLE_NAME = "offer_models.joblib"
+
+_ESTIMATORS = {
+    "gradient_boosting": GradientBoostingClassifier,
+    "logistic_regression": LogisticRegression,
+}
+
+
+def get_offer_config() -> Dict[str, Any]:
+    """offer_models section of model.yaml."""
+    return get_model_config().get("offer_models", {})
+
+
+def offer_labels(df: pd.DataFrame, targets: Dict[str, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Binary label per offer: column == positive, or a pandas expression (proxy labels)."""
+    labels = {}
+    for offer_id, spec in targets.items():
+        if "expr" in spec:
+            y = df.eval(spec["expr"])
+        else:
+            y = (
+                df[spec["column"]].astype(str).str.lower()
+                == str(spec.get("positive", "yes")).lower()
+            )
+        labels[offer_id] = np.asarray(y, dtype=int)
+    return labels
+
+
+def offer_feature_index(
+    feature_names: List[str], exclude: Optional[List[str]] = None
+) -> np.ndarray:
+    """Column indices of the shared matrix kept for an offer (drops excluded raw features)."""
+    exclude = exclude or []
+    keep = [
+        i for i, name in enumerate(feature_names)
+        if not any(name == col or name.startswith(col + "_") for col in exclude)
+    ]
+    return np.asarray(keep, dtype=np.intp)
+
+
+def _fit_one(
+    offer_id: str, X: np.ndarray, y: np.ndarray, idx: np.ndarray, model_name: str, params: dict
+):
+    model = _ESTIMATORS[model_name](**params)
+    model.fit(X[:, idx], y)
+    return offer_id, model
+
+
+def train_offer_models(
+    X_train: np.ndarray,
+    labels_train: Dict[str, np.ndarray],
+    feature_names: List[str],
+    n_jobs: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Fit one model per offer in parallel; return the bundle dict."""
+    cfg = get_offer_config()
+    model_name = cfg.get("model", "gradient_boosting")
+    params = get_model_config().get("models", {}).get(model_name, {})
+    targets = cfg.get("targets", {})
+    n_jobs = n_jobs if n_jobs is not None else cfg.get("n_jobs", -1)
+    feature_idx = {
+        o: offer_feature_index(feature_names, targets.get(o, {}).get("exclude_features"))
+        for o in labels_train
+    }
+    fitted = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_one)(o, X_train, labels_train[o], feature_idx[o], model_name, params)
+        for o in labels_train
+    )
+    models = dict(fitted)
+    offers = list(labels_train)
+    logger.info("Trained %d offer models (%s): %s", len(offers), model_name, ", ".join(offers))
+    return {
+        "offers": offers,
+        "models": {o: models[o] for o in offers},
+        "feature_idx": feature_idx,
+        "n_features": len(feature_names),
+    }
+
+
+def score_offer_matrix(bundle: Dict[str, Any], X: np.ndarray) -> np.ndarray:
+    """customers x offers propensity matrix from one transformed feature matrix."""
+    out = np.empty((X.shape[0], len(bundle["offers"])), dtype=float)
+    for j, offer_id in enumerate(bundle["offers"]):
+        out[:, j] = bundle["models"][offer_id].predict_proba(X[:, bundle["feature_idx"][offer_id]])[
+            :, 1
+        ]
+    return out
+
+
+def save_offer_bundle(bundle: Dict[str, Any], path: Optional[Path] = None) -> Path:
+    path = path or get_model_dir()
+    path.mkdir(parents=True, exist_ok=True)
+    joblib.dump(bundle, path / BUNDLE_NAME)
+    return path / BUNDLE_NAME
+
+
+def load_offer_bundle(path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """Offer bundle from model dir, or None if offer models were not trained."""
+    path = (path or get_model_dir()) / BUNDLE_NAME
+    if not path.exists():
+        return None
+    return joblib.load(path)
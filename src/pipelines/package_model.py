@@ -6,36 +6,49 @@ import joblib
 import numpy as np
 import pandas as pd
 
-from src.utils.config import get_monitoring_config
+from src.governance.audit import log_action
+from src.monitoring.drift import compute_baseline_stats, compute_segment_stats
+from src.pipelines.features import get_category_vocabulary, load_preprocessor, transform
+from src.serving.manifest import build_manifest, write_manifest
 from src.utils.logging import get_logger
-from src.utils.paths import get_artifacts_path, get_baselines_dir, get_model_dir, get_processed_data_dir
+from src.utils.paths import (
+    get_artifacts_path,
+    get_baselines_dir,
+    get_model_dir,
+    get_processed_data_dir,
+)
+from src.utils.profiling import profiled, stage
 
 logger = get_logger(__name__)
 
 
-def _compute_baseline_stats(df: pd.DataFrame, scores: np.ndarray) -> dict:
-    """Compute feature and score stats for drift baseline."""
-    cfg = get_monitoring_config()
-    monitor_cols = cfg.get("drift", {}).get(
-        "monitor_features", ["age", "balance", "duration", "campaign", "pdays"]
-    )
-    monitor_cols = [c for c in monitor_cols if c in df.columns]
-    feature_stats = {}
-    for c in monitor_cols:
-        feature_stats[c] = {
-            "mean": float(df[c].mean()),
-            "std": float(df[c].std()),
-            "min": float(df[c].min()),
-            "max": float(df[c].max()),
-        }
-    out = {
-        "feature_stats": feature_stats,
-        "score_mean": float(np.mean(scores)) if len(scores) else 0.0,
-        "score_std": float(np.std(scores)) if len(scores) else 0.0,
-    }
-    return out
+def _compute_baseline_stats(df: pd.DataFrame, scores: np.ndarray, model, model_dir: Path) -> dict:
+    """Compute feature, category, score and per-segment stats for drift baseline.
+
+    Segment score baselines need scores aligned with df rows: train saves them as
+    scores_raw.npy; only when that is missing or stale are the rows re-scored.
+    """
+    vocabulary = None
+    segment_scores = None
+    scores_path = get_processed_data_dir() / "scores_raw.npy"
+    if scores_path.exists():
+        segment_scores = np.load(scores_path)
+        if len(segment_scores) != len(df):
+            segment_scores = None
+    if (model_dir / "preprocessor.joblib").exists():
+        preprocessor, _ = load_preprocessor(model_dir)
+        vocabulary = get_category_vocabulary(preprocessor)
+        if segment_scores is None:
+            X = transform(preprocessor, df)
+            if hasattr(X, "toarray"):
+                X = X.toarray()
+            segment_scores = model.predict_proba(X)[:, 1]
+    baseline = compute_baseline_stats(df, scores, vocabulary=vocabulary)
+    baseline["segment_stats"] = compute_segment_stats(df, segment_scores, vocabulary=vocabulary)
+    return baseline
 
 
+@profiled("package_model")
 def main() -> None:
     model_dir = get_model_dir()
     baselines_dir = get_baselines_dir()
@@ -46,14 +59,16 @@ def main() -> None:
     X_train_path = proc_dir / "X_train.npy"
     if X_train_path.exists():
         X_train = np.load(X_train_path)
-        train_scores = model.predict_proba(X_train)[:, 1]
+        with stage("score_train", rows=len(X_train)):
+            train_scores = model.predict_proba(X_train)[:, 1]
     else:
         train_scores = np.array([])
 
     raw_path = proc_dir / "train_raw.parquet"
     if raw_path.exists():
         df = pd.read_parquet(raw_path)
-        baseline = _compute_baseline_stats(df, train_scores)
+        with stage("baseline_stats", rows=len(df)):
+            baseline = _compute_baseline_stats(df, train_scores, model, model_dir)
     else:
         baseline = {
             "score_mean": float(np.mean(train_scores)) if len(train_scores) else 0.0,
@@ -61,15 +76,35 @@ def main() -> None:
             "feature_stats": {},
         }
 
+    if (model_dir / "preprocessor.joblib").exists():
+        with stage("manifest"):
+            preprocessor, feature_names = load_preprocessor(model_dir)
+            manifest = build_manifest(model_dir, model, preprocessor, feature_names)
+            write_manifest(manifest, model_dir)
+        baseline["model_version"] = manifest["model_version"]
+        logger.info("Manifest written for model version %s", manifest["model_version"])
+
     baseline_path = baselines_dir / "baseline_stats.json"
     with open(baseline_path, "w", encoding="utf-8") as f:
         json.dump(baseline, f, indent=2)
     logger.info("Baseline stats written to %s", baseline_path)
 
+    if raw_path.exists():
+        from src.pipelines.profile_model import profile_model, write_profile
+        with stage("performance_profile"):
+            profile_path = write_profile(profile_model(df, model_dir))
+        logger.info("Performance profile written to %s", profile_path)
+
     try:
         from src.governance.model_card import generate_model_card
         card_path = get_artifacts_path() / "model_card.md"
-        generate_model_card(card_path)
+        with stage("model_card"):
+            generate_model_card(card_path)
         logger.info("Model card written to %s", card_path)
     except Exception as e:
         logger.warning("Could not generate model card: %s", e)
+    log_action("package_model", metadata={"model_version": baseline.get("model_version")})
+
+
+if __name__ == "__main__":
+    main()
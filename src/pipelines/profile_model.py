@@ -0,0 +1,221 @@
+"""Performance profile of packaged artifacts (size, load, latency, throughput, memory)."""
+import gc
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.pipelines.features import transform
+from src.utils.config import get_model_config
+from src.utils.logging import get_logger
+from src.utils.paths import get_metrics_dir, get_model_dir, get_processed_data_dir, get_project_root
+
+logger = get_logger(__name__)
+
+ARTIFACT_FILES = ["model.joblib", "preprocessor.joblib", "feature_names.joblib"]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Process peak resident set size in MB (None where resource is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _scoring_rss(model_dir: Path, batch: pd.DataFrame) -> Dict[str, Optional[float]]:
+    """Peak RSS of a fresh process that only loads the artifacts and scores batch.
+
+    The packaging process has also loaded training data, so its own peak says nothing
+    about the model; a clean child makes the number comparable between models.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        batch_path = Path(tmp) / "batch.parquet"
+        batch.to_parquet(batch_path, index=False)
+        try:
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "src.pipelines.profile_model",
+                    "--scoring-rss",
+                    str(model_dir),
+                    str(batch_path),
+                ],
+                cwd=get_project_root(),
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=600,
+            )
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.warning("Scoring RSS measurement failed: %s", e)
+            return {"loaded_rss_mb": None, "scoring_peak_rss_mb": None}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _measure_scoring_rss(model_dir: Path, batch_path: Path) -> Dict[str, Optional[float]]:
+    """Child side of _scoring_rss: RSS after loading, then peak after scoring."""
+    model = joblib.load(model_dir / "model.joblib")
+    preprocessor = joblib.load(model_dir / "preprocessor.joblib")
+    batch = pd.read_parquet(batch_path)
+    loaded = _peak_rss_mb()
+    _score(model, preprocessor, batch)
+    return {"loaded_rss_mb": loaded, "scoring_peak_rss_mb": _peak_rss_mb()}
+
+
+def _score(model: Any, preprocessor: Any, df: pd.DataFrame) -> np.ndarray:
+    X = transform(preprocessor, df)
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    return model.predict_proba(X)[:, 1]
+
+
+def profile_model(
+    sample_df: pd.DataFrame,
+    model_dir: Optional[Path] = None,
+    single_row_runs: Optional[int] = None,
+    batch_rows: Optional[int] = None,
+    load_runs: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Profile artifacts in model_dir against rows drawn from sample_df.
+
+    Latency is measured on the same transform + predict_proba path as serving,
+    without the artifact cache, so results compare across candidate models.
+    """
+    cfg = get_model_config().get("profiling", {})
+    single_row_runs = single_row_runs or cfg.get("single_row_runs", 200)
+    batch_rows = batch_rows or cfg.get("batch_rows", 10_000)
+    load_runs = load_runs or cfg.get("load_runs", 3)
+    model_dir = model_dir or get_model_dir()
+
+    sizes = {f: (model_dir / f).stat().st_size for f in ARTIFACT_FILES if (model_dir / f).exists()}
+    load_times = []
+    for _ in range(load_runs):
+        t0 = time.perf_counter()
+        model = joblib.load(model_dir / "model.joblib")
+        preprocessor = joblib.load(model_dir / "preprocessor.joblib")
+        load_times.append(time.perf_counter() - t0)
+
+    rows = sample_df.sample(n=single_row_runs, replace=True, random_state=0).reset_index(drop=True)
+    _score(model, preprocessor, rows.iloc[[0]])  # warm-up
+    latencies = []
+    for i in range(single_row_runs):
+        row = rows.iloc[[i]]
+        t0 = time.perf_counter()
+        _score(model, preprocessor, row)
+        latencies.append(time.perf_counter() - t0)
+    latencies_ms = np.array(latencies) * 1000.0
+    shadow = _shadow_overhead(model, preprocessor, rows, model_dir)
+
+    batch = sample_df.sample(n=batch_rows, replace=True, random_state=1).reset_index(drop=True)
+    t0 = time.perf_counter()
+    X = transform(preprocessor, batch)
+    transform_s = time.perf_counter() - t0
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    del X
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    _score(model, preprocessor, batch)
+    batch_s = time.perf_counter() - t0
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    profile = {
+        "model_type": type(model).__name__,
+        "artifact_bytes": int(sum(sizes.values())),
+        "artifact_files": sizes,
+        "load_time_ms": float(np.median(load_times) * 1000.0),
+        "single_row_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "single_row_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "batch_rows": int(batch_rows),
+        "batch_throughput_rows_per_s": float(batch_rows / batch_s) if batch_s > 0 else None,
+        "transform_us_per_row": float(transform_s / batch_rows * 1e6),
+        "scoring_peak_alloc_mb": float(peak_alloc / (1024 * 1024)),
+        **_scoring_rss(model_dir, batch),
+        **shadow,
+    }
+    return profile
+
+
+def _shadow_overhead(
+    model: Any, preprocessor: Any, rows: pd.DataFrame, model_dir: Path
+) -> Dict[str, Any]:
+    """Single-row p50 with challenger shadow submission on the request path, vs champion-only.
+
+    Champion-only and shadowed requests alternate so both see the same background load
+    from the shadow thread scoring challengers.
+    """
+    import tempfile
+
+    from src.serving.prediction_log import PredictionLogSink
+    from src.serving.shadow import ShadowScorer, load_challengers
+
+    challengers = load_challengers(model_dir)
+    if not challengers:
+        return {}
+    with tempfile.TemporaryDirectory() as tmp:
+        scorer = ShadowScorer(challengers, PredictionLogSink(log_dir=Path(tmp)))
+        plain, shadowed = [], []
+        for i in range(len(rows)):
+            row = rows.iloc[[i]]
+            t0 = time.perf_counter()
+            _score(model, preprocessor, row)
+            plain.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            X = transform(preprocessor, row)
+            if hasattr(X, "toarray"):
+                X = X.toarray()
+            proba = model.predict_proba(X)[:, 1]
+            scorer.submit(X, row, proba)
+            shadowed.append(time.perf_counter() - t0)
+        scorer.close()
+    p50, p50_shadow = float(np.median(plain) * 1000.0), float(np.median(shadowed) * 1000.0)
+    return {
+        "shadow_challengers": sorted(challengers),
+        "shadow_single_row_p50_ms": p50_shadow,
+        "shadow_overhead_pct": (p50_shadow - p50) / p50 * 100.0 if p50 > 0 else None,
+        "shadow_dropped": scorer.stats["dropped"],
+    }
+
+
+def write_profile(profile: Dict[str, Any], output_path: Optional[Path] = None) -> Path:
+    """Write profile JSON (default artifacts/metrics/performance_profile.json)."""
+    path = output_path or get_metrics_dir() / "performance_profile.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    return path
+
+
+def main() -> None:
+    if len(sys.argv) == 4 and sys.argv[1] == "--scoring-rss":
+        print(json.dumps(_measure_scoring_rss(Path(sys.argv[2]), Path(sys.argv[3]))))
+        return
+    raw_path = get_processed_data_dir() / "train_raw.parquet"
+    if not raw_path.exists() or not (get_model_dir() / "model.joblib").exists():
+        logger.warning("No training data or model; skipping performance profile")
+        return
+    profile = profile_model(pd.read_parquet(raw_path))
+    path = write_profile(profile)
+    logger.info(
+        "Performance profile written to %s: p50=%.2fms p99=%.2fms",
+        path, profile["single_row_p50_ms"], profile["single_row_p99_ms"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Synthetic Bank Marketing data: fit marginals + dependencies, emit large deterministic datasets.
+
+A spec holds per-column marginals (numeric quantile knots, categorical level
+probabilities) and a latent correlation matrix: a Gaussian copula. Rows are drawn as
+correlated standard normals, mapped to uniforms, then through each column's inverse
+CDF. fit_spec estimates a spec from a raw frame (normal scores of ranks; categorical
+levels ordered by target rate so their dependence on the outcome survives). The
+bundled spec in configs/synthetic.yaml stands in when no raw data is available.
+
+Each chunk is drawn from its own generator seeded with (seed, first row), so for a given
+seed and chunk size any chunk can be regenerated on its own, and memory stays at one
+chunk for any row count.
+Optional drift shifts numeric latents and reweights categorical levels for rows past a
+start point, ramping in linearly.
+
+Usage: python -m src.pipelines.synthetic --rows 10000000 --out data/raw/synthetic.parquet
+"""
+import argparse
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from src.pipelines.ingest import EXPECTED_COLUMNS, load_raw
+from src.utils.config import get_model_config, load_config
+from src.utils.logging import get_logger
+from src.utils.paths import get_raw_data_dir
+
+logger = get_logger(__name__)
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def get_synthetic_config() -> Dict[str, Any]:
+    """configs/synthetic.yaml (bundled spec and drift settings)."""
+    return load_config("synthetic.yaml")
+
+
+def _normal_scores(codes: np.ndarray) -> np.ndarray:
+    """Rank-based normal scores (ties share their mid rank)."""
+    ranks = pd.Series(codes).rank(method="average").to_numpy()
+    return ndtri((ranks - 0.5) / len(ranks))
+
+
+def fit_spec(
+    df: pd.DataFrame, n_quantiles: int = 101, min_abs_corr: float = 0.02
+) -> Dict[str, Any]:
+    """Spec (same layout as configs/synthetic.yaml) fitted to the columns of df."""
+    target = get_model_config().get("target", "y")
+    y = (df[target].astype(str).str.lower() == "yes").to_numpy() if target in df.columns else None
+    probs = np.linspace(0.0, 1.0, n_quantiles)
+    columns: Dict[str, Any] = {}
+    latent = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s):
+            values = s.to_numpy(dtype=float)
+            columns[col] = {
+                "type": "numeric",
+                "integer": bool(np.all(np.mod(values, 1) == 0)),
+                "quantiles": [
+                    [float(p), float(q)] for p, q in zip(probs, np.quantile(values, probs))
+                ],
+            }
+            latent[col] = _normal_scores(values)
+        else:
+            s = s.astype(str)
+            freq = s.value_counts(normalize=True)
+            if col == target:
+                levels = sorted(freq.index, key=lambda v: v.lower() == "yes")
+            elif y is not None:
+                levels = list(
+                    pd.Series(y).groupby(s.to_numpy()).mean().sort_values(kind="stable").index
+                )
+            else:
+                levels = list(freq.index)
+            columns[col] = {
+                "type": "categorical",
+                "levels": {str(v): float(freq[v]) for v in levels},
+            }
+            latent[col] = _normal_scores(pd.Categorical(s, categories=levels).codes)
+    names = list(columns)
+    corr = np.corrcoef(np.vstack([latent[c] for c in names]))
+    pairs = [
+        [names[i], names[j], round(float(corr[i, j]), 4)]
+        for i in range(len(names)) for j in range(i + 1, len(names))
+        if abs(corr[i, j]) >= min_abs_corr
+    ]
+    return {"columns": columns, "correlations": pairs}
+
+
+def _compile(spec: Dict[str, Any]) -> Dict[str, Any]:
+    names = list(spec["columns"])
+    pos = {c: i for i, c in enumerate(names)}
+    corr = np.eye(len(names))
+    for a, b, rho in spec.get("correlations", []):
+        corr[pos[a], pos[b]] = corr[pos[b], pos[a]] = rho
+    # nearest valid correlation matrix: clip eigenvalues, restore the unit diagonal
+    w, v = np.linalg.eigh(corr)
+    corr = (v * np.maximum(w, 1e-6)) @ v.T
+    d = np.sqrt(np.diag(corr))
+    corr = corr / d[:, None] / d[None, :]
+    columns = []
+    for name in names:
+        c = spec["columns"][name]
+        if c["type"] == "numeric":
+            knots = np.asarray(c["quantiles"], dtype=float)
+            columns.append({"name": name, "type": "numeric", "integer": c.get("integer", False),
+                            "probs": knots[:, 0], "values": knots[:, 1]})
+        else:
+            levels = list(c["levels"])
+            p = np.asarray(list(c["levels"].values()), dtype=float)
+            columns.append(
+                {"name": name, "type": "categorical", "levels": levels, "p": p / p.sum()}
+            )
+    return {"names": names, "chol": np.linalg.cholesky(corr), "columns": columns}
+
+
+def _intensity(
+    start: int, n: int, drift: Optional[Dict[str, Any]], total_rows: int
+) -> Optional[np.ndarray]:
+    """Per-row drift strength in [0, 1] for global rows start..start+n (None without drift)."""
+    if not drift or not drift.get("columns"):
+        return None
+    begin = drift.get("start_fraction", 0.5) * total_rows
+    ramp = max(drift.get("ramp_fraction", 0.0) * total_rows, 1.0)
+    rows = np.arange(start, start + n, dtype=float)
+    strength = np.clip((rows - begin + 1) / ramp, 0.0, 1.0)
+    return strength if strength.any() else None
+
+
+def generate_chunk(
+    compiled: Dict[str, Any],
+    start: int,
+    n_rows: int,
+    seed: int = 0,
+    drift: Optional[Dict[str, Any]] = None,
+    total_rows: Optional[int] = None,
+) -> pd.DataFrame:
+    """Rows start..start+n_rows; deterministic in (seed, start) for a fixed chunk size."""
+    rng = np.random.default_rng([seed, start])
+    Z = rng.standard_normal((n_rows, len(compiled["names"]))) @ compiled["chol"].T
+    strength = _intensity(start, n_rows, drift, total_rows or start + n_rows)
+    drift_cols = (drift or {}).get("columns", {}) if strength is not None else {}
+    out = {}
+    for j, col in enumerate(compiled["columns"]):
+        z = Z[:, j]
+        change = drift_cols.get(col["name"], {})
+        if col["type"] == "numeric":
+            if change.get("shift"):
+                z = z + change["shift"] * strength
+            values = np.interp(ndtr(z), col["probs"], col["values"])
+            out[col["name"]] = np.rint(values).astype(np.int64) if col["integer"] else values
+        else:
+            u = ndtr(z)
+            codes = np.searchsorted(np.cumsum(col["p"])[:-1], u, side="right")
+            if change.get("weights"):
+                w = np.array([change["weights"].get(level, 1.0) for level in col["levels"]])
+                p = col["p"] * w / (col["p"] * w).sum()
+                drifted = np.searchsorted(np.cumsum(p)[:-1], u, side="right")
+                use = rng.random(n_rows) < strength
+                codes = np.where(use, drifted, codes)
+            out[col["name"]] = pd.Categorical.from_codes(codes, categories=col["levels"])
+    return pd.DataFrame(out)
+
+
+def iter_chunks(
+    spec: Dict[str, Any],
+    n_rows: int,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    seed: int = 0,
+    drift: Optional[Dict[str, Any]] = None,
+) -> Iterator[pd.DataFrame]:
+    compiled = _compile(spec)
+    for start in range(0, n_rows, chunk_rows):
+        yield generate_chunk(compiled, start, min(chunk_rows, n_rows - start), seed, drift, n_rows)
+
+
+def write_dataset(
+    spec: Dict[str, Any],
+    n_rows: int,
+    out_path: Path,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    seed: int = 0,
+    drift: Optional[Dict[str, Any]] = None,
+) -> Path:
+    """Stream n_rows to a ';'-separated CSV or a Parquet file (one row group per chunk)."""
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    parquet = out_path.suffix == ".parquet"
+    writer = None
+    try:
+        for i, chunk in enumerate(iter_chunks(spec, n_rows, chunk_rows, seed, drift)):
+            if parquet:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = writer or pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(tmp, sep=";", index=False, header=i == 0, mode="w" if i == 0 else "a")
+            logger.info("Wrote rows %d-%d", i * chunk_rows, i * chunk_rows + len(chunk))
+    finally:
+        if writer is not None:
+            writer.close()
+    tmp.replace(out_path)
+    return out_path
+
+
+def default_spec(fit_path: Optional[Path] = None) -> Dict[str, Any]:
+    """Spec fitted to fit_path if given, else the bundled one; checked against EXPECTED_COLUMNS."""
+    spec = fit_spec(load_raw(fit_path)) if fit_path else get_synthetic_config().get("spec", {})
+    missing = set(EXPECTED_COLUMNS) - set(spec.get("columns", {}))
+    if missing:
+        raise ValueError(f"Synthetic spec is missing columns: {sorted(missing)}")
+    return spec
+
+
+def main(argv: Optional[List[str]] = None) -> Path:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Bank Marketing dataset")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out", type=Path, default=None, help=".csv (';'-separated) or .parquet")
+    parser.add_argument(
+        "--fit", type=Path, default=None, help="raw CSV to fit the spec to (default: bundled spec)"
+    )
+    parser.add_argument(
+        "--save-spec", type=Path, default=None, help="write the (fitted) spec as YAML"
+    )
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--drift", action="store_true", help="inject the drift from configs/synthetic.yaml"
+    )
+    args = parser.parse_args(argv)
+
+    spec = default_spec(args.fit)
+    if args.save_spec:
+        import yaml
+        args.save_spec.write_text(yaml.safe_dump({"spec": spec}, sort_keys=False), encoding="utf-8")
+    drift_cfg = get_synthetic_config().get("drift", {})
+    drift = drift_cfg if args.drift or drift_cfg.get("enabled", False) else None
+    out = args.out or get_raw_data_dir() / "synthetic.csv"
+    write_dataset(spec, args.rows, out, args.chunk_rows, args.seed, drift)
+    logger.info("Synthetic dataset (%d rows%s) at %s", args.rows, ", drifted" if drift else "", out)
+    return out
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,32 @@
 """Train propensity model (Logistic Regression + Gradient Boosting)."""
 import joblib
 import numpy as np
-import pandas as pd
 from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 
-from src.pipelines.features import build_preprocessor, save_preprocessor, transform
+from src.governance.audit import log_action
+from src.pipelines.features import fit_transform_preprocessor, save_preprocessor, transform
+from src.pipelines.incremental import write_training_state
 from src.pipelines.ingest import load_raw
+from src.pipelines.offer_models import (
+    BUNDLE_NAME,
+    get_offer_config,
+    offer_labels,
+    save_offer_bundle,
+    train_offer_models,
+)
+from src.serving.manifest import MANIFEST_NAME
+from src.serving.shadow import CHALLENGER_DIR
 from src.utils.config import get_model_config
 from src.utils.logging import get_logger
 from src.utils.paths import get_model_dir, get_processed_data_dir
+from src.utils.profiling import profiled, stage
 
 logger = get_logger(__name__)
 
 
+@profiled("train")
 def main() -> None:
     cfg = get_model_config()
     target = cfg["target"]
@@ -22,44 +34,92 @@ def main() -> None:
     rs = cfg.get("random_state", 42)
     primary = cfg.get("primary_model", "gradient_boosting")
 
-    df = load_raw()
+    with stage("load_raw") as st:
+        df = load_raw()
+        st.rows = len(df)
     # Binary target
     y = (df[target].astype(str).str.lower() == "yes").astype(int).values
-    preprocessor, feature_names = build_preprocessor(df)
-    X = transform(preprocessor, df)
-    if not isinstance(X, np.ndarray):
-        X = np.asarray(X)
-
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, train_size=ratio, random_state=rs, stratify=y
+    idx_train, idx_test = train_test_split(
+        np.arange(len(y)), train_size=ratio, random_state=rs, stratify=y
     )
-    get_processed_data_dir().mkdir(parents=True, exist_ok=True)
-    # Save split indices or processed data for evaluate step
-    np.save(get_processed_data_dir() / "X_train.npy", X_train)
-    np.save(get_processed_data_dir() / "X_test.npy", X_test)
-    np.save(get_processed_data_dir() / "y_train.npy", y_train)
-    np.save(get_processed_data_dir() / "y_test.npy", y_test)
-    # Save full df for baseline stats (package_model)
-    df.to_parquet(get_processed_data_dir() / "train_raw.parquet", index=False)
+    with stage("preprocess", rows=len(df)):
+        # Fit on training rows only: target encoding must not see the test labels.
+        # X_train encodes those rows out of fold; X (test rows, baselines) as serving does.
+        preprocessor, feature_names, X_train = fit_transform_preprocessor(
+            df.iloc[idx_train], y=y[idx_train]
+        )
+        X = transform(preprocessor, df)
+        if not isinstance(X, np.ndarray):
+            X = np.asarray(X)
+
+    with stage("split_and_save", rows=len(df)):
+        X_test, y_train, y_test = X[idx_test], y[idx_train], y[idx_test]
+        get_processed_data_dir().mkdir(parents=True, exist_ok=True)
+        # Save split indices or processed data for evaluate step
+        np.save(get_processed_data_dir() / "X_train.npy", X_train)
+        np.save(get_processed_data_dir() / "X_test.npy", X_test)
+        np.save(get_processed_data_dir() / "y_train.npy", y_train)
+        np.save(get_processed_data_dir() / "y_test.npy", y_test)
+        # Save full df for baseline stats (package_model)
+        df.to_parquet(get_processed_data_dir() / "train_raw.parquet", index=False)
 
     models_cfg = cfg.get("models", {})
     lr_cfg = models_cfg.get("logistic_regression", {})
     gb_cfg = models_cfg.get("gradient_boosting", {})
 
-    lr = LogisticRegression(**lr_cfg)
-    lr.fit(X_train, y_train)
+    with stage("fit_logistic_regression", rows=len(X_train)):
+        lr = LogisticRegression(**lr_cfg)
+        lr.fit(X_train, y_train)
     logger.info("Logistic Regression train score: %.4f", lr.score(X_train, y_train))
 
-    gb = GradientBoostingClassifier(**gb_cfg)
-    gb.fit(X_train, y_train)
+    with stage("fit_gradient_boosting", rows=len(X_train)):
+        gb = GradientBoostingClassifier(**gb_cfg)
+        gb.fit(X_train, y_train)
     logger.info("Gradient Boosting train score: %.4f", gb.score(X_train, y_train))
 
-    model = gb if primary == "gradient_boosting" else lr
+    trained = {"logistic_regression": lr, "gradient_boosting": gb}
+    model = trained.get(primary, lr)
     model_dir = get_model_dir()
     model_dir.mkdir(parents=True, exist_ok=True)
-    joblib.dump(model, model_dir / "model.joblib")
-    save_preprocessor(preprocessor, feature_names, model_dir)
-    logger.info("Saved primary model (%s) and preprocessor to %s", primary, model_dir)
+    with stage("save_artifacts"):
+        # Manifest describes the previous artifacts; package_model writes a fresh one
+        (model_dir / MANIFEST_NAME).unlink(missing_ok=True)
+        joblib.dump(model, model_dir / "model.joblib")
+        save_preprocessor(preprocessor, feature_names, model_dir)
+        logger.info("Saved primary model (%s) and preprocessor to %s", primary, model_dir)
+
+        # Non-primary models are kept as challengers for shadow scoring
+        challenger_dir = model_dir / CHALLENGER_DIR
+        challenger_dir.mkdir(exist_ok=True)
+        for stale in challenger_dir.glob("*.joblib"):
+            stale.unlink()
+        for name, challenger in trained.items():
+            if challenger is not model:
+                joblib.dump(challenger, challenger_dir / f"{name}.joblib")
+                logger.info("Saved challenger (%s) to %s", name, challenger_dir)
+        # Raw-row watermark for incremental retrains
+        write_training_state(model_dir, len(df), "full", len(df))
+        # Primary-model scores aligned with train_raw rows, for the per-segment score baselines
+        np.save(get_processed_data_dir() / "scores_raw.npy", model.predict_proba(X)[:, 1])
+
+    offer_cfg = get_offer_config()
+    (model_dir / BUNDLE_NAME).unlink(missing_ok=True)
+    if offer_cfg.get("enabled", False) and offer_cfg.get("targets"):
+        with stage("offer_models", rows=len(X_train)):
+            labels = offer_labels(df, offer_cfg["targets"])
+            bundle = train_offer_models(
+                X_train, {o: y_o[idx_train] for o, y_o in labels.items()}, feature_names
+            )
+            save_offer_bundle(bundle, model_dir)
+            # Offer labels for the test split, one column per offer, for evaluate
+            np.save(
+                get_processed_data_dir() / "Y_offers_test.npy",
+                np.column_stack([labels[o][idx_test] for o in bundle["offers"]]),
+            )
+    log_action(
+        "train",
+        metadata={"primary_model": primary, "rows": len(df), "n_features": len(feature_names)},
+    )
 
 
 if __name__ == "__main__":
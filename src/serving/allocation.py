@@ -0,0 +1,246 @@
+"""Budget-constrained campaign allocation over a customers x offers propensity matrix.
+
+Each (customer, offer) pair is worth its expected profit, propensity * value - cost.
+Only profitable pairs are considered. An allocation picks pairs to maximize total
+expected profit under three limits: at most contact_limit offers per customer, at
+most capacity contacts per offer, and total contact cost within the budget.
+
+- "greedy": deferred acceptance, vectorized by rounds. Every customer with a free slot
+  proposes its next-best offer (by profit, or profit per unit cost under a budget).
+  Each offer keeps its best proposals up to capacity and bumps the rest, who propose
+  again next round. There are at most n_offers rounds. Pairs are then kept in
+  efficiency order until the budget runs out.
+- "lagrangian": relaxes capacities and budget with multipliers, so each customer simply
+  takes its top offers by adjusted profit. Subgradient steps move the multipliers
+  toward feasibility. The relaxed optimum is an upper bound on the true one, which
+  gives a reported optimality gap. The greedy fill with adjusted profits as
+  preferences turns multipliers into feasible allocations; the best one is returned.
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.config import get_app_config
+
+
+def get_allocation_config() -> Dict[str, Any]:
+    """allocation section of app.yaml."""
+    return get_app_config().get("allocation", {})
+
+
+def offer_terms(
+    offer_ids: List[str], cfg: Optional[Dict[str, Any]] = None
+) -> Dict[str, np.ndarray]:
+    """Per-offer value, cost and capacity (inf = unlimited) arrays, ordered as offer_ids."""
+    cfg = cfg if cfg is not None else get_allocation_config()
+    terms = cfg.get("offers", {})
+    missing = [o for o in offer_ids if o not in terms]
+    if missing:
+        raise ValueError(f"No allocation terms (value/cost) for offers: {missing}")
+    return {
+        "value": np.array([float(terms[o]["value"]) for o in offer_ids]),
+        "cost": np.array([float(terms[o].get("cost", 0.0)) for o in offer_ids]),
+        "capacity": np.array(
+            [
+                np.inf if terms[o].get("capacity") is None else float(terms[o]["capacity"])
+                for o in offer_ids
+            ]
+        ),
+    }
+
+
+def greedy_fill(
+    profit: np.ndarray,
+    preference: np.ndarray,
+    capacity: np.ndarray,
+    contact_limit: int,
+    cost: np.ndarray,
+    budget: Optional[float],
+) -> np.ndarray:
+    """Feasible assignment mask (deferred acceptance on `preference`, then budget trim)."""
+    n, m = profit.shape
+    valid = profit > 0
+    pref = np.argsort(np.where(valid, -preference, np.inf), axis=1, kind="stable")
+    n_valid = valid.sum(axis=1)
+    ptr = np.zeros(n, dtype=np.int64)
+    held = np.zeros((n, m), dtype=bool)
+    rank = np.arange(m)[None, :]
+    while True:
+        k = np.minimum(contact_limit - held.sum(axis=1), n_valid - ptr)
+        if not (k > 0).any():
+            break
+        pi, pr = np.nonzero((rank >= ptr[:, None]) & (rank < (ptr + np.maximum(k, 0))[:, None]))
+        ptr += np.maximum(k, 0)
+        hi, hj = np.nonzero(held)
+        ci = np.concatenate([hi, pi])
+        cj = np.concatenate([hj, pref[pi, pr]])
+        order = np.lexsort((-preference[ci, cj], cj))
+        ci, cj = ci[order], cj[order]
+        pos = np.arange(len(cj)) - np.searchsorted(cj, cj)
+        keep = pos < capacity[cj]
+        held[:] = False
+        held[ci[keep], cj[keep]] = True
+    if budget is not None:
+        hi, hj = np.nonzero(held)
+        order = np.argsort(-preference[hi, hj], kind="stable")
+        over = np.cumsum(cost[hj[order]]) > budget
+        held[hi[order[over]], hj[order[over]]] = False
+    return held
+
+
+def _top_positive(S: np.ndarray, limit: int) -> np.ndarray:
+    """Mask of each row's `limit` largest entries, among the positive ones."""
+    n, m = S.shape
+    if limit >= m:
+        return S > 0
+    X = np.zeros((n, m), dtype=bool)
+    if limit == 1:
+        X[np.arange(n), S.argmax(axis=1)] = True
+    else:
+        X[np.arange(n)[:, None], np.argpartition(-S, limit - 1, axis=1)[:, :limit]] = True
+    return X & (S > 0)
+
+
+def _lagrangian(
+    profit: np.ndarray,
+    capacity: np.ndarray,
+    contact_limit: int,
+    cost: np.ndarray,
+    budget: Optional[float],
+    max_iter: int,
+    tol: float,
+    recover_every: int,
+) -> Dict[str, Any]:
+    efficiency = profit / np.maximum(cost, 1e-9) if budget is not None else profit
+    best = greedy_fill(profit, efficiency, capacity, contact_limit, cost, budget)
+    best_obj = float(profit[best].sum())
+    bounded = np.isfinite(capacity)
+    lam = np.zeros(len(capacity))
+    # start the budget price at the profit per unit cost of the last contact greedy could afford
+    mu = (
+        float((profit[best] / np.maximum(cost, 1e-9)[np.nonzero(best)[1]]).min())
+        if budget is not None and best.any()
+        else 0.0
+    )
+    upper, theta, stall, it = np.inf, 1.0, 0, 0
+    S = np.empty_like(profit)
+    for it in range(1, max_iter + 1):
+        np.subtract(profit, lam[None, :] + mu * cost[None, :], out=S)
+        X = _top_positive(S, contact_limit)
+        counts = X.sum(axis=0)
+        spend = float(counts @ cost)
+        dual = (
+            float(S[X].sum())
+            + float(lam[bounded] @ capacity[bounded])
+            + (mu * budget if budget is not None else 0.0)
+        )
+        if dual < upper:
+            upper, stall = dual, 0
+        else:
+            stall += 1
+            if stall >= 10:
+                theta, stall = theta / 2, 0
+        feasible = (counts <= capacity).all() and (budget is None or spend <= budget)
+        if feasible and float(profit[X].sum()) > best_obj:
+            best, best_obj = X, float(profit[X].sum())
+        elif it % recover_every == 0:
+            X = greedy_fill(profit, S, capacity, contact_limit, cost, budget)
+            if float(profit[X].sum()) > best_obj:
+                best, best_obj = X, float(profit[X].sum())
+        if upper - best_obj <= tol * max(1.0, abs(upper)):
+            break
+        # Polyak subgradient step, each constraint scaled by its limit: raise a multiplier
+        # where its constraint is violated, lower it where slack
+        g = np.where(bounded, counts / np.where(bounded, capacity, 1.0) - 1.0, 0.0)
+        g_budget = spend / budget - 1.0 if budget is not None else 0.0
+        norm = float(g @ g + g_budget ** 2)
+        if norm == 0:
+            break
+        step = theta * (dual - best_obj) / norm
+        lam = np.maximum(0.0, lam + step * g / np.where(bounded, capacity, 1.0))
+        if budget is not None:
+            mu = max(0.0, mu + step * g_budget / budget)
+    return {
+        "assignment": best,
+        "upper_bound": upper,
+        "iterations": it,
+        "multipliers": lam.tolist(),
+        "budget_multiplier": mu,
+    }
+
+
+def allocate(
+    propensity: np.ndarray,
+    offer_ids: List[str],
+    method: Optional[str] = None,
+    contact_limit: Optional[int] = None,
+    budget: Optional[float] = None,
+    cfg: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Solve the allocation for a customers x offers propensity matrix (config from app.yaml).
+
+    Returns {assignment (bool mask), objective, upper_bound, gap, solve_s, ...}.
+    """
+    cfg = cfg if cfg is not None else get_allocation_config()
+    method = method or cfg.get("method", "lagrangian")
+    contact_limit = contact_limit or cfg.get("contact_limit", 1)
+    budget = budget if budget is not None else cfg.get("budget")
+    terms = offer_terms(offer_ids, cfg)
+    started = time.perf_counter()
+    profit = np.asarray(propensity, dtype=float) * terms["value"][None, :] - terms["cost"][None, :]
+    if method == "greedy":
+        efficiency = profit / np.maximum(terms["cost"], 1e-9) if budget is not None else profit
+        result = {
+            "assignment": greedy_fill(
+                profit, efficiency, terms["capacity"], contact_limit, terms["cost"], budget
+            )
+        }
+    elif method == "lagrangian":
+        result = _lagrangian(
+            profit,
+            terms["capacity"],
+            contact_limit,
+            terms["cost"],
+            budget,
+            max_iter=cfg.get("max_iter", 100),
+            tol=cfg.get("tolerance", 1e-3),
+            recover_every=cfg.get("recover_every", 10),
+        )
+    else:
+        raise ValueError(f"Unknown allocation method {method!r}; expected 'greedy' or 'lagrangian'")
+    X = result["assignment"]
+    counts = X.sum(axis=0)
+    objective = float(profit[X].sum())
+    upper = result.get("upper_bound")
+    result.update({
+        "method": method,
+        "solve_s": time.perf_counter() - started,
+        "objective": objective,
+        "gap": (upper - objective) / max(1.0, abs(upper)) if upper is not None else None,
+        "customers": int(X.shape[0]),
+        "contacts": int(counts.sum()),
+        "cost": float(counts @ terms["cost"]),
+        "expected_conversions": float(np.asarray(propensity)[X].sum()),
+        "offer_counts": {o: int(c) for o, c in zip(offer_ids, counts)},
+    })
+    return result
+
+
+def assignment_frame(
+    result: Dict[str, Any], propensity: np.ndarray, offer_ids: List[str], ids: Any = None
+) -> pd.DataFrame:
+    """One row per assigned (customer, offer): customer_id, offer_id, propensity."""
+    ci, cj = np.nonzero(result["assignment"])
+    ids = np.arange(result["assignment"].shape[0]) if ids is None else np.asarray(ids)
+    return pd.DataFrame({
+        "customer_id": ids[ci],
+        "offer_id": np.asarray(offer_ids, dtype=object)[cj],
+        "propensity": np.asarray(propensity)[ci, cj],
+    })
+
+
+def summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-serializable part of an allocate() result."""
+    return {k: v for k, v in result.items() if k != "assignment"}
@@ -0,0 +1,165 @@
+"""Chunked bulk scoring: columnar validation, propensity scoring and offer ranking per chunk."""
+import io
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.serving.predict import score_offers
+from src.serving.ranking import rank_offers_batch
+from src.serving.schema import CustomerFeatures
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def _field_specs() -> Dict[str, Dict[str, Any]]:
+    """Per-field {required, default, numeric, ge, le} derived from CustomerFeatures."""
+    specs = {}
+    for name, field in CustomerFeatures.model_fields.items():
+        spec = {
+            "required": field.is_required(),
+            "default": None if field.is_required() else field.default,
+            "numeric": field.annotation in (int, float),
+        }
+        for m in field.metadata:
+            for bound in ("ge", "le"):
+                if hasattr(m, bound):
+                    spec[bound] = getattr(m, bound)
+        specs[name] = spec
+    return specs
+
+
+def missing_required_columns(columns: List[str]) -> List[str]:
+    """Required CustomerFeatures fields absent from columns (file-level, checked once)."""
+    return [n for n, s in _field_specs().items() if s["required"] and n not in columns]
+
+
+def validate_chunk(df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, Dict[str, int]]:
+    """Coerce and validate a chunk column by column.
+
+    Returns (clean frame with optional columns defaulted, row validity mask,
+    {column: invalid row count}). Invalid rows are reported, not scored.
+    """
+    df = df.copy()
+    valid = np.ones(len(df), dtype=bool)
+    errors: Dict[str, int] = {}
+    for name, spec in _field_specs().items():
+        if name not in df.columns:
+            if spec["required"]:
+                valid[:] = False
+                errors[name] = len(df)
+                continue
+            df[name] = spec["default"]
+        if spec["numeric"]:
+            col = pd.to_numeric(df[name], errors="coerce")
+            bad = col.isna().to_numpy().copy()
+            if "ge" in spec:
+                bad |= (col < spec["ge"]).to_numpy()
+            if "le" in spec:
+                bad |= (col > spec["le"]).to_numpy()
+            df[name] = col
+        else:
+            bad = df[name].isna().to_numpy().copy()
+            df[name] = df[name].astype(str)
+        n_bad = int(bad.sum())
+        if n_bad:
+            errors[name] = n_bad
+            valid &= ~bad
+    return df, valid, errors
+
+
+def _sniff_sep(head: bytes) -> str:
+    first = head.split(b"\n", 1)[0]
+    return ";" if first.count(b";") > first.count(b",") else ","
+
+
+def iter_input_chunks(
+    source: Union[str, BinaryIO],
+    name: Optional[str] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    skip_rows: int = 0,
+) -> Iterator[pd.DataFrame]:
+    """Stream a CSV (',' or ';' separated) or Parquet file/upload as DataFrame chunks.
+
+    skip_rows data rows are skipped first (CSV lines are skipped without parsing them).
+    """
+    name = name or getattr(source, "name", str(source))
+    if str(name).endswith(".parquet"):
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(source)
+        first = 0
+        while first < pf.num_row_groups and pf.metadata.row_group(first).num_rows <= skip_rows:
+            skip_rows -= pf.metadata.row_group(first).num_rows
+            first += 1
+        for batch in pf.iter_batches(
+            batch_size=chunk_rows, row_groups=list(range(first, pf.num_row_groups))
+        ):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.slice(skip_rows).to_pandas()
+            skip_rows = 0
+        return
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        with open(source, "rb") as f:
+            sep = _sniff_sep(f.read(65536))
+    else:
+        pos = source.tell()
+        sep = _sniff_sep(source.read(65536))
+        source.seek(pos)
+    skip = range(1, skip_rows + 1) if skip_rows else None
+    yield from pd.read_csv(source, sep=sep, chunksize=chunk_rows, skiprows=skip)
+
+
+def score_chunk(
+    df: pd.DataFrame, top_k: Optional[int] = None
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Validate, score and rank one chunk; returns (output frame, error counts)."""
+    clean, valid, errors = validate_chunk(df)
+    out = df.copy()
+    out["valid"] = valid
+    propensity = np.full(len(df), np.nan)
+    top_offer = np.full(len(df), "", dtype=object)
+    top_score = np.full(len(df), np.nan)
+    ranked = np.full(len(df), "", dtype=object)
+    if valid.any():
+        scores, matrix, ids = score_offers(clean.loc[valid].reset_index(drop=True))
+        order = rank_offers_batch(matrix, top_k)
+        offer_ids = np.array(ids, dtype=object)
+        propensity[valid] = scores
+        top_offer[valid] = offer_ids[order[:, 0]]
+        top_score[valid] = matrix[np.arange(len(scores)), order[:, 0]]
+        ranked[valid] = ["|".join(row) for row in offer_ids[order]]
+    out["propensity"] = propensity
+    out["top_offer"] = top_offer
+    out["top_offer_score"] = top_score
+    out["ranked_offers"] = ranked
+    return out, errors
+
+
+def score_stream(
+    chunks: Iterator[pd.DataFrame],
+    sink: BinaryIO,
+    top_k: Optional[int] = None,
+    progress: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """Score chunks and append them as CSV to sink (header once); return a run summary.
+
+    progress, if given, is called with the running row count after each chunk.
+    """
+    summary: Dict[str, Any] = {"rows": 0, "valid_rows": 0, "errors": {}, "top_offer_counts": {}}
+    text = io.TextIOWrapper(sink, encoding="utf-8", newline="", write_through=True)
+    for i, chunk in enumerate(chunks):
+        out, errors = score_chunk(chunk, top_k)
+        out.to_csv(text, index=False, header=(i == 0))
+        summary["rows"] += len(out)
+        summary["valid_rows"] += int(out["valid"].sum())
+        for col, n in errors.items():
+            summary["errors"][col] = summary["errors"].get(col, 0) + n
+        for offer, n in out.loc[out["valid"], "top_offer"].value_counts().items():
+            summary["top_offer_counts"][offer] = summary["top_offer_counts"].get(offer, 0) + int(n)
+        if progress is not None:
+            progress(summary["rows"])
+    text.flush()
+    text.detach()
+    return summary
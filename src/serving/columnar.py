@@ -0,0 +1,148 @@
+"""Columnar transform: Arrow record batches or dicts of NumPy columns straight to the model matrix.
+
+The fitted ColumnTransformer is compiled once into per-column instructions: numeric
+columns are scaled into their output slot, and categorical columns get a level ->
+output column lookup (columns of a BoundedCategoricalEncoder map their levels through
+the encoder itself). Dictionary-encoded Arrow columns (and pandas Categoricals) are
+mapped through their small dictionary, so row values are never materialized as
+strings; plain string columns are dictionary-encoded by Arrow (or factorized) first.
+The output is written into one preallocated matrix, float32 by default (the dtype
+tree models predict on), with no intermediate DataFrame.
+"""
+from typing import Any, Dict, Mapping, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.pipelines.features import BoundedCategoricalEncoder, LevelIndicators
+
+ColumnarBatch = Union["pa.RecordBatch", "pa.Table", Mapping[str, Any]]  # noqa: F821
+
+
+def compile_preprocessor(preprocessor: Any) -> Dict[str, Any]:
+    """Per-column transform plan from a fitted ColumnTransformer.
+
+    Raises ValueError for transformers the columnar path does not implement.
+    """
+    numeric: Dict[str, Tuple[int, float, float]] = {}
+    categorical: Dict[str, Dict[str, int]] = {}
+    encoded: Dict[str, Tuple[BoundedCategoricalEncoder, int, int]] = {}
+    for name, trans, cols in preprocessor.transformers_:
+        if trans == "drop" or len(cols) == 0:
+            continue
+        start = preprocessor.output_indices_[name].start
+        if isinstance(trans, StandardScaler):
+            mean = trans.mean_ if trans.with_mean else np.zeros(len(cols))
+            scale = trans.scale_ if trans.with_std else np.ones(len(cols))
+            for i, col in enumerate(cols):
+                numeric[col] = (start + i, float(mean[i]), float(scale[i]))
+        elif isinstance(trans, (OneHotEncoder, LevelIndicators)):
+            if getattr(trans, "infrequent_categories_", None) is not None:
+                raise ValueError(
+                    f"{name}: infrequent-category encoding is not supported by the columnar path"
+                )
+            drop_idx = getattr(trans, "drop_idx_", None)
+            pos = start
+            for i, (col, cats) in enumerate(zip(cols, trans.categories_)):
+                lookup = categorical.setdefault(col, {})
+                for j, level in enumerate(cats):
+                    if drop_idx is not None and drop_idx[i] is not None and j == drop_idx[i]:
+                        continue
+                    lookup[str(level)] = pos
+                    pos += 1
+        elif isinstance(trans, BoundedCategoricalEncoder):
+            for i, col in enumerate(cols):
+                encoded[col] = (trans, i, start + trans.offsets_[i])
+        else:
+            raise ValueError(
+                f"{name}: {type(trans).__name__} is not supported by the columnar path"
+            )
+    n_features = max((s.stop for s in preprocessor.output_indices_.values()), default=0)
+    return {
+        "numeric": numeric,
+        "categorical": categorical,
+        "encoded": encoded,
+        "n_features": n_features,
+    }
+
+
+def _get_column(columns: ColumnarBatch, name: str) -> Any:
+    if isinstance(columns, Mapping):
+        if name not in columns:
+            raise ValueError(f"Missing column {name!r}")
+        return columns[name]
+    if name not in columns.schema.names:
+        raise ValueError(f"Missing column {name!r}")
+    col = columns.column(name)
+    # Table columns are chunked; a single chunk is used as-is
+    if hasattr(col, "chunks"):
+        col = col.chunks[0] if col.num_chunks == 1 else col.combine_chunks()
+    return col
+
+
+def _num_rows(columns: ColumnarBatch) -> int:
+    if isinstance(columns, Mapping):
+        return len(next(iter(columns.values()))) if columns else 0
+    return columns.num_rows
+
+
+def _numeric_values(col: Any) -> np.ndarray:
+    if hasattr(col, "to_numpy") and not isinstance(col, (np.ndarray, pd.Series)):
+        return col.to_numpy(zero_copy_only=False)  # zero-copy unless there are nulls
+    return np.asarray(col)
+
+
+def _category_codes(col: Any) -> Tuple[np.ndarray, list]:
+    """(codes, levels) with codes indexing levels and -1 for nulls."""
+    if isinstance(col, pd.Series):
+        col = col.array
+    if isinstance(col, pd.Categorical):
+        return np.asarray(col.codes), list(col.categories)
+    if isinstance(col, (np.ndarray, list, pd.api.extensions.ExtensionArray)):
+        codes, levels = pd.factorize(np.asarray(col, dtype=object), use_na_sentinel=True)
+        return codes, list(levels)
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not pa.types.is_dictionary(col.type):
+        col = pc.dictionary_encode(col)
+    levels = col.dictionary.to_pylist()
+    return pc.fill_null(col.indices, -1).to_numpy(zero_copy_only=False), levels
+
+
+def transform_columns(
+    compiled: Dict[str, Any], columns: ColumnarBatch, dtype: Any = np.float32
+) -> np.ndarray:
+    """Model input matrix (rows x n_features) from Arrow / dict-of-NumPy columns.
+
+    Unknown category levels and null categoricals encode as all zeros, as with
+    handle_unknown="ignore" (bounded encoder columns as BoundedCategoricalEncoder does).
+    """
+    n = _num_rows(columns)
+    out = np.zeros((n, compiled["n_features"]), dtype=dtype)
+    for col, (pos, mean, scale) in compiled["numeric"].items():
+        values = _numeric_values(_get_column(columns, col))
+        out[:, pos] = (values - mean) / scale
+    rows = np.arange(n)
+    for col, lookup in compiled["categorical"].items():
+        codes, levels = _category_codes(_get_column(columns, col))
+        # level -> output column for the (small) dictionary; -1 for unknown, last slot for nulls
+        level_pos = np.array([lookup.get(str(v), -1) for v in levels] + [-1], dtype=np.int64)
+        target = level_pos[codes]
+        hit = target >= 0
+        out[rows[hit], target[hit]] = 1.0
+    for col, (encoder, i, start) in compiled.get("encoded", {}).items():
+        codes, levels = _category_codes(_get_column(columns, col))
+        offsets, values = encoder.encode_levels(i, list(levels) + [None])
+        target, value = offsets[codes], values[codes]
+        hit = target >= 0
+        out[rows[hit], start + target[hit]] = value[hit]
+    return out
+
+
+def columns_to_frame(columns: ColumnarBatch) -> pd.DataFrame:
+    """pandas view of a columnar batch (only for consumers that need a frame, e.g. logging)."""
+    if isinstance(columns, Mapping):
+        return pd.DataFrame(dict(columns))
+    return columns.to_pandas()
@@ -0,0 +1,288 @@
+"""Batched per-prediction explanations for the gradient boosting models (TreeSHAP).
+
+Attributions are exact path-dependent TreeSHAP values in log-odds space, so for every
+row base_value + contributions.sum() equals the model's decision_function. Instead of
+the recursive per-row algorithm, each leaf's SHAP contribution is precomputed once per
+model for every pattern of which of its path features a row agrees with (at most
+2**max_depth patterns). Explaining a batch is then vectorized: compare all rows against
+all split thresholds, build each leaf's agreement bitmask, and gather from the tables.
+One-hot columns are summed back to the CustomerFeatures field they encode.
+"""
+from math import factorial
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.pipelines.features import transform
+from src.serving.predict import get_offer_bundle, load_model
+from src.utils.config import get_app_config
+
+_explainer_cache: Dict[Optional[str], Dict[str, Any]] = {}
+
+# rows per chunk are chosen so each chunk touches about this many (row, leaf path) cells
+_CHUNK_CELLS = 4_000_000
+
+
+def _leaf_paths(tree: Any) -> List[Tuple[int, List[Tuple[int, bool]]]]:
+    """(leaf node, [(internal node, went_left), ...]) for every root-to-leaf path."""
+    left, right = tree.children_left, tree.children_right
+    out = []
+    stack = [(0, [])]
+    while stack:
+        node, path = stack.pop()
+        if left[node] == -1:
+            out.append((node, path))
+            continue
+        stack.append((right[node], path + [(node, False)]))
+        stack.append((left[node], path + [(node, True)]))
+    return out
+
+
+def _shap_weights(d: int) -> np.ndarray:
+    return np.array([factorial(s) * factorial(d - s - 1) / factorial(d) for s in range(d)])
+
+
+def _leaf_table(value: float, zero: np.ndarray, width: int) -> np.ndarray:
+    """SHAP contribution of one leaf to each of its d path features, for every agreement pattern.
+
+    Row p holds the contributions when path feature k agrees with x iff bit k of p is set.
+    Returns shape (2**width, width); patterns/slots beyond d = len(zero) stay zero.
+    """
+    d = len(zero)
+    table = np.zeros((2 ** width, width))
+    patterns = np.arange(2 ** d)
+    ones = ((patterns[:, None] >> np.arange(d)) & 1).astype(float)
+    weights = _shap_weights(d)
+    for i in range(d):
+        # coefficients of prod_{k != i} (zero_k + one_k * t):
+        # coefficient s sums over subsets of size s
+        coef = np.ones((len(patterns), 1))
+        for k in range(d):
+            if k == i:
+                continue
+            nxt = np.zeros((len(patterns), coef.shape[1] + 1))
+            nxt[:, :-1] += coef * zero[k]
+            nxt[:, 1:] += coef * ones[:, k:k + 1]
+            coef = nxt
+        table[: len(patterns), i] = value * (ones[:, i] - zero[i]) * (coef @ weights)
+    return table
+
+
+def build_tree_explainer(model: Any) -> Dict[str, Any]:
+    """Split arrays and per-leaf pattern tables for a fitted binary GradientBoostingClassifier."""
+    estimators = getattr(model, "estimators_", None)
+    if estimators is None or np.ndim(estimators) != 2 or estimators.shape[1] != 1:
+        raise ValueError(
+            f"Tree explanations need a binary gradient boosting model, got {type(model).__name__}"
+        )
+    lr = float(model.learning_rate)
+    trees = [est.tree_ for est in estimators[:, 0]]
+    paths = [_leaf_paths(t) for t in trees]
+    width = (
+        max(
+            (
+                len({int(t.feature[n]) for n, _ in path})
+                for t, leaves in zip(trees, paths)
+                for _, path in leaves
+            ),
+            default=1,
+        )
+        or 1
+    )
+
+    # constant initial log-odds: decision_function minus the scaled tree outputs at any point
+    x0 = np.zeros((1, model.n_features_in_))
+    init = float(model.decision_function(x0)[0]) - lr * sum(
+        float(est.predict(x0)[0]) for est in estimators[:, 0]
+    )
+
+    split_feature, split_threshold = [], []
+    step_split, step_left, step_bit, leaf_start, leaf_full = [], [], [], [], []
+    tables, col_leaf, col_slot, col_feature = [], [], [], []
+    expected = 0.0
+    for tree, leaves in zip(trees, paths):
+        cover = tree.weighted_n_node_samples
+        expected += sum(
+            float(tree.value[leaf, 0, 0]) * cover[leaf] / cover[0] for leaf, _ in leaves
+        )
+        if len(leaves) == 1:
+            continue  # single-leaf tree: constant, no attribution
+        split_id = {}
+        for node in np.flatnonzero(tree.children_left != -1):
+            split_id[int(node)] = len(split_feature)
+            split_feature.append(int(tree.feature[node]))
+            split_threshold.append(float(tree.threshold[node]))
+        for leaf, path in leaves:
+            slots: Dict[int, int] = {}
+            zero: List[float] = []
+            leaf_start.append(len(step_split))
+            for node, went_left in path:
+                child = tree.children_left[node] if went_left else tree.children_right[node]
+                f = int(tree.feature[node])
+                if f not in slots:
+                    slots[f] = len(zero)
+                    zero.append(1.0)
+                zero[slots[f]] *= cover[child] / cover[node]
+                step_split.append(split_id[node])
+                step_left.append(went_left)
+                step_bit.append(1 << slots[f])
+            leaf_index = len(leaf_full)
+            leaf_full.append((1 << len(zero)) - 1)
+            tables.append(_leaf_table(lr * float(tree.value[leaf, 0, 0]), np.asarray(zero), width))
+            for f, k in slots.items():
+                col_leaf.append(leaf_index)
+                col_slot.append(k)
+                col_feature.append(f)
+
+    # order (leaf, slot) columns by feature so per-feature sums are one reduceat
+    col_feature = np.asarray(col_feature, dtype=np.intp)
+    order = np.argsort(col_feature, kind="stable")
+    col_feature = col_feature[order]
+    features, feature_start = np.unique(col_feature, return_index=True)
+    return {
+        "n_features": int(model.n_features_in_),
+        "width": width,
+        "base_value": init + lr * expected,
+        "split_feature": np.asarray(split_feature, dtype=np.intp),
+        "split_threshold": np.asarray(split_threshold),
+        "step_split": np.asarray(step_split, dtype=np.intp),
+        "step_left": np.asarray(step_left, dtype=bool),
+        "step_bit": np.asarray(step_bit, dtype=np.int32),
+        "leaf_start": np.asarray(leaf_start, dtype=np.intp),
+        "leaf_full": np.asarray(leaf_full, dtype=np.int32),
+        "table": np.stack(tables).ravel() if tables else np.zeros(0),
+        "col_leaf": np.asarray(col_leaf, dtype=np.intp)[order],
+        "col_slot": np.asarray(col_slot, dtype=np.intp)[order],
+        "features": features,
+        "feature_start": feature_start,
+    }
+
+
+def tree_contributions(explainer: Dict[str, Any], X: np.ndarray) -> np.ndarray:
+    """TreeSHAP contributions (n_rows x n_features, log-odds) for a transformed feature matrix."""
+    n = X.shape[0]
+    out = np.zeros((n, explainer["n_features"]))
+    if len(explainer["leaf_full"]) == 0 or n == 0:
+        return out
+    # trees split on float32 features, so compare in float32 to follow the same branches
+    X = np.asarray(X, dtype=np.float32)
+    n_patterns = 1 << explainer["width"]
+    width = explainer["width"]
+    col_base = explainer["col_leaf"] * n_patterns
+    chunk = max(64, _CHUNK_CELLS // max(1, len(explainer["step_split"])))
+    for lo in range(0, n, chunk):
+        Xc = X[lo: lo + chunk]
+        goes_left = Xc[:, explainer["split_feature"]] <= explainer["split_threshold"]
+        disagree = goes_left[:, explainer["step_split"]] != explainer["step_left"]
+        fail_bits = np.bitwise_or.reduceat(
+            disagree * explainer["step_bit"], explainer["leaf_start"], axis=1
+        )
+        pattern = explainer["leaf_full"] & ~fail_bits
+        idx = (col_base + pattern[:, explainer["col_leaf"]]) * width + explainer["col_slot"]
+        values = explainer["table"][idx]
+        out[lo : lo + chunk, explainer["features"]] = np.add.reduceat(
+            values, explainer["feature_start"], axis=1
+        )
+    return out
+
+
+def field_index(feature_names: List[str], fields: List[str]) -> np.ndarray:
+    """Field position for each model column (one-hot "job_admin." -> "job"; longest prefix wins)."""
+    out = np.empty(len(feature_names), dtype=np.intp)
+    by_length = sorted(range(len(fields)), key=lambda i: -len(fields[i]))
+    for j, name in enumerate(feature_names):
+        match = next(
+            (i for i in by_length if name == fields[i] or name.startswith(fields[i] + "_")), None
+        )
+        if match is None:
+            raise ValueError(f"Model column {name!r} does not map to a customer feature field")
+        out[j] = match
+    return out
+
+
+def _get_explainer(offer_id: Optional[str] = None) -> Tuple[Dict[str, Any], np.ndarray, List[str]]:
+    """(explainer, column index into the shared matrix, names) for the primary or an offer model.
+
+    Without an offer models bundle, offer scores derive from the primary model, so it is
+    the model explained for every offer.
+    """
+    model, _, feature_names = load_model()
+    bundle = get_offer_bundle()
+    idx = np.arange(len(feature_names))
+    if offer_id is not None and bundle is not None:
+        if offer_id not in bundle["models"]:
+            raise ValueError(f"Unknown offer {offer_id!r}; expected one of {bundle['offers']}")
+        model, idx = bundle["models"][offer_id], bundle["feature_idx"][offer_id]
+    else:
+        offer_id = None
+    cached = _explainer_cache.get(offer_id)
+    if cached is None or cached["model"] is not model:
+        cached = {"model": model, "explainer": build_tree_explainer(model)}
+        _explainer_cache[offer_id] = cached
+    return cached["explainer"], idx, [feature_names[i] for i in idx]
+
+
+def explain_batch(
+    features: pd.DataFrame,
+    offer_id: Optional[str] = None,
+    top_n: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Per-row contributions (log-odds) of each CustomerFeatures field to the score.
+
+    Returns {"base_value", "fields", "contributions"} with an n_rows x n_fields array, or
+    with top_n {"base_value", "top_fields", "top_values"}: the n_rows x top_n largest
+    absolute contributions, keeping only those per chunk.
+    """
+    from src.serving.schema import CustomerFeatures
+
+    explainer, idx, columns = _get_explainer(offer_id)
+    _, preprocessor, _ = load_model()
+    fields = [
+        f
+        for f in CustomerFeatures.model_fields
+        if any(c == f or c.startswith(f + "_") for c in columns)
+    ]
+    to_field = field_index(columns, fields)
+    X = transform(preprocessor, features)
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    X = X[:, idx]
+    base_value = explainer["base_value"]
+    if top_n is None:
+        contrib = _sum_by_field(tree_contributions(explainer, X), to_field, len(fields))
+        return {"base_value": base_value, "fields": fields, "contributions": contrib}
+    top_n = min(top_n, len(fields))
+    names = np.asarray(fields, dtype=object)
+    top_fields = np.empty((len(X), top_n), dtype=object)
+    top_values = np.empty((len(X), top_n))
+    chunk = 10_000
+    for lo in range(0, len(X), chunk):
+        contrib = _sum_by_field(
+            tree_contributions(explainer, X[lo : lo + chunk]), to_field, len(fields)
+        )
+        order = np.argsort(-np.abs(contrib), axis=1)[:, :top_n]
+        top_fields[lo: lo + chunk] = names[order]
+        top_values[lo: lo + chunk] = np.take_along_axis(contrib, order, axis=1)
+    return {"base_value": base_value, "top_fields": top_fields, "top_values": top_values}
+
+
+def _sum_by_field(contrib: np.ndarray, to_field: np.ndarray, n_fields: int) -> np.ndarray:
+    onehot = np.zeros((len(to_field), n_fields))
+    onehot[np.arange(len(to_field)), to_field] = 1.0
+    return contrib @ onehot
+
+
+def explain(
+    features: Union[pd.DataFrame, dict],
+    offer_id: Optional[str] = None,
+    top_n: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Top contributions for one profile: [{feature, value, contribution}] by |contribution|."""
+    df = pd.DataFrame([features]) if isinstance(features, dict) else features.iloc[[0]]
+    top_n = top_n or get_app_config().get("explain", {}).get("top_n", 5)
+    result = explain_batch(df, offer_id=offer_id, top_n=top_n)
+    return [
+        {"feature": name, "value": df.iloc[0].get(name), "contribution": float(value)}
+        for name, value in zip(result["top_fields"][0], result["top_values"][0])
+    ]
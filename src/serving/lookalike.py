@@ -0,0 +1,238 @@
+"""Lookalike customer search over transformed feature vectors (or model leaf embeddings).
+
+Vectors are held as one contiguous float32 matrix with precomputed squared norms, so
+squared Euclidean distance to a block of seeds is a single sgemm:
+||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x. The exact index scans the base in blocks and
+keeps a running top-k per seed. The "ivf" index clusters the base with k-means,
+stores vectors grouped by cluster, and scans only the n_probe clusters nearest each
+seed, grouping seeds by probed cluster so each cluster is one matrix product.
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.utils.config import get_app_config
+
+# elements of one (seeds x base rows) distance block, ~64 MB of float32
+_BLOCK_ELEMENTS = 16_000_000
+
+
+def get_lookalike_config() -> Dict[str, Any]:
+    """lookalike section of app.yaml."""
+    return get_app_config().get("lookalike", {})
+
+
+def embed(df: pd.DataFrame, kind: Optional[str] = None) -> np.ndarray:
+    """float32 vectors for customers: preprocessor features, or per-tree leaf values ("leaves")."""
+    from src.pipelines.features import transform
+    from src.serving.predict import load_model
+
+    kind = kind or get_lookalike_config().get("embedding", "features")
+    model, preprocessor, _ = load_model()
+    X = transform(preprocessor, df)
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    if kind == "features":
+        return np.ascontiguousarray(X, dtype=np.float32)
+    if kind == "leaves":
+        if not hasattr(model, "apply"):
+            raise ValueError(f"Leaf embeddings need a tree ensemble, got {type(model).__name__}")
+        leaves = model.apply(X).reshape(len(X), -1).astype(np.intp)
+        trees = model.estimators_.ravel()
+        out = np.empty((len(X), len(trees)), dtype=np.float32)
+        for t, est in enumerate(trees):
+            out[:, t] = est.tree_.value[leaves[:, t], 0, 0] * model.learning_rate
+        return out
+    raise ValueError(f"Unknown embedding kind {kind!r}; expected 'features' or 'leaves'")
+
+
+def _sq_norms(X: np.ndarray) -> np.ndarray:
+    return np.einsum("ij,ij->i", X, X)
+
+
+def _merge_topk(
+    best_d: np.ndarray, best_i: np.ndarray, cand_d: np.ndarray, cand_i: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row k smallest of the current best and new candidates (unsorted)."""
+    d = np.concatenate([best_d, cand_d], axis=1)
+    i = np.concatenate([best_i, cand_i], axis=1)
+    if d.shape[1] <= k:
+        return d, i
+    part = np.argpartition(d, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(d, part, axis=1), np.take_along_axis(i, part, axis=1)
+
+
+def _block_topk(
+    Q: np.ndarray, q_norms: np.ndarray, V: np.ndarray, v_norms: np.ndarray, k: int, offset: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k of Q against V (row positions offset by `offset`), scanning V in blocks."""
+    best_d = np.empty((len(Q), 0), dtype=np.float32)
+    best_i = np.empty((len(Q), 0), dtype=np.int64)
+    block = max(1024, _BLOCK_ELEMENTS // max(1, len(Q)))
+    for lo in range(0, len(V), block):
+        d = Q @ V[lo: lo + block].T  # (q, block): one sgemm, then in-place to distances
+        d *= -2.0
+        d += v_norms[None, lo: lo + block]
+        d += q_norms[:, None]
+        kk = min(k, d.shape[1])
+        part = np.argpartition(d, kk - 1, axis=1)[:, :kk] if kk < d.shape[1] else np.broadcast_to(
+            np.arange(d.shape[1]), d.shape
+        )
+        cand_d = np.take_along_axis(d, part, axis=1)
+        best_d, best_i = _merge_topk(best_d, best_i, cand_d, part + (offset + lo), k)
+    return best_d, best_i
+
+
+def _kmeans(X: np.ndarray, n_clusters: int, n_iter: int, seed: int) -> np.ndarray:
+    rs = np.random.RandomState(seed)
+    centroids = X[rs.choice(len(X), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = _nearest_centroid(X, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, X)
+        counts = np.bincount(assign, minlength=n_clusters)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # re-seed empty clusters on random points
+        centroids[empty] = X[rs.choice(len(X), int(empty.sum()), replace=False)]
+    return centroids
+
+
+def _nearest_centroid(X: np.ndarray, centroids: np.ndarray, n: int = 1) -> np.ndarray:
+    """Indices of the n nearest centroids per row (n=1 returns a 1-D array)."""
+    c_norms = _sq_norms(centroids)
+    out = np.empty((len(X), n), dtype=np.int64)
+    block = max(1024, _BLOCK_ELEMENTS // max(1, len(centroids)))
+    for lo in range(0, len(X), block):
+        d = c_norms[None, :] - 2.0 * (X[lo: lo + block] @ centroids.T)
+        if n == 1:
+            out[lo: lo + block, 0] = d.argmin(axis=1)
+        else:
+            part = np.argpartition(d, n - 1, axis=1)[:, :n]
+            out[lo: lo + block] = part
+    return out[:, 0] if n == 1 else out
+
+
+def build_index(
+    vectors: np.ndarray,
+    ids: Optional[Sequence[Any]] = None,
+    method: Optional[str] = None,
+    n_lists: Optional[int] = None,
+    n_iter: int = 10,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Index over vectors (n x d). method "exact" or "ivf" (k-means inverted lists)."""
+    cfg = get_lookalike_config()
+    method = method or cfg.get("method", "exact")
+    V = np.ascontiguousarray(vectors, dtype=np.float32)
+    ids = np.arange(len(V)) if ids is None else np.asarray(ids)
+    if len(ids) != len(V):
+        raise ValueError(f"Got {len(ids)} ids for {len(V)} vectors")
+    if method == "exact":
+        return {"method": "exact", "vectors": V, "norms": _sq_norms(V), "ids": ids}
+    if method != "ivf":
+        raise ValueError(f"Unknown index method {method!r}; expected 'exact' or 'ivf'")
+    n_lists = n_lists or cfg.get("n_lists") or int(np.clip(np.sqrt(len(V)), 1, 4096))
+    n_lists = min(n_lists, len(V))
+    rs = np.random.RandomState(seed)
+    train = V[rs.choice(len(V), min(len(V), 256 * n_lists), replace=False)]
+    centroids = _kmeans(train, n_lists, n_iter, seed)
+    assign = _nearest_centroid(V, centroids)
+    order = np.argsort(assign, kind="stable")
+    V = V[order]
+    return {
+        "method": "ivf",
+        "vectors": V,
+        "norms": _sq_norms(V),
+        "ids": ids[order],
+        "centroids": centroids,
+        "offsets": np.searchsorted(assign[order], np.arange(n_lists + 1)),
+    }
+
+
+def search(
+    index: Dict[str, Any],
+    queries: np.ndarray,
+    k: int = 10,
+    n_probe: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(squared distances, ids), each n_queries x k, nearest first.
+
+    With ivf, slots beyond the vectors held by the probed lists have distance inf.
+    """
+    Q = np.ascontiguousarray(queries, dtype=np.float32)
+    q_norms = _sq_norms(Q)
+    k = min(k, len(index["vectors"]))
+    if index["method"] == "exact":
+        best_d, best_pos = _block_topk(Q, q_norms, index["vectors"], index["norms"], k)
+    else:
+        n_lists = len(index["centroids"])
+        n_probe = min(n_probe or get_lookalike_config().get("n_probe", 8), n_lists)
+        probe = _nearest_centroid(Q, index["centroids"], n_probe).reshape(len(Q), n_probe)
+        best_d = np.full((len(Q), k), np.inf, dtype=np.float32)
+        best_pos = np.full((len(Q), k), -1, dtype=np.int64)
+        # group (query, list) pairs by list so each probed list is one matrix product
+        pair_q = np.repeat(np.arange(len(Q)), n_probe)
+        pair_l = probe.ravel()
+        order = np.argsort(pair_l, kind="stable")
+        pair_q, pair_l = pair_q[order], pair_l[order]
+        bounds = np.flatnonzero(np.diff(pair_l)) + 1
+        offsets = index["offsets"]
+        for qs, lst in zip(
+            np.split(pair_q, bounds), pair_l[np.r_[0, bounds]] if len(pair_l) else []
+        ):
+            lo, hi = offsets[lst], offsets[lst + 1]
+            if hi == lo:
+                continue
+            d, pos = _block_topk(
+                Q[qs], q_norms[qs], index["vectors"][lo:hi], index["norms"][lo:hi], k, lo
+            )
+            best_d[qs], best_pos[qs] = _merge_topk(best_d[qs], best_pos[qs], d, pos, k)
+    order = np.argsort(best_d, axis=1)
+    best_d = np.take_along_axis(best_d, order, axis=1)
+    best_pos = np.take_along_axis(best_pos, order, axis=1)
+    return np.maximum(best_d, 0.0), index["ids"][np.maximum(best_pos, 0)]
+
+
+def expand_audience(
+    index: Dict[str, Any],
+    seeds: np.ndarray,
+    size: int,
+    k_per_seed: int = 50,
+    exclude_ids: Optional[Sequence[Any]] = None,
+    n_probe: Optional[int] = None,
+) -> pd.DataFrame:
+    """Customers most similar to the seeds, excluding exclude_ids (e.g. the seeds themselves).
+
+    Ranked by how many seeds list them among their k_per_seed neighbours, then by the
+    closest distance to any seed. Returns columns id, hits, min_distance.
+    """
+    dist, ids = search(index, seeds, k=k_per_seed, n_probe=n_probe)
+    found = pd.DataFrame({"id": ids.ravel(), "distance": dist.ravel()})
+    found = found[np.isfinite(found["distance"].to_numpy())]
+    if exclude_ids is not None:
+        found = found[~found["id"].isin(pd.Index(exclude_ids))]
+    ranked = (
+        found.groupby("id", sort=False)["distance"]
+        .agg(hits="size", min_distance="min")
+        .reset_index()
+    )
+    ranked = ranked.sort_values(["hits", "min_distance"], ascending=[False, True], kind="stable")
+    return ranked.head(size).reset_index(drop=True)
+
+
+def save_index(index: Dict[str, Any], path: Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(index, path)
+    return path
+
+
+def load_index(path: Path) -> Dict[str, Any]:
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Lookalike index not found at {path}")
+    return joblib.load(path)
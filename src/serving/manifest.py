@@ -0,0 +1,180 @@
+"""Content-addressed artifact manifest: hashes, feature schema and config fingerprint.
+
+package_model writes manifest.json next to the joblib artifacts. The serving loader
+verifies it before unpickling anything, so a model paired with the wrong preprocessor
+fails at load instead of scoring silently wrong. Successful verification is recorded in
+a .verified stamp keyed by file size/mtime, letting other workers sharing the same
+directory skip re-hashing until the files change.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.utils.config import get_model_config
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+STAMP_NAME = ".verified"
+MANIFEST_FORMAT = 1
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def config_fingerprint(cfg: Optional[dict] = None) -> str:
+    """sha256 of the model config (model.yaml) in canonical JSON form."""
+    cfg = cfg if cfg is not None else get_model_config()
+    return hashlib.sha256(json.dumps(cfg, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _feature_schema(preprocessor: Any, feature_names: List[str]) -> Dict[str, Any]:
+    from src.pipelines.features import get_category_vocabulary
+
+    columns = {
+        name: list(cols) for name, _, cols in preprocessor.transformers_ if name in ("num", "cat")
+    }
+    return {
+        "numerical": columns.get("num", []),
+        "categorical": columns.get("cat", []),
+        "feature_names": list(feature_names),
+        "n_features": len(feature_names),
+        "categories": get_category_vocabulary(preprocessor),
+    }
+
+
+def build_manifest(
+    model_dir: Path,
+    model: Any,
+    preprocessor: Any,
+    feature_names: List[str],
+    files: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Manifest dict for the artifacts in model_dir."""
+    if files is None:
+        files = [
+            "model.joblib",
+            "preprocessor.joblib",
+            "feature_names.joblib",
+            "offer_models.joblib",
+        ]
+        files += sorted(
+            p.relative_to(model_dir).as_posix() for p in model_dir.glob("challengers/*.joblib")
+        )
+    artifacts = {
+        f: {"sha256": file_sha256(model_dir / f), "bytes": (model_dir / f).stat().st_size}
+        for f in files
+        if (model_dir / f).exists()
+    }
+    digest = hashlib.sha256(
+        "".join(a["sha256"] for _, a in sorted(artifacts.items())).encode()
+    ).hexdigest()
+    return {
+        "format": MANIFEST_FORMAT,
+        "model_version": digest[:12],
+        "created_at": datetime.now(tz=timezone.utc).isoformat(),
+        "model_type": type(model).__name__,
+        "model_n_features": int(getattr(model, "n_features_in_", len(feature_names))),
+        "config_fingerprint": config_fingerprint(),
+        "feature_schema": _feature_schema(preprocessor, feature_names),
+        "artifacts": artifacts,
+    }
+
+
+def write_manifest(manifest: Dict[str, Any], model_dir: Path) -> Path:
+    path = model_dir / MANIFEST_NAME
+    tmp = model_dir / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    tmp.replace(path)
+    (model_dir / STAMP_NAME).unlink(missing_ok=True)
+    return path
+
+
+def load_manifest(model_dir: Path) -> Optional[Dict[str, Any]]:
+    path = model_dir / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _file_stats(model_dir: Path, files: List[str]) -> Dict[str, List[int]]:
+    out = {}
+    for f in files:
+        st = (model_dir / f).stat()
+        out[f] = [st.st_size, st.st_mtime_ns]
+    return out
+
+
+def verify_artifacts(model_dir: Path, manifest: Dict[str, Any]) -> None:
+    """Raise ValueError unless every artifact matches its manifest hash.
+
+    Hashing is skipped when the .verified stamp matches the manifest version and the
+    files' current size/mtime.
+    """
+    files = sorted(manifest.get("artifacts", {}))
+    missing = [f for f in files if not (model_dir / f).exists()]
+    if missing:
+        raise FileNotFoundError(
+            f"Artifacts listed in manifest are missing from {model_dir}: {missing}"
+        )
+    stats = _file_stats(model_dir, files)
+    stamp_path = model_dir / STAMP_NAME
+    if stamp_path.exists():
+        try:
+            stamp = json.loads(stamp_path.read_text(encoding="utf-8"))
+            if (
+                stamp.get("model_version") == manifest.get("model_version")
+                and stamp.get("files") == stats
+            ):
+                return
+        except (OSError, ValueError):
+            pass
+    for f in files:
+        expected = manifest["artifacts"][f]["sha256"]
+        actual = file_sha256(model_dir / f)
+        if actual != expected:
+            raise ValueError(
+                f"Artifact {f} in {model_dir} does not match manifest "
+                f"(sha256 {actual[:12]} != {expected[:12]}); re-run 'make package'."
+            )
+    try:
+        tmp = model_dir / f"{STAMP_NAME}.{os.getpid()}.tmp"
+        tmp.write_text(
+            json.dumps({"model_version": manifest.get("model_version"), "files": stats}),
+            encoding="utf-8",
+        )
+        tmp.replace(stamp_path)
+    except OSError as e:  # read-only artifact mounts still serve, just re-hash next time
+        logger.debug("Could not write verification stamp: %s", e)
+
+
+def check_compatibility(
+    manifest: Optional[Dict[str, Any]],
+    model: Any,
+    feature_names: List[str],
+) -> None:
+    """Raise ValueError if model, preprocessor output and manifest schema disagree."""
+    n_model = getattr(model, "n_features_in_", None)
+    if n_model is not None and n_model != len(feature_names):
+        raise ValueError(
+            f"Model expects {n_model} features but preprocessor produces {len(feature_names)}; "
+            "model and preprocessor are from different training runs."
+        )
+    if manifest is None:
+        return
+    schema = manifest.get("feature_schema", {})
+    if schema.get("feature_names") and list(schema["feature_names"]) != list(feature_names):
+        raise ValueError("Preprocessor feature names do not match the manifest feature schema.")
+    fingerprint = manifest.get("config_fingerprint")
+    if fingerprint and fingerprint != config_fingerprint():
+        logger.warning("model.yaml changed since packaging (config fingerprint mismatch)")
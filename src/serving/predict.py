@@ -1,18 +1,35 @@
 """Single inference API: load artifacts and predict propensity."""
+import os
+import time
 from pathlib import Path
-from typing import Any, List, Optional, Union
+from typing import Any, List, Optional, Tuple, Union
 
-import joblib
 import numpy as np
 import pandas as pd
 
-from src.pipelines.features import load_preprocessor, transform
-from src.utils.paths import get_model_dir
+from src.pipelines.features import transform
+from src.pipelines.offer_models import score_offer_matrix
+from src.serving.columnar import (
+    ColumnarBatch,
+    columns_to_frame,
+    compile_preprocessor,
+    transform_columns,
+)
+from src.serving.manifest import check_compatibility, load_manifest
+from src.serving.prediction_log import get_sink
+from src.serving.registry import get_registry, load_artifacts
+from src.serving.shadow import get_shadow_scorer, load_challengers
+from src.utils.config import get_app_config
 from src.utils.paths import artifacts_path_from_env
 
 _model_cache: Optional[Any] = None
 _preprocessor_cache: Optional[Any] = None
 _feature_names_cache: Optional[List[str]] = None
+_manifest_cache: Optional[dict] = None
+_offer_bundle_cache: Optional[dict] = None
+_challengers_cache: dict = {}
+_columnar_cache: Optional[dict] = None
+_feature_store_cache: Optional[Any] = None
 
 
 def _get_artifacts_dir() -> Path:
@@ -20,20 +37,74 @@ def _get_artifacts_dir() -> Path:
 
 
 def load_model() -> Any:
-    """Load model and preprocessor (cached)."""
-    global _model_cache, _preprocessor_cache, _feature_names_cache
+    """Load model, preprocessor and challengers (cached); checks manifest.json when present."""
+    global _model_cache, _preprocessor_cache, _feature_names_cache, _manifest_cache
+    global _offer_bundle_cache, _challengers_cache, _columnar_cache
     if _model_cache is not None:
         return _model_cache, _preprocessor_cache, _feature_names_cache
     model_dir = _get_artifacts_dir()
-    if not (model_dir / "model.joblib").exists():
-        raise FileNotFoundError(f"Model not found at {model_dir}. Run 'make train' first.")
-    _model_cache = joblib.load(model_dir / "model.joblib")
-    _preprocessor_cache, _feature_names_cache = load_preprocessor(model_dir)
+    loaded = load_artifacts(model_dir)
+    model, preprocessor = loaded["model"], loaded["preprocessor"]
+    feature_names = loaded["feature_names"]
+    manifest, offer_bundle = loaded["manifest"], loaded["offer_bundle"]
+    challengers = {}
+    shadow_cfg = get_app_config().get("shadow", {})
+    if shadow_cfg.get("enabled", False):
+        challengers = load_challengers(model_dir, shadow_cfg.get("challengers"))
+        for challenger in challengers.values():
+            check_compatibility(None, challenger, feature_names)
+    _model_cache, _preprocessor_cache, _feature_names_cache = model, preprocessor, feature_names
+    _manifest_cache, _offer_bundle_cache, _challengers_cache = manifest, offer_bundle, challengers
+    _columnar_cache = None
     return _model_cache, _preprocessor_cache, _feature_names_cache
 
 
+def get_offer_bundle() -> Optional[dict]:
+    """Per-offer models bundle loaded with the primary model (None if not trained)."""
+    load_model()
+    return _offer_bundle_cache
+
+
+def refresh_model() -> bool:
+    """Reload artifacts only if the on-disk manifest version changed; return True if reloaded."""
+    global _model_cache
+    manifest = load_manifest(_get_artifacts_dir())
+    if (
+        _model_cache is not None
+        and manifest is not None
+        and _manifest_cache is not None
+        and manifest.get("model_version") == _manifest_cache.get("model_version")
+    ):
+        return False
+    _model_cache = None
+    load_model()
+    return True
+
+
+def get_model_version() -> str:
+    """Manifest model_version of the loaded artifacts (MODEL_VERSION env if unpackaged)."""
+    if _manifest_cache is not None and _model_cache is not None:
+        return _manifest_cache.get("model_version", "unknown")
+    return os.environ.get("MODEL_VERSION", "unknown")
+
+
+def _log_predictions(
+    df: pd.DataFrame, scores: np.ndarray, started: float, X: Optional[np.ndarray] = None
+) -> None:
+    """Enqueue served predictions to the prediction log and shadow scoring, if enabled."""
+    sink = get_sink()
+    if sink is not None:
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        sink.log(df, scores, get_model_version(), latency_ms)
+    if X is not None:
+        shadow = get_shadow_scorer(_challengers_cache)
+        if shadow is not None:
+            shadow.submit(X, df, scores, get_model_version())
+
+
 def predict(features: Union[pd.DataFrame, dict]) -> float:
     """Return propensity score in [0, 1] for one or more rows."""
+    started = time.perf_counter()
     model, preprocessor, _ = load_model()
     if isinstance(features, dict):
         df = pd.DataFrame([features])
@@ -44,13 +115,132 @@ def predict(features: Union[pd.DataFrame, dict]) -> float:
         X = X.toarray()
     X = np.atleast_2d(X)
     proba = model.predict_proba(X)[:, 1]
+    _log_predictions(df, proba, started, X)
     return float(proba[0]) if proba.size == 1 else proba.tolist()
 
 
-def predict_batch(features: pd.DataFrame) -> np.ndarray:
-    """Return array of propensity scores for a DataFrame."""
+def _get_columnar_plan(preprocessor: Any) -> dict:
+    global _columnar_cache
+    if _columnar_cache is None:
+        _columnar_cache = compile_preprocessor(preprocessor)
+    return _columnar_cache
+
+
+def predict_batch(features: Union[pd.DataFrame, ColumnarBatch], log: bool = True) -> np.ndarray:
+    """Return array of propensity scores (log=False skips the prediction log).
+
+    features is a DataFrame, or columns without a frame: a pyarrow RecordBatch/Table
+    or a dict of NumPy arrays, transformed directly by src.serving.columnar.
+    A logged frame is queued without a copy: do not mutate features after the call.
+    """
+    started = time.perf_counter()
+    model, preprocessor, _ = load_model()
+    if isinstance(features, pd.DataFrame):
+        X = transform(preprocessor, features)
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+    else:
+        X = transform_columns(_get_columnar_plan(preprocessor), features)
+    proba = model.predict_proba(X)[:, 1]
+    if log and (get_sink() is not None or _challengers_cache):
+        df = features if isinstance(features, pd.DataFrame) else columns_to_frame(features)
+        _log_predictions(df, proba, started, X)
+    return proba
+
+
+def predict_model(
+    name: str,
+    features: Union[pd.DataFrame, ColumnarBatch],
+    version: Optional[str] = None,
+    log: bool = True,
+) -> np.ndarray:
+    """Propensity scores from the registry model name@version (latest if None).
+
+    Loaded on demand and kept resident under the registry memory budget
+    (src.serving.registry); logged with model_version "name@version".
+    """
+    started = time.perf_counter()
+    entry = get_registry().get(name, version)
+    if isinstance(features, pd.DataFrame):
+        X = transform(entry["preprocessor"], features)
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+    else:
+        if entry["columnar"] is None:
+            entry["columnar"] = compile_preprocessor(entry["preprocessor"])
+        X = transform_columns(entry["columnar"], features)
+    proba = entry["model"].predict_proba(X)[:, 1]
+    sink = get_sink() if log else None
+    if sink is not None:
+        df = features if isinstance(features, pd.DataFrame) else columns_to_frame(features)
+        sink.log(
+            df,
+            proba,
+            f"{entry['name']}@{entry['version']}",
+            (time.perf_counter() - started) * 1000.0,
+        )
+    return proba
+
+
+def score_offers(features: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """(primary propensity, customers x offers matrix, offer ids) from a single transform.
+
+    Uses the per-offer models bundle when trained; otherwise derives the offer matrix
+    from the primary score (see src.serving.ranking.offer_score_matrix).
+    """
     model, preprocessor, _ = load_model()
     X = transform(preprocessor, features)
     if hasattr(X, "toarray"):
         X = X.toarray()
-    return model.predict_proba(X)[:, 1]
+    proba = model.predict_proba(X)[:, 1]
+    if _offer_bundle_cache is not None:
+        return (
+            proba,
+            score_offer_matrix(_offer_bundle_cache, X),
+            list(_offer_bundle_cache["offers"]),
+        )
+    from src.serving.ranking import get_offers, offer_score_matrix
+    offers = get_offers()
+    return proba, offer_score_matrix(proba, offers), [o.get("id", "") for o in offers]
+
+
+def predict_offers(features: Union[pd.DataFrame, dict]) -> pd.DataFrame:
+    """customers x offers propensity DataFrame (columns are offer ids)."""
+    df = pd.DataFrame([features]) if isinstance(features, dict) else features
+    _, matrix, offer_ids = score_offers(df)
+    return pd.DataFrame(matrix, columns=offer_ids, index=df.index)
+
+
+def _get_feature_store(preprocessor: Any) -> Any:
+    """Cached FeatureStore, reopened after refreshes and checked against the loaded preprocessor."""
+    global _feature_store_cache
+    from src.pipelines.feature_store import FeatureStore, preprocessor_fingerprint
+
+    store = _feature_store_cache
+    if store is None:
+        store = FeatureStore()
+    elif not store.reopen_if_changed() and store.preprocessor is preprocessor:
+        return store
+    if store.meta["preprocessor_fingerprint"] != preprocessor_fingerprint(preprocessor):
+        raise ValueError(
+            "Feature store was built with a different preprocessor; run 'make feature-store'."
+        )
+    store.preprocessor = preprocessor
+    _feature_store_cache = store
+    return store
+
+
+def predict_customers(ids: Any) -> np.ndarray:
+    """Propensity per customer id, scored from the feature store (NaN for ids not in it)."""
+    started = time.perf_counter()
+    model, preprocessor, _ = load_model()
+    store = _get_feature_store(preprocessor)
+    ids = np.atleast_1d(np.asarray(ids))
+    X, found = store.get(ids)
+    proba = np.full(len(found), np.nan)
+    if found.any():
+        proba[found] = model.predict_proba(X)[:, 1]
+        # the store holds no raw features; the id is what live metrics join outcomes on
+        logged = pd.DataFrame({store.meta.get("id_column") or "customer_id": ids[found]})
+        _log_predictions(logged, proba[found], started, X)
+    return proba
@@ -0,0 +1,254 @@
+"""Non-blocking prediction log: bounded in-memory queue flushed to rotated Parquet/JSONL files.
+
+The serving hot path only enqueues (features frame, scores, model version, latency).
+A background thread turns queued requests into rows and writes them in batches under
+<dir>/date=YYYY-MM-DD/. Files are plain feature columns plus score/metadata columns,
+so read_prediction_logs(...) output feeds compute_drift directly.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.config import get_app_config
+from src.utils.logging import get_logger
+from src.utils.paths import artifacts_path_from_env
+
+logger = get_logger(__name__)
+
+ON_FULL_POLICIES = ("drop", "drop_oldest", "block")
+
+_sink: Optional["PredictionLogSink"] = None
+_sink_lock = threading.Lock()
+
+
+def get_prediction_log_dir() -> Path:
+    """artifacts/predictions/ (honours ARTIFACTS_DIR)."""
+    return artifacts_path_from_env() / "predictions"
+
+
+class PredictionLogSink:
+    """Bounded queue + background writer thread for served predictions.
+
+    on_full decides what log() does when the queue is full: "drop" discards the new
+    entry, "drop_oldest" discards the oldest queued entry, "block" waits up to
+    block_timeout_s and then drops. Dropped entries are counted in stats.
+    log() copies the scores but not the feature frame: as with ShadowScorer.submit,
+    callers must not mutate features after logging them. Each process writes its own
+    files (the pid is in the name), so pre-forked workers never share one.
+    """
+
+    def __init__(
+        self,
+        log_dir: Optional[Path] = None,
+        fmt: str = "parquet",
+        max_queue: int = 10_000,
+        batch_rows: int = 5_000,
+        flush_interval_s: float = 2.0,
+        on_full: str = "drop",
+        block_timeout_s: float = 0.05,
+    ) -> None:
+        if fmt not in ("parquet", "jsonl"):
+            raise ValueError(f"Unsupported prediction log format: {fmt}")
+        if on_full not in ON_FULL_POLICIES:
+            raise ValueError(f"on_full must be one of {ON_FULL_POLICIES}, got {on_full}")
+        self.log_dir = Path(log_dir) if log_dir else get_prediction_log_dir()
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self.flush_interval_s = flush_interval_s
+        self.on_full = on_full
+        self.block_timeout_s = block_timeout_s
+        self.stats = {"enqueued": 0, "dropped": 0, "rows_written": 0, "files_written": 0}
+        self._stats_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._seq = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(
+        self,
+        features: pd.DataFrame,
+        scores: Any,
+        model_version: str = "unknown",
+        latency_ms: Optional[float] = None,
+    ) -> bool:
+        """Enqueue one served request/batch; return False if it was dropped."""
+        if self._closed:
+            return False
+        scores = np.array(scores, dtype=float).reshape(-1)
+        item = (features, scores, model_version, latency_ms, time.time())
+        try:
+            if self.on_full == "block":
+                self._queue.put(item, timeout=self.block_timeout_s)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            if self.on_full != "drop_oldest":
+                self._count("dropped")
+                return False
+            try:
+                self._queue.get_nowait()
+                self._count("dropped")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._count("dropped")
+                return False
+        self._count("enqueued")
+        return True
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Block until everything enqueued so far is written (or timeout)."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush pending entries and stop the writer thread."""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning(
+                "Prediction log writer did not drain; %d entries lost", self._queue.qsize()
+            )
+            return
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        pending: List[tuple] = []
+        n_pending = 0
+        last_flush = time.monotonic()
+        while True:
+            wait = max(0.0, self.flush_interval_s - (time.monotonic() - last_flush))
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                item = False
+            stop = item is None
+            if isinstance(item, tuple):
+                pending.append(item)
+                n_pending += len(item[0])
+            due = time.monotonic() - last_flush >= self.flush_interval_s
+            if pending and (
+                stop or isinstance(item, threading.Event) or due or n_pending >= self.batch_rows
+            ):
+                try:
+                    self._write(pending)
+                except Exception as e:  # never let logging take down the writer
+                    logger.warning(
+                        "Prediction log write failed (%d entries lost): %s", len(pending), e
+                    )
+                pending, n_pending = [], 0
+                last_flush = time.monotonic()
+            elif due:
+                last_flush = time.monotonic()
+            if isinstance(item, threading.Event):
+                item.set()
+            if stop:
+                return
+
+    def _to_frame(self, pending: List[tuple]) -> pd.DataFrame:
+        frames = []
+        for features, scores, model_version, latency_ms, ts in pending:
+            df = features.reset_index(drop=True).copy()
+            df["score"] = scores[: len(df)]
+            df["model_version"] = model_version
+            df["latency_ms"] = latency_ms
+            df["logged_at"] = pd.Timestamp(ts, unit="s", tz="UTC")
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+    def _write(self, pending: List[tuple]) -> None:
+        df = self._to_frame(pending)
+        now = datetime.now(tz=timezone.utc)
+        part_dir = self.log_dir / f"date={now:%Y-%m-%d}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        if self.fmt == "parquet":
+            self._seq += 1
+            path = part_dir / f"predictions-{now:%H%M%S}-{os.getpid()}-{self._seq:06d}.parquet"
+            tmp = path.with_suffix(".parquet.tmp")
+            df.to_parquet(tmp, index=False)
+            tmp.replace(path)
+            self._count("files_written")
+        else:
+            # One JSONL file per process and hour; appending rotates naturally on the hour
+            path = part_dir / f"predictions-{now:%H}-{os.getpid()}.jsonl"
+            existed = path.exists()
+            with open(path, "a", encoding="utf-8") as f:
+                df.to_json(f, orient="records", lines=True, date_format="iso")
+            self._count("files_written", 0 if existed else 1)
+        self._count("rows_written", len(df))
+
+
+def get_sink() -> Optional[PredictionLogSink]:
+    """Process-wide sink from app.yaml prediction_log (None when disabled)."""
+    global _sink
+    if _sink is not None:
+        return _sink
+    cfg = get_app_config().get("prediction_log", {})
+    if not cfg.get("enabled", False):
+        return None
+    with _sink_lock:
+        if _sink is None:
+            _sink = PredictionLogSink(
+                log_dir=cfg.get("dir"),
+                fmt=cfg.get("format", "parquet"),
+                max_queue=cfg.get("max_queue", 10_000),
+                batch_rows=cfg.get("batch_rows", 5_000),
+                flush_interval_s=cfg.get("flush_interval_s", 2.0),
+                on_full=cfg.get("on_full", "drop"),
+            )
+            atexit.register(_sink.close)
+    return _sink
+
+
+def close_sink() -> None:
+    """Flush and stop the process-wide sink, if any (for exits that skip atexit)."""
+    global _sink
+    with _sink_lock:
+        sink, _sink = _sink, None
+    if sink is not None:
+        sink.close()
+
+
+def read_prediction_logs(
+    log_dir: Optional[Path] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> pd.DataFrame:
+    """Load logged predictions (optionally for date partitions in [start_date, end_date])."""
+    log_dir = Path(log_dir) if log_dir else get_prediction_log_dir()
+    frames = []
+    for part in sorted(log_dir.glob("date=*")):
+        day = part.name.split("=", 1)[1]
+        if (start_date and day < start_date) or (end_date and day > end_date):
+            continue
+        for path in sorted(part.iterdir()):
+            if path.suffix == ".parquet":
+                frames.append(pd.read_parquet(path))
+            elif path.suffix == ".jsonl":
+                frames.append(pd.read_json(path, lines=True))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,64 @@
+"""Offer ranking from per-offer propensity scores.
+
+Without trained offer models, offer scores are derived from the single propensity
+with fixed per-offer offsets (the original demo behaviour).
+"""
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from src.utils.config import get_app_config
+
+
+def get_offers() -> List[Dict[str, Any]]:
+    """Offer catalog from app.yaml."""
+    return get_app_config().get("offers", [])
+
+
+def offer_score_matrix(
+    scores: np.ndarray, offers: Optional[List[Dict[str, Any]]] = None
+) -> np.ndarray:
+    """customers x offers score matrix; offer i gets base + 0.02 * (i - 2), clipped to [0, 1]."""
+    offers = offers if offers is not None else get_offers()
+    deltas = 0.02 * (np.arange(len(offers)) - 2)
+    return np.clip(np.asarray(scores, dtype=float)[:, None] + deltas[None, :], 0.0, 1.0)
+
+
+def rank_offers_batch(
+    score_matrix: np.ndarray,
+    top_k: Optional[int] = None,
+) -> np.ndarray:
+    """Offer column indices per customer, best first (stable for ties)."""
+    order = np.argsort(-score_matrix, axis=1, kind="stable")
+    return order[:, :top_k] if top_k else order
+
+
+def rank_offers(
+    scores: Union[float, Sequence[float]],
+    offers: Optional[List[Dict[str, Any]]] = None,
+    offer_ids: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Ranked offer cards for one customer: [{rank, offer_id, label, description, score}, ...].
+
+    scores is either one row of per-offer scores (ordered as offer_ids) or a single
+    propensity, which is spread over the catalog with offer_score_matrix.
+    """
+    offers = offers if offers is not None else get_offers()
+    if np.ndim(scores) == 0:
+        row = offer_score_matrix(np.array([scores]), offers)[0]
+        offer_ids = [o.get("id", "") for o in offers]
+    else:
+        row = np.asarray(scores, dtype=float)
+        offer_ids = offer_ids or [o.get("id", "") for o in offers]
+    by_id = {o.get("id", ""): o for o in offers}
+    ranked = []
+    for rank, j in enumerate(rank_offers_batch(row[None, :])[0], 1):
+        off = by_id.get(offer_ids[j], {"id": offer_ids[j]})
+        ranked.append({
+            "rank": rank,
+            "offer_id": offer_ids[j],
+            "label": off.get("label", offer_ids[j]),
+            "description": off.get("description", ""),
+            "score": float(row[j]),
+        })
+    return ranked
@@ -0,0 +1,364 @@
+"""Multi-model serving: models by name and version, loaded on demand, under a memory budget.
+
+Each model lives in <root>/<name>/<version>/ (root = artifacts/models/), a packaged
+model directory like artifacts/model/: model.joblib, preprocessor.joblib,
+feature_names.joblib, and optionally manifest.json and offer_models.joblib.
+publish() copies a packaged directory in, using its manifest model_version as the
+version. The single-model directory stays addressable as DEFAULT_NAME; it is served
+from the process's primary model (src.serving.predict.load_model), not loaded a second
+time, and follows its retrains. With no version, the newest (by manifest created_at) is
+used; the newest version per name is cached until the name's directory changes (a
+publish) or latest_ttl_s passes.
+
+ModelRegistry keeps loaded models in least-recently-used order. A model's footprint
+is its artifact file size; joblib dumps are uncompressed, so file size tracks the
+unpickled size. After each load, LRU unpinned models are evicted until resident size
+is within memory_budget_mb. Pinned models are never evicted. A miss loads outside
+the registry lock, so hits on other models are not blocked, and concurrent misses on
+one model load it once. stats() reports per-model hits, misses, loads, load time,
+evictions and hit rate.
+
+CLI: python -m src.serving.registry {list,publish NAME [--source DIR]}
+"""
+import argparse
+import json
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+from src.pipelines.features import load_preprocessor
+from src.pipelines.offer_models import load_offer_bundle
+from src.serving.manifest import check_compatibility, load_manifest, verify_artifacts
+from src.utils.config import get_app_config
+from src.utils.logging import get_logger
+from src.utils.paths import artifacts_path_from_env
+
+logger = get_logger(__name__)
+
+DEFAULT_NAME = "default"
+
+_registry: Optional["ModelRegistry"] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry_config() -> Dict[str, Any]:
+    """model_registry section of app.yaml."""
+    return get_app_config().get("model_registry", {})
+
+
+def get_registry_dir() -> Path:
+    """artifacts/models/ (honours ARTIFACTS_DIR)."""
+    return artifacts_path_from_env() / get_registry_config().get("dir", "models")
+
+
+def load_artifacts(model_dir: Path) -> Dict[str, Any]:
+    """Model, preprocessor, feature names, manifest and offer bundle from one packaged directory.
+
+    Artifacts are verified against manifest.json when present.
+    """
+    if not (model_dir / "model.joblib").exists():
+        raise FileNotFoundError(f"Model not found at {model_dir}. Run 'make train' first.")
+    manifest = load_manifest(model_dir)
+    if manifest is not None:
+        verify_artifacts(model_dir, manifest)
+    model = joblib.load(model_dir / "model.joblib")
+    preprocessor, feature_names = load_preprocessor(model_dir)
+    check_compatibility(manifest, model, feature_names)
+    offer_bundle = load_offer_bundle(model_dir)
+    if offer_bundle is not None and offer_bundle.get("n_features") != len(feature_names):
+        raise ValueError("Offer models and preprocessor are from different training runs.")
+    return {
+        "model": model,
+        "preprocessor": preprocessor,
+        "feature_names": feature_names,
+        "manifest": manifest,
+        "offer_bundle": offer_bundle,
+    }
+
+
+def _footprint(model_dir: Path) -> int:
+    return sum(p.stat().st_size for p in model_dir.glob("*.joblib"))
+
+
+def list_versions(name: str, root: Optional[Path] = None) -> List[str]:
+    """Versions of a model, oldest first (manifest created_at, then directory name)."""
+    model_root = (root or get_registry_dir()) / name
+    if not model_root.is_dir():
+        return []
+
+    def created(d: Path) -> Tuple[str, str]:
+        return ((load_manifest(d) or {}).get("created_at", ""), d.name)
+
+    return [
+        d.name
+        for d in sorted(
+            (d for d in model_root.iterdir() if (d / "model.joblib").exists()), key=created
+        )
+    ]
+
+
+def list_models(root: Optional[Path] = None) -> Dict[str, List[str]]:
+    """{name: versions} for every published model."""
+    root = root or get_registry_dir()
+    if not root.is_dir():
+        return {}
+    return {d.name: list_versions(d.name, root) for d in sorted(root.iterdir()) if d.is_dir()}
+
+
+def publish(name: str, source_dir: Optional[Path] = None, root: Optional[Path] = None) -> str:
+    """Copy a packaged model directory into the registry as <name>/<model_version>; return it."""
+    source_dir = Path(source_dir) if source_dir else artifacts_path_from_env() / "model"
+    if name == DEFAULT_NAME:
+        raise ValueError(f"{DEFAULT_NAME!r} is reserved for the single-model directory")
+    manifest = load_manifest(source_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No manifest.json in {source_dir}. Run 'make package' first.")
+    version = manifest["model_version"]
+    dest = (root or get_registry_dir()) / name / version
+    if not dest.exists():
+        tmp = dest.with_name(f".{version}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.copytree(source_dir, tmp, ignore=shutil.ignore_patterns(".verified"))
+        tmp.replace(dest)
+    return version
+
+
+class ModelRegistry:
+    """LRU cache of loaded models under a memory budget, with pinning and per-model metrics."""
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        memory_budget_mb: Optional[float] = None,
+        pinned: Optional[List[str]] = None,
+        latest_ttl_s: float = 30.0,
+    ) -> None:
+        self.root = Path(root) if root else get_registry_dir()
+        self.latest_ttl_s = latest_ttl_s
+        # name -> (dir mtime, checked at, version)
+        self._latest: Dict[str, Tuple[int, float, str]] = {}
+        self._default: Optional[Dict[str, Any]] = None
+        self._default_checked = 0.0
+        self.budget_bytes = (
+            None if memory_budget_mb is None else int(memory_budget_mb * 1024 * 1024)
+        )
+        self.pinned = set()
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._metrics: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+        for ref in pinned or []:
+            name, _, version = ref.partition("@")
+            self.pin(name, version or None)
+
+    def model_dir(self, name: str, version: str) -> Path:
+        if name == DEFAULT_NAME:
+            return artifacts_path_from_env() / "model"
+        return self.root / name / version
+
+    def resolve(self, name: str, version: Optional[str] = None) -> str:
+        """Concrete version for name (latest when version is None)."""
+        if name == DEFAULT_NAME:
+            served = self._default_entry()["version"]
+            if version not in (None, "current", served):
+                raise FileNotFoundError(
+                    f"Model {name}@{version} is not the served version {served}"
+                )
+            return served
+        if version is not None:
+            if not (self.root / name / version / "model.joblib").exists():
+                raise FileNotFoundError(f"Model {name}@{version} not found under {self.root}")
+            return version
+        try:
+            mtime = (self.root / name).stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        cached = self._latest.get(name)
+        if (
+            cached is not None
+            and cached[0] == mtime
+            and time.monotonic() - cached[1] < self.latest_ttl_s
+        ):
+            return cached[2]
+        versions = list_versions(name, self.root)
+        if not versions:
+            raise FileNotFoundError(f"No versions of model {name!r} under {self.root}")
+        self._latest[name] = (mtime, time.monotonic(), versions[-1])
+        return versions[-1]
+
+    def _default_entry(self) -> Dict[str, Any]:
+        """Entry wrapping the primary model; re-checked for a retrain at most every latest_ttl_s."""
+        from src.serving import predict
+
+        if self._default is None or time.monotonic() - self._default_checked >= self.latest_ttl_s:
+            predict.refresh_model()
+            self._default_checked = time.monotonic()
+        model, preprocessor, feature_names = predict.load_model()
+        entry = self._default
+        if entry is None or entry["model"] is not model:
+            entry = {
+                "model": model,
+                "preprocessor": preprocessor,
+                "feature_names": feature_names,
+                "manifest": predict._manifest_cache,
+                "offer_bundle": predict._offer_bundle_cache,
+                "name": DEFAULT_NAME,
+                "version": predict.get_model_version(),
+                "bytes": 0,  # owned by predict.load_model, outside the registry budget
+                "columnar": None,
+            }
+            self._default = entry
+        return entry
+
+    def get(self, name: str, version: Optional[str] = None) -> Dict[str, Any]:
+        """Loaded entry for name@version: model, preprocessor, feature_names, manifest, ..."""
+        key = (name, self.resolve(name, version))
+        if name == DEFAULT_NAME:
+            entry = self._default_entry()
+            with self._lock:
+                metrics = self._metrics.setdefault(
+                    key, {"hits": 0, "misses": 0, "loads": 0, "load_s": 0.0, "evictions": 0}
+                )
+                metrics["hits"] += 1
+            return entry
+        with self._lock:
+            metrics = self._metrics.setdefault(
+                key, {"hits": 0, "misses": 0, "loads": 0, "load_s": 0.0, "evictions": 0}
+            )
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                metrics["hits"] += 1
+                return entry
+            metrics["misses"] += 1
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                try:
+                    entry = self._load(key)
+                finally:
+                    # Waiters already hold a reference; later misses get a fresh lock
+                    with self._lock:
+                        if self._loading.get(key) is load_lock:
+                            del self._loading[key]
+        return entry
+
+    def _load(self, key: Tuple[str, str]) -> Dict[str, Any]:
+        model_dir = self.model_dir(*key)
+        started = time.perf_counter()
+        entry = load_artifacts(model_dir)
+        elapsed = time.perf_counter() - started
+        entry.update(
+            {"name": key[0], "version": key[1], "bytes": _footprint(model_dir), "columnar": None}
+        )
+        with self._lock:
+            metrics = self._metrics[key]
+            metrics["loads"] += 1
+            metrics["load_s"] += elapsed
+            metrics["last_load_s"] = elapsed
+            self._entries[key] = entry
+            self._evict(keep=key)
+        logger.info(
+            "Loaded model %s@%s (%.1f MB) in %.3fs", key[0], key[1], entry["bytes"] / 2**20, elapsed
+        )
+        return entry
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        """Drop LRU unpinned entries (never keep) until within budget; caller holds the lock."""
+        if self.budget_bytes is None:
+            return
+        resident = sum(e["bytes"] for e in self._entries.values())
+        for key in list(self._entries):
+            if resident <= self.budget_bytes:
+                return
+            if key == keep or key in self.pinned:
+                continue
+            resident -= self._entries.pop(key)["bytes"]
+            self._metrics[key]["evictions"] += 1
+            logger.info("Evicted model %s@%s", *key)
+        if resident > self.budget_bytes:
+            logger.warning(
+                "Resident models (%.1f MB) exceed the memory budget; "
+                "only pinned or in-use models left",
+                resident / 2**20,
+            )
+
+    def pin(self, name: str, version: Optional[str] = None) -> None:
+        """Keep name@version (latest if None) resident; loads it now."""
+        key = (name, self.resolve(name, version))
+        with self._lock:
+            self.pinned.add(key)
+        self.get(*key)
+
+    def unpin(self, name: str, version: Optional[str] = None) -> None:
+        key = (name, self.resolve(name, version))
+        with self._lock:
+            self.pinned.discard(key)
+            self._evict(keep=key)
+
+    def resident(self) -> List[str]:
+        """name@version of loaded models, least recently used first."""
+        with self._lock:
+            return [f"{n}@{v}" for n, v in self._entries]
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry totals and per-model hits, misses, loads, load time, evictions, hit rate."""
+        with self._lock:
+            models = {}
+            for (name, version), m in self._metrics.items():
+                requests = m["hits"] + m["misses"]
+                models[f"{name}@{version}"] = {
+                    **m,
+                    "hit_rate": m["hits"] / requests if requests else None,
+                    "resident": (name, version) in self._entries,
+                    "pinned": (name, version) in self.pinned,
+                }
+            return {
+                "resident_bytes": sum(e["bytes"] for e in self._entries.values()),
+                "budget_bytes": self.budget_bytes,
+                "resident_models": len(self._entries),
+                "models": models,
+            }
+
+
+def get_registry() -> ModelRegistry:
+    """Process-wide registry configured from app.yaml model_registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                cfg = get_registry_config()
+                _registry = ModelRegistry(
+                    memory_budget_mb=cfg.get("memory_budget_mb"),
+                    pinned=cfg.get("pinned"),
+                    latest_ttl_s=cfg.get("latest_ttl_s", 30.0),
+                )
+    return _registry
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Named model registry")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="published models and versions")
+    pub = sub.add_parser("publish", help="copy a packaged model directory into the registry")
+    pub.add_argument("name")
+    pub.add_argument(
+        "--source", type=Path, default=None, help="packaged model dir (default: artifacts/model)"
+    )
+    args = parser.parse_args()
+    if args.command == "publish":
+        version = publish(args.name, args.source)
+        print(f"Published {args.name}@{version} to {get_registry_dir() / args.name / version}")
+    else:
+        print(json.dumps(list_models(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
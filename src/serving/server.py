@@ -0,0 +1,368 @@
+"""Pre-forking HTTP scoring server: one model load, N worker processes sharing it copy-on-write.
+
+The supervisor (parent) calls load_model() once, moves everything it has allocated out
+of the garbage collector's reach (gc.freeze, so collections in the workers do not write
+to and copy the shared pages), binds the listening socket, and forks the workers. Each
+worker is a single-threaded stdlib HTTP server on the inherited non-blocking socket
+(the kernel spreads connections across whichever workers are idle), with BLAS thread
+pools limited to one thread. Scoring throughput thus scales with cores while the model
+is resident once.
+
+Endpoints: GET /health, POST /predict and POST /predict_offers. The POST body is a
+JSON record or list of records. Rows are checked with the bulk-scoring validation, and
+invalid rows get null scores. Every scoring request is recorded in the audit log.
+
+Supervision: every worker stamps a heartbeat slot in shared memory between requests.
+Workers that die are re-forked (with backoff when they crash right after start), and
+workers whose heartbeat is older than health_timeout_s are killed and replaced. SIGHUP
+is a graceful reload: the parent reloads artifacts if the manifest version changed
+(refresh_model), forks a new generation, and SIGTERMs the old one, which finishes its
+in-flight request first. SIGTERM/SIGINT drain all workers and exit.
+
+Usage: python -m src.serving.server [--workers N] [--port 8000]
+"""
+import argparse
+import gc
+import json
+import mmap
+import os
+import select
+import signal
+import socket
+import struct
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List, Optional
+
+from src.utils.config import get_app_config
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_HEARTBEAT = struct.Struct("d")
+
+
+def get_server_config() -> Dict[str, Any]:
+    """server section of app.yaml."""
+    return get_app_config().get("server", {})
+
+
+def _records(body: bytes) -> List[Dict[str, Any]]:
+    payload = json.loads(body or b"null")
+    if isinstance(payload, dict):
+        payload = payload.get("records", [payload])
+    if not isinstance(payload, list) or not all(isinstance(r, dict) for r in payload):
+        raise ValueError("Body must be a JSON record, a list of records or {\"records\": [...]}")
+    return payload
+
+
+def score_records(records: List[Dict[str, Any]], offers: bool = False) -> Dict[str, Any]:
+    """Validate and score request records; invalid rows get null scores."""
+    import numpy as np
+    import pandas as pd
+
+    from src.serving.batch import validate_chunk
+    from src.serving.predict import get_model_version, predict_batch, predict_offers
+
+    df = pd.DataFrame.from_records(records)
+    clean, valid, errors = validate_chunk(df)
+    out: Dict[str, Any] = {"model_version": get_model_version(), "errors": errors}
+    scores: List[Any] = [None] * len(df)
+    if valid.any():
+        rows = clean.loc[valid].reset_index(drop=True)
+        idx = np.flatnonzero(valid)
+        if offers:
+            matrix = predict_offers(rows)
+            for i, rec in zip(idx, matrix.to_dict(orient="records")):
+                scores[i] = rec
+        else:
+            for i, s in zip(idx, predict_batch(rows)):
+                scores[i] = float(s)
+    out["offers" if offers else "scores"] = scores
+    return out
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "OfferRanking"
+    max_body_bytes = 16 * 2**20
+    requests_served = 0
+
+    def _send(self, code: int, obj: Dict[str, Any]) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.rstrip("/") != "/health":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+        from src.serving.predict import get_model_version
+        self._send(200, {"status": "ok", "pid": os.getpid(), "model_version": get_model_version(),
+                         "requests_served": _Handler.requests_served})
+
+    def do_POST(self) -> None:  # noqa: N802
+        path = self.path.rstrip("/")
+        if path not in ("/predict", "/predict_offers"):
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+        from src.governance.audit import log_action
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > self.max_body_bytes:
+            self._send(413, {"error": f"Body larger than {self.max_body_bytes} bytes"})
+            log_action("score", "rejected", {"endpoint": path, "bytes": length})
+            return
+        try:
+            records = _records(self.rfile.read(length))
+            result = score_records(records, offers=path == "/predict_offers")
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            log_action("score", "rejected", {"endpoint": path, "error": str(e)})
+            return
+        except Exception as e:  # keep the worker alive; the supervisor only handles crashes
+            logger.exception("Scoring failed")
+            self._send(500, {"error": str(e)})
+            log_action("score", "failure", {"endpoint": path, "error": str(e)})
+            return
+        _Handler.requests_served += 1
+        self._send(200, result)
+        scored = result["offers" if path == "/predict_offers" else "scores"]
+        log_action(
+            "score",
+            metadata={
+                "endpoint": path,
+                "rows": len(scored),
+                "invalid_rows": sum(s is None for s in scored),
+                "model_version": result["model_version"],
+            },
+        )
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def _worker(sock: socket.socket, slot: int, heartbeat: mmap.mmap, cfg: Dict[str, Any]) -> None:
+    """Serve requests on the inherited socket until SIGTERM; runs in a forked child."""
+    stopping = False
+
+    def _stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+    _Handler.timeout = cfg.get("request_timeout_s", 30)
+    _Handler.max_body_bytes = int(cfg.get("max_body_mb", 16) * 2**20)
+    server = HTTPServer(sock.getsockname()[:2], _Handler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.timeout = 1.0
+    try:
+        while not stopping:
+            _HEARTBEAT.pack_into(heartbeat, slot * _HEARTBEAT.size, time.time())
+            server.handle_request()
+    finally:
+        _close_writers()
+
+
+def _close_writers() -> None:
+    """Flush buffered shadow, prediction-log and audit writes; os._exit skips their atexit hooks."""
+    from src.governance.audit import close_audit_writer
+    from src.serving.prediction_log import close_sink
+    from src.serving.shadow import close_shadow_scorer
+
+    for close in (close_shadow_scorer, close_sink, close_audit_writer):
+        try:
+            close()
+        except Exception:
+            logger.exception("Closing %s failed", close.__name__)
+
+
+class Supervisor:
+    """Forks and supervises the scoring workers; see the module docstring."""
+
+    def __init__(
+        self,
+        n_workers: int,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        health_timeout_s: float = 60.0,
+        drain_timeout_s: float = 30.0,
+        cfg: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.n_workers = n_workers
+        self.address = (host, port)
+        self.health_timeout_s = health_timeout_s
+        self.drain_timeout_s = drain_timeout_s
+        self.cfg = cfg if cfg is not None else get_server_config()
+        self.workers: Dict[int, int] = {}  # slot -> pid
+        self.started: Dict[int, float] = {}  # slot -> fork time
+        self.draining: Dict[int, float] = {}  # pid -> kill deadline
+        self.restarts = 0
+        self._reload = False
+        self._stopping = False
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self.heartbeat = mmap.mmap(-1, _HEARTBEAT.size * n_workers)
+        self.sock: Optional[socket.socket] = None
+
+    def _signal(self, signum: int, frame: Any) -> None:
+        if signum == signal.SIGHUP:
+            self._reload = True
+        elif signum in (signal.SIGTERM, signal.SIGINT):
+            self._stopping = True
+        os.write(self._wakeup_w, b"x")
+
+    def _prepare(self) -> None:
+        """Load (or reload) the model in the parent and freeze the heap before forking."""
+        from src.serving.predict import load_model, refresh_model
+
+        if self._reload:
+            refresh_model()
+        else:
+            load_model()
+        gc.collect()
+        gc.freeze()
+
+    def _spawn(self, slot: int) -> None:
+        _HEARTBEAT.pack_into(self.heartbeat, slot * _HEARTBEAT.size, time.time())
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                os.close(self._wakeup_r)
+                os.close(self._wakeup_w)
+                _worker(self.sock, slot, self.heartbeat, self.cfg)
+            except BaseException:
+                logger.exception("Worker %d crashed", slot)
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[slot] = pid
+        self.started[slot] = time.monotonic()
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.draining.pop(pid, None)
+            slot = next((s for s, p in self.workers.items() if p == pid), None)
+            if slot is None:
+                continue
+            del self.workers[slot]
+            if self._stopping:
+                continue
+            logger.warning(
+                "Worker %d (pid %d) exited with status %d; restarting", slot, pid, status
+            )
+            if time.monotonic() - self.started[slot] < 1.0:
+                time.sleep(1.0)  # crash-looping: back off instead of forking in a tight loop
+            self.restarts += 1
+            self._spawn(slot)
+
+    def _check_health(self) -> None:
+        now = time.time()
+        for slot, pid in list(self.workers.items()):
+            (beat,) = _HEARTBEAT.unpack_from(self.heartbeat, slot * _HEARTBEAT.size)
+            if now - beat > self.health_timeout_s:
+                logger.warning(
+                    "Worker %d (pid %d) missed heartbeats for %.0fs; killing", slot, pid, now - beat
+                )
+                os.kill(pid, signal.SIGKILL)
+        deadline_now = time.monotonic()
+        for pid, deadline in list(self.draining.items()):
+            if deadline_now > deadline:
+                os.kill(pid, signal.SIGKILL)
+
+    def reload(self) -> None:
+        """Graceful reload: new generation of workers, then drain the old one."""
+        self._prepare()
+        old = dict(self.workers)
+        for slot in old:
+            self._spawn(slot)
+        for pid in old.values():
+            self.draining[pid] = time.monotonic() + self.drain_timeout_s
+            os.kill(pid, signal.SIGTERM)
+        self._reload = False
+        logger.info("Reloaded: %d new workers, draining %d", len(self.workers), len(old))
+
+    def stop(self) -> None:
+        for pid in list(self.workers.values()) + list(self.draining):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.drain_timeout_s
+        while time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.05)
+        for pid in list(self.workers.values()) + list(self.draining):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def serve(self) -> None:
+        """Run until SIGTERM/SIGINT."""
+        self._prepare()
+        self.sock = socket.create_server(self.address, backlog=1024)
+        self.sock.setblocking(False)
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, self._signal)
+        for slot in range(self.n_workers):
+            self._spawn(slot)
+        logger.info(
+            "Serving on %s:%d with %d workers", *self.sock.getsockname()[:2], self.n_workers
+        )
+        try:
+            while not self._stopping:
+                select.select([self._wakeup_r], [], [], 1.0)
+                while select.select([self._wakeup_r], [], [], 0)[0]:
+                    os.read(self._wakeup_r, 512)
+                self._reap()
+                if self._reload and not self._stopping:
+                    self.reload()
+                self._check_health()
+        finally:
+            self.stop()
+            self.sock.close()
+
+
+def main() -> None:
+    cfg = get_server_config()
+    parser = argparse.ArgumentParser(description="Pre-forking scoring server")
+    parser.add_argument(
+        "--workers", type=int, default=cfg.get("workers"), help="default: one per CPU"
+    )
+    parser.add_argument("--host", default=cfg.get("host", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=cfg.get("port", 8000))
+    args = parser.parse_args()
+    Supervisor(
+        n_workers=args.workers or os.cpu_count() or 1,
+        host=args.host,
+        port=args.port,
+        health_timeout_s=cfg.get("health_timeout_s", 60),
+        drain_timeout_s=cfg.get("drain_timeout_s", 30),
+        cfg=cfg,
+    ).serve()
+
+
+if __name__ == "__main__":
+    main()
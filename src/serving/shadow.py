@@ -0,0 +1,179 @@
+"""Champion/challenger shadow scoring off the request path.
+
+Challengers are the non-primary models train.py saves under model/challengers/. The
+serving path transforms each request once, scores the champion, and hands the same
+feature matrix to ShadowScorer.submit(), which only enqueues (non-blocking, dropped
+when the bounded queue is full). A background thread scores every challenger and writes
+the rows, with the champion score alongside, through a PredictionLogSink into
+predictions_shadow/, so challengers can be compared with the champion offline.
+"""
+import atexit
+import queue
+import random
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.serving.prediction_log import PredictionLogSink
+from src.utils.config import get_app_config
+from src.utils.logging import get_logger
+from src.utils.paths import artifacts_path_from_env
+
+logger = get_logger(__name__)
+
+CHALLENGER_DIR = "challengers"
+
+_scorer: Optional["ShadowScorer"] = None
+_scorer_lock = threading.Lock()
+
+
+def load_challengers(model_dir: Path, names: Optional[list] = None) -> Dict[str, Any]:
+    """{name: model} for model_dir/challengers/<name>.joblib (all, or only names)."""
+    cdir = model_dir / CHALLENGER_DIR
+    if not cdir.exists():
+        return {}
+    paths = sorted(cdir.glob("*.joblib"))
+    return {p.stem: joblib.load(p) for p in paths if names is None or p.stem in names}
+
+
+class ShadowScorer:
+    """Bounded queue + background thread scoring challengers on already-transformed batches."""
+
+    def __init__(
+        self,
+        challengers: Dict[str, Any],
+        sink: PredictionLogSink,
+        max_queue: int = 1_000,
+        sample_rate: float = 1.0,
+    ) -> None:
+        self.challengers = challengers
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.stats = {"submitted": 0, "dropped": 0, "sampled_out": 0, "scored_rows": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        X: np.ndarray,
+        features: pd.DataFrame,
+        champion_scores: np.ndarray,
+        champion_version: str = "unknown",
+    ) -> bool:
+        """Enqueue one transformed request batch; never blocks. Returns False if not queued.
+
+        Nothing is copied: callers must not mutate X, features or champion_scores after.
+        """
+        if self._closed or not self.challengers:
+            return False
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._count("sampled_out")
+            return False
+        try:
+            self._queue.put_nowait((X, features, champion_scores, champion_version))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("submitted")
+        return True
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Block until queued batches are scored and handed to the sink, then flush the sink."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+        self.sink.flush(timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush, stop the scoring thread and close the sink; gives up after timeout if stalled."""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Shadow scorer did not drain; %d batches lost", self._queue.qsize())
+        else:
+            self._thread.join(timeout)
+        self.sink.close(timeout)
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            X, features, champion_scores, champion_version = item
+            try:
+                logged = features.reset_index(drop=True).assign(
+                    champion_score=np.asarray(champion_scores, dtype=float).reshape(-1)
+                )
+                for name, model in self.challengers.items():
+                    proba = model.predict_proba(X)[:, 1]
+                    self.sink.log(logged, proba, model_version=f"{champion_version}:{name}")
+                self._count("scored_rows", len(logged))
+            except Exception as e:  # shadow failures never reach the request path
+                self._count("errors")
+                logger.warning("Shadow scoring failed: %s", e)
+
+
+def get_shadow_dir() -> Path:
+    """artifacts/predictions_shadow/ (honours ARTIFACTS_DIR)."""
+    return artifacts_path_from_env() / "predictions_shadow"
+
+
+def get_shadow_scorer(challengers: Dict[str, Any]) -> Optional[ShadowScorer]:
+    """Process-wide scorer from app.yaml shadow (None when disabled or no challengers)."""
+    global _scorer
+    if not challengers:
+        return None
+    if _scorer is not None and _scorer.challengers is challengers:
+        return _scorer
+    cfg = get_app_config().get("shadow", {})
+    if not cfg.get("enabled", False):
+        return None
+    with _scorer_lock:
+        if _scorer is None or _scorer.challengers is not challengers:
+            if _scorer is not None:
+                _scorer.close()
+            sink = PredictionLogSink(
+                log_dir=cfg.get("dir") or get_shadow_dir(),
+                fmt=cfg.get("format", "parquet"),
+                max_queue=cfg.get("max_queue", 1_000),
+                batch_rows=cfg.get("batch_rows", 5_000),
+                flush_interval_s=cfg.get("flush_interval_s", 2.0),
+            )
+            _scorer = ShadowScorer(
+                challengers,
+                sink,
+                max_queue=cfg.get("max_queue", 1_000),
+                sample_rate=cfg.get("sample_rate", 1.0),
+            )
+            atexit.register(_scorer.close)
+    return _scorer
+
+
+def close_shadow_scorer() -> None:
+    """Flush and stop the process-wide scorer and its sink, if any (for exits that skip atexit)."""
+    global _scorer
+    with _scorer_lock:
+        scorer, _scorer = _scorer, None
+    if scorer is not None:
+        scorer.close()
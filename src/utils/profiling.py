@@ -0,0 +1,278 @@
+"""Per-stage pipeline profiling: wall time, CPU time, peak RSS and rows per stage.
+
+Wrap an entry point with @profiled("train") and mark stages inside it with
+`with stage("fit_gb", rows=len(X)):`. When the entry point returns, it writes two files
+to artifacts/metrics/profiles/:
+- <entry>_summary.json holds per-stage totals.
+- <entry>_trace.json is a Chrome trace event file (open in chrome://tracing or
+  ui.perfetto.dev) with one slice per stage and an RSS counter track.
+
+RSS is sampled by a background thread, which gives per-stage peaks, not just the process
+high-water mark. Setting PIPELINE_PROFILE_SAMPLING=1, or pipeline_profiling.sampling in
+model.yaml, also runs a stack sampler on the entry point's thread. It writes
+<entry>_samples.folded in collapsed-stack format for flamegraph.pl or speedscope.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_run: Optional["_ProfileRun"] = None
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size in MB (Linux /proc; None elsewhere)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _max_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _cpu_s() -> float:
+    """CPU time of this process plus reaped child processes."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class Stage:
+    """One recorded stage; set .rows inside the block if the count is known late."""
+
+    def __init__(self, name: str, path: str, depth: int, rows: Optional[int]) -> None:
+        self.name = name
+        self.path = path
+        self.depth = depth
+        self.rows = rows
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.cpu_start = _cpu_s()
+        self.cpu_s = 0.0
+        self.peak_rss_mb: Optional[float] = _rss_mb()
+
+    def to_dict(self) -> Dict[str, Any]:
+        wall_s = ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1e9
+        return {
+            "name": self.name,
+            "path": self.path,
+            "depth": self.depth,
+            "wall_s": wall_s,
+            "cpu_s": self.cpu_s,
+            "cpu_util": self.cpu_s / wall_s if wall_s > 0 else None,
+            "peak_rss_mb": self.peak_rss_mb,
+            "rows": self.rows,
+            "rows_per_s": self.rows / wall_s if self.rows and wall_s > 0 else None,
+        }
+
+
+class _ProfileRun:
+    def __init__(
+        self, entry: str, rss_interval_s: float, sampling_interval_s: Optional[float]
+    ) -> None:
+        self.entry = entry
+        self.started_at = datetime.now(tz=timezone.utc).isoformat()
+        self.origin_ns = time.perf_counter_ns()
+        self.thread_id = threading.get_ident()
+        self.stages: List[Stage] = []
+        self.open: List[Stage] = []
+        self.rss_samples: List[tuple] = []
+        self.stack_counts: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._sample_rss, args=(rss_interval_s,), daemon=True)
+        ]
+        if sampling_interval_s:
+            self._threads.append(
+                threading.Thread(
+                    target=self._sample_stacks, args=(sampling_interval_s,), daemon=True
+                )
+            )
+        for t in self._threads:
+            t.start()
+
+    def _sample_rss(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            rss = _rss_mb()
+            if rss is None:
+                return
+            self.rss_samples.append((time.perf_counter_ns(), rss))
+            for s in list(self.open):
+                if s.peak_rss_mb is None or rss > s.peak_rss_mb:
+                    s.peak_rss_mb = rss
+
+    def _sample_stacks(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                key = ";".join(reversed(names))
+                self.stack_counts[key] = self.stack_counts.get(key, 0) + 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join()
+
+    def summary(self) -> Dict[str, Any]:
+        root = self.stages[0].to_dict() if self.stages else {}
+        return {
+            "entry": self.entry,
+            "started_at": self.started_at,
+            "wall_s": root.get("wall_s"),
+            "cpu_s": root.get("cpu_s"),
+            "peak_rss_mb": _max_rss_mb(),
+            "stages": [s.to_dict() for s in self.stages],
+        }
+
+    def trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": 0,
+                "args": {"name": f"pipeline:{self.entry}"},
+            },
+        ]
+        for s in self.stages:
+            d = s.to_dict()
+            events.append(
+                {
+                    "name": s.name,
+                    "cat": "stage",
+                    "ph": "X",
+                    "ts": (s.start_ns - self.origin_ns) / 1000.0,
+                    "dur": d["wall_s"] * 1e6,
+                    "pid": pid,
+                    "tid": 1,
+                    "args": {
+                        k: d[k]
+                        for k in ("cpu_s", "peak_rss_mb", "rows", "rows_per_s")
+                        if d[k] is not None
+                    },
+                }
+            )
+        for ts, rss in self.rss_samples:
+            events.append(
+                {
+                    "name": "rss_mb",
+                    "ph": "C",
+                    "ts": (ts - self.origin_ns) / 1000.0,
+                    "pid": pid,
+                    "args": {"rss_mb": rss},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None) -> Iterator[Stage]:
+    """Record a (possibly nested) stage of the active profiled run; unrecorded outside one."""
+    run = _run
+    if run is None or threading.get_ident() != run.thread_id:
+        yield Stage(name, name, 0, rows)
+        return
+    parent = run.open[-1].path + "/" if run.open else ""
+    s = Stage(name, parent + name, len(run.open), rows)
+    run.stages.append(s)
+    run.open.append(s)
+    try:
+        yield s
+    finally:
+        s.end_ns = time.perf_counter_ns()
+        s.cpu_s = _cpu_s() - s.cpu_start
+        rss = _rss_mb()
+        if rss is not None and (s.peak_rss_mb is None or rss > s.peak_rss_mb):
+            s.peak_rss_mb = rss
+        run.open.remove(s)
+
+
+def _get_profiling_config() -> Dict[str, Any]:
+    from src.utils.config import get_model_config
+    return get_model_config().get("pipeline_profiling", {})
+
+
+def write_profile_outputs(run: "_ProfileRun", out_dir=None) -> Dict[str, str]:
+    """Write summary, trace and (if sampled) folded stacks; return {kind: path}."""
+    from src.utils.paths import get_metrics_dir
+
+    out_dir = out_dir or get_metrics_dir() / "profiles"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "summary": out_dir / f"{run.entry}_summary.json",
+        "trace": out_dir / f"{run.entry}_trace.json",
+    }
+    paths["summary"].write_text(json.dumps(run.summary(), indent=2), encoding="utf-8")
+    paths["trace"].write_text(json.dumps(run.trace()), encoding="utf-8")
+    if run.stack_counts:
+        paths["samples"] = out_dir / f"{run.entry}_samples.folded"
+        paths["samples"].write_text(
+            "".join(f"{stack} {n}\n" for stack, n in sorted(run.stack_counts.items())),
+            encoding="utf-8",
+        )
+    return {k: str(v) for k, v in paths.items()}
+
+
+def profiled(entry: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator for pipeline entry points: profile the call as a root stage and write outputs."""
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            global _run
+            cfg = _get_profiling_config()
+            if _run is not None or not cfg.get("enabled", True):
+                return fn(*args, **kwargs)
+            sampling = os.environ.get("PIPELINE_PROFILE_SAMPLING", "").lower() in (
+                "1",
+                "true",
+                "yes",
+            )
+            sampling = sampling or cfg.get("sampling", False)
+            run = _ProfileRun(
+                entry,
+                rss_interval_s=cfg.get("rss_interval_ms", 20) / 1000.0,
+                sampling_interval_s=cfg.get("sampling_interval_ms", 5) / 1000.0
+                if sampling
+                else None,
+            )
+            _run = run
+            try:
+                with stage(entry):
+                    return fn(*args, **kwargs)
+            finally:
+                _run = None
+                run.stop()
+                try:
+                    paths = write_profile_outputs(run)
+                    root = run.stages[0]
+                    logger.info(
+                        "%s: %.2fs wall, %.2fs CPU; profile at %s",
+                        entry, (root.end_ns - root.start_ns) / 1e9, root.cpu_s, paths["summary"],
+                    )
+                except OSError as e:  # profiling never fails the pipeline
+                    logger.warning("Could not write pipeline profile: %s", e)
+        return wrapper
+    return decorator
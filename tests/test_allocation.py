@@ -0,0 +1,81 @@
+"""Test budgeted allocation: feasibility of both solvers, bound validity, small exact optimum."""
+import itertools
+
+import numpy as np
+import pytest
+
+from src.serving.allocation import allocate, assignment_frame
+
+OFFERS = ["a", "b", "c"]
+CFG = {
+    "contact_limit": 1,
+    "offers": {
+        "a": {"value": 100.0, "cost": 2.0, "capacity": 3},
+        "b": {"value": 80.0, "cost": 1.0, "capacity": 2},
+        "c": {"value": 50.0, "cost": 1.0, "capacity": None},
+    },
+}
+
+
+def _check_feasible(res, limit, budget=None):
+    X = res["assignment"]
+    assert (X.sum(axis=1) <= limit).all()
+    assert X[:, 0].sum() <= 3 and X[:, 1].sum() <= 2
+    if budget is not None:
+        assert res["cost"] <= budget
+
+
+@pytest.mark.parametrize("method", ["greedy", "lagrangian"])
+@pytest.mark.parametrize("budget", [None, 150.0])
+@pytest.mark.parametrize("limit", [1, 2])
+def test_allocations_respect_every_limit(method, budget, limit):
+    P = np.random.RandomState(0).beta(1, 6, (500, 3))
+    cfg = {
+        **CFG,
+        "offers": {
+            o: {**t, "capacity": None if t["capacity"] is None else t["capacity"] * 40}
+            for o, t in CFG["offers"].items()
+        },
+    }
+    res = allocate(P, OFFERS, method=method, contact_limit=limit, budget=budget, cfg=cfg)
+    X = res["assignment"]
+    assert (X.sum(axis=1) <= limit).all()
+    assert X[:, 0].sum() <= 120 and X[:, 1].sum() <= 80
+    if budget is not None:
+        assert res["cost"] <= budget
+    profit = P * np.array([100.0, 80.0, 50.0]) - np.array([2.0, 1.0, 1.0])
+    assert (profit[X] > 0).all()
+    if method == "lagrangian":
+        assert res["objective"] <= res["upper_bound"] + 1e-6
+        assert (
+            res["objective"]
+            >= allocate(P, OFFERS, "greedy", limit, budget, cfg)["objective"] - 1e-6
+        )
+
+
+def test_lagrangian_matches_brute_force_on_a_small_instance():
+    P = np.random.RandomState(3).beta(1, 6, (7, 3))
+    profit = P * np.array([100.0, 80.0, 50.0]) - np.array([2.0, 1.0, 1.0])
+    best = max(
+        sum(profit[i, j] for i, j in enumerate(choice) if j < 3)
+        for choice in itertools.product(range(4), repeat=7)
+        if choice.count(0) <= 3 and choice.count(1) <= 2
+    )
+    res = allocate(P, OFFERS, method="lagrangian", cfg=CFG)
+    _check_feasible(res, 1)
+    assert res["objective"] == pytest.approx(best)
+    assert allocate(P, OFFERS, method="greedy", cfg=CFG)["objective"] <= best + 1e-9
+
+
+def test_assignment_frame_and_errors():
+    P = np.random.RandomState(1).beta(1, 6, (20, 3))
+    res = allocate(P, OFFERS, method="greedy", cfg=CFG)
+    frame = assignment_frame(res, P, OFFERS, ids=np.arange(100, 120))
+    assert len(frame) == res["contacts"] and frame["customer_id"].min() >= 100
+    assert frame["offer_id"].value_counts().to_dict() == {
+        k: v for k, v in res["offer_counts"].items() if v
+    }
+    with pytest.raises(ValueError):
+        allocate(P, OFFERS, method="simplex", cfg=CFG)
+    with pytest.raises(ValueError):
+        allocate(P, OFFERS + ["d"], cfg=CFG)
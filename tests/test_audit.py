@@ -0,0 +1,108 @@
+"""Test audit writer: buffered flush, rotation into compressed segments, indexed queries."""
+import json
+import multiprocessing
+import threading
+import time
+
+from src.governance.audit import AuditWriter, _file_lock, query_audit
+
+
+def _entry(i, action):
+    return {
+        "timestamp": f"2026-01-01T00:00:{i:02d}+00:00",
+        "action": action,
+        "outcome": "success",
+        "user": "t",
+        "metadata": {"i": i},
+    }
+
+
+def test_buffered_until_flush(tmp_path):
+    log = tmp_path / "audit_log.jsonl"
+    w = AuditWriter(path=log, flush_every=10, flush_interval_s=3600, fsync=False)
+    for i in range(3):
+        w.write(_entry(i, "score"))
+    assert not log.exists()
+    w.flush()
+    assert len(log.read_text().splitlines()) == 3
+
+
+def test_rotation_and_query(tmp_path):
+    log = tmp_path / "audit_log.jsonl"
+    w = AuditWriter(path=log, flush_every=5, flush_interval_s=3600, max_bytes=600, fsync=False)
+    for i in range(40):
+        w.write(_entry(i, "retrain" if i % 10 == 0 else "score"))
+    w.flush()
+    segments = sorted((tmp_path / "audit").glob("*.jsonl.gz"))
+    assert segments
+    seg_index = json.loads(
+        segments[0].with_name(segments[0].name.replace(".jsonl.gz", ".idx.json")).read_text()
+    )
+    assert seg_index["blocks"]
+
+    everything = query_audit(path=log)
+    assert [e["metadata"]["i"] for e in everything] == list(range(40))
+    retrains = query_audit(action="retrain", path=log)
+    assert [e["metadata"]["i"] for e in retrains] == [0, 10, 20, 30]
+    window = query_audit(
+        start="2026-01-01T00:00:12+00:00", end="2026-01-01T00:00:14+00:00", path=log
+    )
+    assert [e["metadata"]["i"] for e in window] == [12, 13, 14]
+    assert len(query_audit(limit=7, path=log)) == 7
+
+
+def test_unindexed_tail_is_scanned(tmp_path):
+    log = tmp_path / "audit_log.jsonl"
+    log.write_text(json.dumps(_entry(1, "legacy")) + "\n")
+    w = AuditWriter(path=log, flush_every=1, fsync=False)
+    w.write(_entry(2, "score"))
+    assert [e["action"] for e in query_audit(path=log)] == ["legacy", "score"]
+    w.rotate()
+    assert [e["action"] for e in query_audit(path=log)] == ["legacy", "score"]
+
+
+def test_background_flush_without_further_writes(tmp_path):
+    log = tmp_path / "audit_log.jsonl"
+    w = AuditWriter(path=log, flush_every=100, flush_interval_s=0.05, fsync=False)
+    w.write(_entry(0, "score"))
+    deadline = time.monotonic() + 5
+    while not log.exists() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(log.read_text().splitlines()) == 1
+    w.close()
+
+
+def test_query_waits_for_a_rotation_in_progress(tmp_path):
+    log = tmp_path / "audit_log.jsonl"
+    w = AuditWriter(path=log, flush_every=1, fsync=False)
+    w.write(_entry(0, "score"))
+    found = []
+    with _file_lock(log):  # as a writer in another process holds it
+        reader = threading.Thread(target=lambda: found.append(query_audit(path=log)))
+        reader.start()
+        reader.join(0.3)
+        assert reader.is_alive()
+        w._rotate_locked()
+    reader.join(5)
+    assert [e["metadata"]["i"] for e in found[0]] == [0]
+
+
+def _write_from_process(log, worker):
+    w = AuditWriter(path=log, flush_every=7, flush_interval_s=3600, max_bytes=2000, fsync=False)
+    for i in range(100):
+        w.write({**_entry(i % 60, "score"), "metadata": {"worker": worker, "i": i}})
+    w.close()
+
+
+def test_processes_share_one_rotating_log(tmp_path):
+    log = tmp_path / "audit_log.jsonl"
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_write_from_process, args=(log, k)) for k in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert all(p.exitcode == 0 for p in procs)
+    assert len(list((tmp_path / "audit").glob("*.jsonl.gz"))) > 1
+    seen = sorted((e["metadata"]["worker"], e["metadata"]["i"]) for e in query_audit(path=log))
+    assert seen == [(k, i) for k in range(3) for i in range(100)]
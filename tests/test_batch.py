@@ -0,0 +1,48 @@
+"""Test bulk scoring helpers: columnar validation and offer ranking."""
+import io
+
+import numpy as np
+import pandas as pd
+
+from src.serving.batch import iter_input_chunks, missing_required_columns, validate_chunk
+from src.serving.ranking import rank_offers
+
+
+def test_validate_chunk_flags_bad_rows():
+    df = pd.DataFrame({
+        "age": [40, 150, "x"],
+        "day": [1, 15, 31],
+        "duration": [100, 200, 300],
+        "campaign": [1, 2, 3],
+        "pdays": [-1, -1, 5],
+        "previous": [0, 0, 1],
+    })
+    clean, valid, errors = validate_chunk(df)
+    assert valid.tolist() == [True, False, False]
+    assert errors == {"age": 2}
+    assert (clean["contact"] == "unknown").all()
+
+
+def test_missing_required_columns():
+    assert missing_required_columns(["age", "job"]) == [
+        "day",
+        "duration",
+        "campaign",
+        "pdays",
+        "previous",
+    ]
+
+
+def test_iter_input_chunks_sniffs_separator():
+    buf = io.BytesIO(b"age;job\n1;a\n2;b\n3;c\n")
+    chunks = list(iter_input_chunks(buf, name="leads.csv", chunk_rows=2))
+    assert [len(c) for c in chunks] == [2, 1]
+    assert list(chunks[0].columns) == ["age", "job"]
+
+
+def test_rank_offers_sorted():
+    ranked = rank_offers(0.5)
+    scores = [r["score"] for r in ranked]
+    assert scores == sorted(scores, reverse=True)
+    assert [r["rank"] for r in ranked] == list(range(1, len(ranked) + 1))
+    assert np.isclose(max(scores), 0.54)
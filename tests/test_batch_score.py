@@ -0,0 +1,110 @@
+"""Test checkpointed batch scoring: deterministic partitions, crash resume, idempotent reruns."""
+import pandas as pd
+import pytest
+
+from src.pipelines.batch_score import (
+    SUCCESS_NAME,
+    completed_partitions,
+    input_fingerprint,
+    read_scores,
+    run_job,
+)
+from src.serving.batch import iter_input_chunks
+
+
+def _score(df, top_k):
+    out = df.copy()
+    out["valid"] = True
+    out["propensity"] = df["age"] / 100.0
+    return out, {}
+
+
+def _write_input(tmp_path, n=25):
+    path = tmp_path / "customers.csv"
+    pd.DataFrame({"age": range(n), "job": ["admin."] * n}).to_csv(path, sep=";", index=False)
+    return path
+
+
+def test_resume_scores_only_missing_partitions(tmp_path):
+    path = _write_input(tmp_path)
+    seen = []
+
+    def crashing(df, top_k):
+        seen.append(int(df["age"].iloc[0]))
+        if len(seen) == 3:
+            raise RuntimeError("worker died")
+        return _score(df, top_k)
+
+    with pytest.raises(RuntimeError):
+        run_job(path, tmp_path / "out", partition_rows=10, model_version="v1", score_fn=crashing)
+    job_dir = next((tmp_path / "out").iterdir())
+    assert sorted(completed_partitions(job_dir)) == [0, 1]
+    assert not (job_dir / SUCCESS_NAME).exists()
+
+    seen.clear()
+
+    def recording(df, top_k):
+        seen.append(int(df["age"].iloc[0]))
+        return _score(df, top_k)
+
+    summary = run_job(
+        path, tmp_path / "out", partition_rows=10, model_version="v1", score_fn=recording
+    )
+    assert seen == [20]
+    assert summary["rows"] == 25 and summary["partitions"] == 3
+    scores = read_scores(job_dir)
+    assert scores["age"].tolist() == list(range(25))
+
+    # complete job: rerun does no work
+    def fail(df, top_k):
+        raise AssertionError("should not rescore")
+
+    assert (
+        run_job(path, tmp_path / "out", partition_rows=10, model_version="v1", score_fn=fail)[
+            "rows"
+        ]
+        == 25
+    )
+
+
+def test_new_model_version_is_a_new_job(tmp_path):
+    path = _write_input(tmp_path)
+    run_job(path, tmp_path / "out", partition_rows=10, model_version="v1", score_fn=_score)
+    run_job(path, tmp_path / "out", partition_rows=10, model_version="v2", score_fn=_score)
+    assert len(list((tmp_path / "out").iterdir())) == 2
+
+
+def test_same_content_elsewhere_resumes_same_job(tmp_path):
+    path = _write_input(tmp_path)
+    first = run_job(path, tmp_path / "out", partition_rows=10, model_version="v1", score_fn=_score)
+    copy = tmp_path / "refetched" / "customers.csv"
+    copy.parent.mkdir()
+    copy.write_bytes(path.read_bytes())
+
+    def fail(df, top_k):
+        raise AssertionError("should not rescore")
+
+    again = run_job(copy, tmp_path / "out", partition_rows=10, model_version="v1", score_fn=fail)
+    assert again["job_id"] == first["job_id"]
+
+
+def test_fingerprint_samples_large_files(tmp_path):
+    path = tmp_path / "big.bin"
+    data = bytearray(4 << 20)
+    path.write_bytes(data)
+    base = input_fingerprint(path)
+    middle = (len(data) - (1 << 16)) * 8 // 15  # start of the 9th of 16 sampled blocks
+    for offset in (0, middle, len(data) - 1):
+        changed = bytearray(data)
+        changed[offset] = 1
+        path.write_bytes(changed)
+        assert input_fingerprint(path) != base
+    path.write_bytes(data + b"\0")
+    assert input_fingerprint(path) != base
+
+
+def test_skip_rows_parquet(tmp_path):
+    path = tmp_path / "customers.parquet"
+    pd.DataFrame({"age": range(30)}).to_parquet(path, row_group_size=7)
+    chunks = list(iter_input_chunks(str(path), chunk_rows=10, skip_rows=12))
+    assert pd.concat(chunks)["age"].tolist() == list(range(12, 30))
@@ -0,0 +1,65 @@
+"""Test columnar transform: Arrow and dict-of-NumPy input match the ColumnTransformer output."""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.pipelines.features import build_preprocessor, extend_preprocessor, transform
+from src.serving.columnar import compile_preprocessor, transform_columns
+
+
+@pytest.fixture
+def frame():
+    rs = np.random.RandomState(0)
+    n = 200
+    return pd.DataFrame({
+        "age": rs.randint(18, 90, n),
+        "balance": rs.randint(-500, 5000, n),
+        "job": rs.choice(["admin.", "retired", "student"], n),
+        "month": rs.choice(["may", "jun", "jul", "aug"], n),
+    })
+
+
+def test_arrow_dictionary_and_numpy_match_pandas_path(frame):
+    preprocessor, _ = build_preprocessor(
+        frame, numerical=["age", "balance"], categorical=["job", "month"]
+    )
+    scored = frame.copy()
+    scored.loc[0, "job"] = "never-seen"
+    expected = transform(preprocessor, scored)
+    plan = compile_preprocessor(preprocessor)
+    table = pa.Table.from_pandas(scored, preserve_index=False)
+    dict_table = table.set_column(2, "job", table.column("job").dictionary_encode())
+    for columns in (table, dict_table.to_batches()[0], {c: scored[c].to_numpy() for c in scored}):
+        np.testing.assert_allclose(
+            transform_columns(plan, columns, dtype=np.float64), expected, atol=1e-12
+        )
+    assert transform_columns(plan, table).dtype == np.float32
+
+
+def test_extended_levels_map_to_appended_columns(frame):
+    preprocessor, names = build_preprocessor(frame, numerical=["age"], categorical=["job"])
+    new = frame.assign(job=["gig-worker"] * len(frame))
+    preprocessor, names, _ = extend_preprocessor(preprocessor, names, new)
+    columns = {"age": new["age"].to_numpy(), "job": new["job"].to_numpy()}
+    X = transform_columns(compile_preprocessor(preprocessor), columns)
+    np.testing.assert_allclose(X, transform(preprocessor, new), atol=1e-6)
+    assert (X[:, names.index("job_gig-worker")] == 1).all()
+
+
+@pytest.mark.parametrize("high_cardinality", ["hash", "target"])
+def test_bounded_encoder_matches_pandas_path(frame, high_cardinality):
+    encoding = {"mode": "bounded", "min_frequency": 0.2, "max_onehot_levels": 3,
+                "high_cardinality": high_cardinality, "hash_width": 4}
+    y = (frame["job"] == "retired").to_numpy(dtype=int)
+    preprocessor, _ = build_preprocessor(frame, ["age"], ["job", "month"], y=y, encoding=encoding)
+    scored = frame.copy()
+    scored.loc[0, "job"] = "never-seen"
+    scored.loc[1, "month"] = None
+    expected = transform(preprocessor, scored)
+    plan = compile_preprocessor(preprocessor)
+    table = pa.Table.from_pandas(scored, preserve_index=False)
+    for columns in (table, {c: scored[c].to_numpy() for c in scored}):
+        np.testing.assert_allclose(
+            transform_columns(plan, columns, dtype=np.float64), expected, atol=1e-12
+        )
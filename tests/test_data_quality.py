@@ -0,0 +1,114 @@
+"""Test data quality rule engine: violations, uniqueness, chunked == whole-frame."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.monitoring.data_quality import (
+    check_chunk,
+    compile_rules,
+    empty_partial,
+    finalize,
+    merge_partials,
+    run_checks,
+)
+
+
+def _rules():
+    return compile_rules({
+        "rules": [
+            {"type": "range", "column": "age", "min": 0, "max": 120},
+            {"type": "allowed", "column": "contact", "values": ["cellular", "telephone"]},
+            {"type": "unique", "column": "id"},
+            {"type": "compare", "left": "previous", "op": "<=", "right": "campaign"},
+        ]
+    })
+
+
+def _df():
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4, 2, 6],
+        "age": [30, 150, 40, -1, 50, 60],
+        "contact": ["cellular", "fax", "telephone", None, "cellular", "cellular"],
+        "previous": [0, 1, 5, 0, 0, 2],
+        "campaign": [1, 1, 1, 1, 1, 3],
+    })
+
+
+def test_rules_report_violations():
+    rules = _rules()
+    res = finalize(check_chunk(_df(), rules), rules, max_missing=0.5)
+    assert not res["passed"]
+    by_name = {c["check"]: c for c in res["checks"]}
+    assert by_name["age_range"]["violations"] == 2
+    assert by_name["contact_allowed"]["violations"] == 1
+    assert by_name["id_unique"]["duplicates"] == 1
+    assert by_name["previous_<=_campaign"]["violations"] == 1
+
+
+def test_chunked_matches_whole():
+    rules = _rules()
+    df = _df()
+    whole = finalize(check_chunk(df, rules), rules, max_missing=0.1)
+    partial = empty_partial(rules)
+    for start in range(0, len(df), 2):
+        partial = merge_partials(partial, check_chunk(df.iloc[start:start + 2], rules))
+    chunked = finalize(partial, rules, max_missing=0.1)
+    assert chunked["checks"] == whole["checks"]
+    assert chunked["n_rows"] == len(df)
+
+
+def test_run_checks_configured_passes_clean_frame():
+    df = pd.DataFrame({"age": np.arange(20, 70), "balance": np.arange(50) * 100})
+    assert run_checks(df)["passed"]
+
+
+def test_unique_switches_to_flagged_sketch_past_exact_limit():
+    rules = compile_rules(
+        {"unique_exact_limit": 1000, "rules": [{"type": "unique", "column": "id"}]}
+    )
+    ids = np.concatenate([np.arange(50_000), np.arange(10_000)])  # 10k duplicates
+    partial = empty_partial(rules)
+    for chunk in np.array_split(ids, 20):
+        partial = merge_partials(partial, check_chunk(pd.DataFrame({"id": chunk}), rules))
+    assert partial["unique"][0]["hashes"] is None and len(partial["unique"][0]["sketch"]) == 2**14
+    (check,) = finalize(partial, rules, max_missing=0.1)["checks"]
+    assert check["approximate"] and abs(check["duplicates"] - 10_000) < 3_000
+    clean = merge_partials(
+        empty_partial(rules), check_chunk(pd.DataFrame({"id": np.arange(60_000)}), rules)
+    )
+    assert finalize(clean, rules, max_missing=0.1)["passed"]
+
+
+def test_range_rule_validated_at_compile_time():
+    with pytest.raises(ValueError, match="categorical"):
+        compile_rules({"rules": [{"type": "range", "column": "job", "min": 0}]})
+    with pytest.raises(ValueError, match="numbers"):
+        compile_rules({"rules": [{"type": "range", "column": "age", "min": "0"}]})
+    rules = compile_rules({"rules": [{"type": "range", "column": "age", "min": 0, "max": 120}]})
+    res = finalize(
+        check_chunk(pd.DataFrame({"age": ["30", "abc", None, "150"]}), rules),
+        rules,
+        max_missing=0.5,
+    )
+    assert res["checks"][0]["violations"] == 2
+
+
+def test_compare_rule_skips_nulls_and_is_validated_at_compile_time():
+    with pytest.raises(ValueError, match="categorical"):
+        compile_rules({"rules": [{"type": "compare", "left": "job", "op": "==", "right": 0}]})
+    with pytest.raises(ValueError, match="number"):
+        compile_rules({"rules": [{"type": "compare", "left": "age", "op": ">", "right": [0]}]})
+    with pytest.raises(ValueError, match="op"):
+        compile_rules({"rules": [{"type": "compare", "left": "age", "op": "=>", "right": 0}]})
+    rules = compile_rules({"rules": [
+        {"type": "compare", "left": "previous", "op": "<=", "right": "campaign"},
+        {"type": "compare", "left": "previous", "op": ">=", "right": 0},
+    ]})
+    df = pd.DataFrame({
+        "previous": pd.Series([0, np.nan, 5, 1, "x"], dtype=object),
+        "campaign": [1, 1, np.nan, 0, 1],
+    })
+    res = finalize(check_chunk(df, rules), rules, max_missing=0.5)
+    by_name = {c["check"]: c["violations"] for c in res["checks"]}
+    # Row 3 violates previous <= campaign; "x" is not a number and violates both
+    assert by_name == {"previous_<=_campaign": 2, "previous_>=_0": 1}
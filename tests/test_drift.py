@@ -3,7 +3,7 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from src.monitoring.drift import compute_drift, _psi, load_baseline
+from src.monitoring.drift import _psi, compute_drift
 
 
 def test_psi_identical():
@@ -18,7 +18,15 @@ def test_psi_shifted():
 
 
 def test_compute_drift_no_baseline():
-    df = pd.DataFrame({"age": [30, 40], "balance": [100, 200], "duration": [100, 200], "campaign": [1, 2], "pdays": [-1, 5]})
+    df = pd.DataFrame(
+        {
+            "age": [30, 40],
+            "balance": [100, 200],
+            "duration": [100, 200],
+            "campaign": [1, 2],
+            "pdays": [-1, 5],
+        }
+    )
     result = compute_drift(df, current_scores=np.array([0.3, 0.5]), baseline_path=None)
     # With no baseline file, we get empty feature_psi or no drift
     assert "drift_detected" in result
@@ -51,7 +59,11 @@ def test_compute_drift_with_mock_baseline():
             "campaign": np.random.RandomState(4).randint(1, 5, 200),
             "pdays": np.random.RandomState(5).choice([-1, 0, 50], 200),
         })
-        result = compute_drift(df, current_scores=np.random.RandomState(6).uniform(0.05, 0.2, 200), baseline_path=baseline_path)
+        result = compute_drift(
+            df,
+            current_scores=np.random.RandomState(6).uniform(0.05, 0.2, 200),
+            baseline_path=baseline_path,
+        )
         assert "feature_psi" in result or "score_psi" in result
         assert "drift_detected" in result
     finally:
@@ -62,3 +74,70 @@ def test_compute_drift_with_mock_baseline():
                 tmp.rmdir()
         except OSError:
             pass
+
+
+def test_category_counts_unseen():
+    from src.monitoring.drift import _category_counts
+    counts, unseen = _category_counts(["a", "b", "b", "z", None], ["a", "b", "c"])
+    assert counts.tolist() == [1, 2, 0]
+    assert unseen == 1
+
+
+def test_categorical_drift_detected():
+    import json
+    from pathlib import Path
+    base = Path(__file__).resolve().parent
+    tmp = base / "_drift_cat_test_tmp"
+    tmp.mkdir(exist_ok=True)
+    baseline_path = tmp / "baseline_stats.json"
+    try:
+        baseline = {
+            "feature_stats": {},
+            "category_stats": {
+                "contact": {
+                    "categories": ["cellular", "telephone", "unknown"],
+                    "counts": [600, 100, 300],
+                }
+            },
+        }
+        baseline_path.write_text(json.dumps(baseline))
+        same = pd.DataFrame({"contact": ["cellular"] * 60 + ["telephone"] * 10 + ["unknown"] * 30})
+        result = compute_drift(same, baseline_path=baseline_path)
+        assert result["category_psi"]["contact"] < 0.01
+        assert result["category_unseen_rate"]["contact"] == 0.0
+        assert not result["drift_detected"]
+        shifted = pd.DataFrame({"contact": ["telephone"] * 70 + ["video"] * 30})
+        result = compute_drift(shifted, baseline_path=baseline_path)
+        assert result["category_psi"]["contact"] > 0.2
+        assert result["category_unseen_rate"]["contact"] == pytest.approx(0.3)
+        assert result["drift_detected"]
+    finally:
+        try:
+            if baseline_path.exists():
+                baseline_path.unlink()
+            if tmp.exists():
+                tmp.rmdir()
+        except OSError:
+            pass
+
+
+def test_segment_drift_localized_shift():
+    from src.monitoring.drift import compute_segment_drift, compute_segment_stats
+    rs = np.random.RandomState(0)
+    n = 2000
+    base = pd.DataFrame({
+        "job": rs.choice(["admin.", "technician"], n),
+        "contact": rs.choice(["cellular", "telephone"], n),
+        "age": rs.normal(40, 10, n),
+        "balance": rs.normal(1000, 500, n),
+    })
+    stats = compute_segment_stats(base)
+    assert set(stats["job"]) == {"admin.", "technician"}
+    current = base.copy()
+    current.loc[current["job"] == "technician", "age"] += 30
+    segments = compute_segment_drift(current, None, stats, n_workers=2)
+    assert segments["job"]["technician"]["feature_psi"]["age"] > 0.2
+    assert (
+        segments["job"]["admin."]["feature_psi"]["age"]
+        < segments["job"]["technician"]["feature_psi"]["age"]
+    )
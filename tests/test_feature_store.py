@@ -0,0 +1,112 @@
+"""Test feature store: hash-table lookup, build, incremental refresh, atomic generations."""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from src.pipelines.feature_store import (
+    FeatureStore,
+    build_feature_store,
+    build_table,
+    lookup_table,
+    refresh_feature_store,
+)
+from src.pipelines.features import build_preprocessor, transform
+from src.serving import predict as predict_mod
+from src.serving.prediction_log import PredictionLogSink, read_prediction_logs
+
+
+def test_table_lookup_finds_every_key_and_misses_others():
+    keys = np.unique(np.random.RandomState(0).randint(0, 2**62, 50_000).astype(np.uint64))
+    table_keys, table_rows = build_table(keys, np.arange(len(keys)) * 2)
+    np.testing.assert_array_equal(
+        lookup_table(table_keys, table_rows, keys), np.arange(len(keys)) * 2
+    )
+    assert (lookup_table(table_keys, table_rows, keys + np.uint64(1)) == -1).all()
+    with pytest.raises(ValueError):
+        build_table(np.array([5, 5], dtype=np.uint64), np.arange(2))
+
+
+@pytest.fixture
+def customers():
+    rs = np.random.RandomState(0)
+    n = 300
+    return pd.DataFrame({
+        "customer_id": np.arange(1000, 1000 + n),
+        "age": rs.randint(18, 90, n),
+        "job": rs.choice(["admin.", "retired", "student"], n),
+    })
+
+
+def _store(tmp_path, df, **kwargs):
+    df.to_csv(tmp_path / "customers.csv", sep=";", index=False)
+    return dict(
+        source=tmp_path / "customers.csv", store_dir=tmp_path / "store", chunk_rows=128, **kwargs
+    )
+
+
+def test_build_and_refresh(tmp_path, customers):
+    preprocessor, names = build_preprocessor(customers, numerical=["age"], categorical=["job"])
+    args = _store(tmp_path, customers, preprocessor=preprocessor, feature_names=names)
+    build_feature_store(id_column="customer_id", **args)
+    store = FeatureStore(tmp_path / "store")
+    X, found = store.get([1000, 1299, 5])
+    assert found.tolist() == [True, True, False]
+    np.testing.assert_allclose(X, transform(preprocessor, customers.iloc[[0, 299]]), rtol=1e-6)
+
+    changed = customers.drop(index=[5]).copy()
+    changed.loc[0, "age"] = 89
+    extra = pd.DataFrame({"customer_id": [7], "age": [30], "job": ["student"]})
+    args = _store(
+        tmp_path, pd.concat([changed, extra]), preprocessor=preprocessor, feature_names=names
+    )
+    meta = refresh_feature_store(**args)
+    assert meta["last_refresh"] == {"unchanged": 298, "updated": 1, "added": 1, "removed": 1}
+    assert store.reopen_if_changed()
+    X, found = store.get([1000, 1005, 7])
+    assert found.tolist() == [True, False, True]
+    np.testing.assert_allclose(
+        X, transform(preprocessor, pd.concat([changed.iloc[[0]], extra])), rtol=1e-6
+    )
+
+
+def test_failed_refresh_leaves_store_intact(tmp_path, customers):
+    preprocessor, names = build_preprocessor(customers, numerical=["age"], categorical=["job"])
+    args = _store(tmp_path, customers, preprocessor=preprocessor, feature_names=names)
+    build_feature_store(id_column="customer_id", **args)
+    before = {p.name: p.read_bytes() for p in (tmp_path / "store").iterdir()}
+
+    changed = customers.copy()
+    changed.loc[0, "age"] = 89
+    dup = pd.DataFrame({"customer_id": [7, 7], "age": [30, 31], "job": ["student", "student"]})
+    args = _store(
+        tmp_path, pd.concat([changed, dup]), preprocessor=preprocessor, feature_names=names
+    )
+    with pytest.raises(ValueError):
+        refresh_feature_store(**args)
+    assert {p.name: p.read_bytes() for p in (tmp_path / "store").iterdir()} == before
+    assert not (tmp_path / "store.building").exists()
+
+
+def test_predict_customers_logs_found_ids(tmp_path, customers, monkeypatch):
+    preprocessor, names = build_preprocessor(customers, numerical=["age"], categorical=["job"])
+    model = LogisticRegression().fit(transform(preprocessor, customers), customers["age"] > 50)
+    monkeypatch.setenv("ARTIFACTS_DIR", str(tmp_path))
+    customers.to_csv(tmp_path / "customers.csv", sep=";", index=False)
+    # default store dir under ARTIFACTS_DIR, as served
+    build_feature_store(
+        tmp_path / "customers.csv",
+        id_column="customer_id",
+        preprocessor=preprocessor,
+        feature_names=names,
+    )
+    sink = PredictionLogSink(log_dir=tmp_path / "predictions", flush_interval_s=0.05)
+    monkeypatch.setattr(predict_mod, "load_model", lambda: (model, preprocessor, names))
+    monkeypatch.setattr(predict_mod, "get_sink", lambda: sink)
+    monkeypatch.setattr(predict_mod, "_feature_store_cache", None)
+    proba = predict_mod.predict_customers([1003, 5, 1200])
+    assert np.isnan(proba[1]) and not np.isnan(proba[[0, 2]]).any()
+    sink.close()
+    logged = read_prediction_logs(tmp_path / "predictions")
+    assert logged["customer_id"].tolist() == [1003, 1200]
+    np.testing.assert_allclose(logged["score"], proba[[0, 2]])
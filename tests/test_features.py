@@ -3,7 +3,14 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from src.pipelines.features import build_preprocessor, transform, get_feature_columns
+from src.pipelines.features import (
+    build_preprocessor,
+    extend_preprocessor,
+    fit_transform_preprocessor,
+    get_category_vocabulary,
+    get_feature_columns,
+    transform,
+)
 
 
 @pytest.fixture
@@ -13,7 +20,11 @@ def tiny_df():
     n = 5
     data = {}
     for c in num_cols:
-        data[c] = np.random.RandomState(42).randint(0, 100, n) if c != "balance" else np.random.RandomState(42).randint(-100, 1000, n)
+        data[c] = (
+            np.random.RandomState(42).randint(0, 100, n)
+            if c != "balance"
+            else np.random.RandomState(42).randint(-100, 1000, n)
+        )
     for c in cat_cols:
         data[c] = ["unknown"] * n
     return pd.DataFrame(data)
@@ -32,3 +43,77 @@ def test_preprocessor_no_error(tiny_df):
     out = transform(preprocessor, tiny_df)
     assert out is not None
     assert not np.any(np.isnan(out))
+
+
+def test_extend_preprocessor_appends_new_levels(tiny_df):
+    preprocessor, feature_names = build_preprocessor(tiny_df)
+    new = tiny_df.copy()
+    new.loc[0, "job"] = "gig-worker"
+    extended, names, levels = extend_preprocessor(preprocessor, feature_names, new)
+    assert levels == {"job": ["gig-worker"]}
+    assert names == feature_names + ["job_gig-worker"]
+    X_old, X_new = transform(preprocessor, new), transform(extended, new)
+    np.testing.assert_array_equal(X_new[:, : len(feature_names)], X_old)
+    assert X_new[:, -1].tolist() == [1.0, 0.0, 0.0, 0.0, 0.0]
+    assert get_category_vocabulary(extended)["job"] == ["unknown", "gig-worker"]
+    assert extend_preprocessor(extended, names, new)[2] == {}
+    # a further level is appended again; the fitted ColumnTransformer itself is never modified
+    newer = new.assign(job="nurse")
+    twice, _, _ = extend_preprocessor(extended, names, newer)
+    assert twice.preprocessor is preprocessor
+    assert [name for name, _, _ in preprocessor.transformers_] == ["num", "cat"]
+    assert [name for name, _, _ in twice.transformers_][-2:] == ["cat_ext_1", "cat_ext_2"]
+    assert transform(twice, newer)[:, -2:].tolist() == [[0.0, 1.0]] * 5
+
+
+@pytest.mark.parametrize("high_cardinality", ["hash", "count", "target"])
+def test_bounded_encoding_width_does_not_grow_with_cardinality(high_cardinality):
+    rs = np.random.RandomState(0)
+    encoding = {"mode": "bounded", "min_frequency": 0.02, "max_onehot_levels": 10,
+                "high_cardinality": high_cardinality, "hash_width": 8}
+    widths = []
+    for n_levels in (100, 5000):
+        df = pd.DataFrame(
+            {
+                "age": rs.randint(18, 90, 2000),
+                "job": rs.choice(
+                    ["admin.", "retired", "student"] + [f"rare{i}" for i in range(5)],
+                    2000,
+                    p=[0.3, 0.3, 0.35] + [0.01] * 5,
+                ),
+                "postcode": rs.randint(0, n_levels, 2000).astype(str),
+            }
+        )
+        preprocessor, names = build_preprocessor(
+            df, ["age"], ["job", "postcode"], y=rs.randint(0, 2, 2000), encoding=encoding
+        )
+        widths.append(len(names))
+        assert names[:5] == ["age", "job_admin.", "job_retired", "job_student", "job_infrequent"]
+        unseen = df.head(2).assign(job=["gig-worker", None], postcode=["new", "new"])
+        X = preprocessor.transform(unseen)
+        assert X.shape == (2, len(names)) and (X[:, 4] == 1).all()
+        assert extend_preprocessor(preprocessor, names, unseen)[2] == {}
+    assert widths[0] == widths[1] == 5 + (8 if high_cardinality == "hash" else 1)
+
+
+def test_target_encoding_requires_y(tiny_df):
+    with pytest.raises(ValueError, match="needs y"):
+        build_preprocessor(tiny_df, encoding={"mode": "bounded", "max_onehot_levels": 0,
+                                              "high_cardinality": "target"})
+
+
+def test_target_encoding_is_out_of_fold_on_training_rows():
+    rs = np.random.RandomState(0)
+    df = pd.DataFrame({"postcode": rs.randint(0, 200, 2000).astype(str)})
+    y = rs.randint(0, 2, 2000)  # labels unrelated to the postcode
+    encoding = {"mode": "bounded", "min_frequency": 1, "max_onehot_levels": 0,
+                "high_cardinality": "target", "target_smoothing": 1}
+    preprocessor, names, X_train = fit_transform_preprocessor(
+        df, [], ["postcode"], y=y, encoding=encoding
+    )
+    assert names == ["postcode_target"]
+    # full-data rates contain each row's own label; out-of-fold ones do not
+    assert np.corrcoef(preprocessor.transform(df)[:, 0], y)[0, 1] > 0.2
+    assert abs(np.corrcoef(X_train[:, 0], y)[0, 1]) < 0.1
+    fitted, _ = build_preprocessor(df, [], ["postcode"], y=y, encoding=encoding)
+    np.testing.assert_allclose(fitted.transform(df), preprocessor.transform(df))
@@ -0,0 +1,60 @@
+"""Test incremental retrain: widened models keep predictions; warm start adds stages."""
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeRegressor
+
+from src.pipelines.incremental import extend_model, load_new_rows, widen_model
+from src.pipelines.ingest import load_raw
+from src.pipelines.synthetic import default_spec, write_dataset
+
+
+def _data(n_features, seed):
+    rs = np.random.RandomState(seed)
+    X = rs.randn(300, n_features)
+    return X, (X[:, 0] + X[:, -1] > 0).astype(int)
+
+
+@pytest.mark.parametrize(
+    "model", [GradientBoostingClassifier(n_estimators=10), LogisticRegression()]
+)
+def test_widened_model_unchanged_on_old_columns(model):
+    X, y = _data(4, 0)
+    model.fit(X, y)
+    before = model.predict_proba(X)[:, 1]
+    widen_model(model, 6)
+    X_wide = np.hstack([X, np.random.RandomState(1).randn(len(X), 2)])
+    np.testing.assert_allclose(model.predict_proba(X_wide)[:, 1], before)
+
+
+def test_extend_gradient_boosting_adds_stages_on_new_columns():
+    X, y = _data(4, 0)
+    gb = GradientBoostingClassifier(n_estimators=10, random_state=0).fit(X, y)
+    X_new, y_new = _data(6, 2)
+    assert extend_model(gb, X_new, y_new, add_estimators=5, linear_max_iter=20)
+    assert len(gb.estimators_) == 15 and gb.n_features_in_ == 6
+    assert not gb.warm_start
+    assert gb.feature_importances_.shape == (6,)
+    assert not extend_model(gb, X_new, np.zeros(len(X_new), dtype=int), 5, 20)
+    assert len(gb.estimators_) == 15
+
+
+def test_history_and_new_rows_split_at_the_watermark(tmp_path):
+    path = write_dataset(default_spec(), 50, tmp_path / "raw.csv", seed=0)
+    history, new = load_raw(path, n_rows=30), load_new_rows(30, path)
+    assert (len(history), len(new)) == (30, 20)
+    assert history.equals(load_raw(path).head(30))
+    with pytest.raises(ValueError, match="full retrain"):
+        load_new_rows(60, path)
+
+
+def test_tree_state_layout_is_what_widen_model_expects():
+    # widen_model copies Tree.__getstate__() into a wider Tree; a new scikit-learn that
+    # changes this layout must fail here rather than silently corrupt widened models
+    X, y = _data(4, 0)
+    tree = DecisionTreeRegressor(max_depth=3, random_state=0).fit(X, y).tree_
+    state = tree.__getstate__()
+    assert sorted(state) == ["max_depth", "node_count", "nodes", "values"]
+    assert state["nodes"].dtype.names[:3] == ("left_child", "right_child", "feature")
+    assert state["values"].shape == (tree.node_count, 1, 1)
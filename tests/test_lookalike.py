@@ -0,0 +1,36 @@
+"""Test lookalike index: exact blocked search, ivf with full probing, audience expansion."""
+import numpy as np
+
+from src.serving import lookalike
+from src.serving.lookalike import build_index, expand_audience, search
+
+
+def _data():
+    rs = np.random.RandomState(0)
+    return rs.randn(3000, 8).astype(np.float32), rs.randn(40, 8).astype(np.float32)
+
+
+def test_exact_matches_brute_force(monkeypatch):
+    monkeypatch.setattr(lookalike, "_BLOCK_ELEMENTS", 10_000)  # force several base blocks
+    X, Q = _data()
+    dist, ids = search(build_index(X, method="exact"), Q, k=7)
+    brute = ((Q[:, None, :] - X[None]) ** 2).sum(-1)
+    np.testing.assert_array_equal(ids, np.argsort(brute, axis=1)[:, :7])
+    np.testing.assert_allclose(dist, np.sort(brute, axis=1)[:, :7], rtol=1e-4, atol=1e-4)
+
+
+def test_ivf_probing_all_lists_is_exact():
+    X, Q = _data()
+    ids_exact = search(build_index(X, method="exact"), Q, k=5)[1]
+    ivf = build_index(X, ids=np.arange(len(X)) + 1000, method="ivf", n_lists=16)
+    ids_ivf = search(ivf, Q, k=5, n_probe=16)[1]
+    np.testing.assert_array_equal(ids_ivf, ids_exact + 1000)
+
+
+def test_expand_audience_excludes_seeds():
+    X, _ = _data()
+    index = build_index(X, method="exact")
+    audience = expand_audience(index, X[:10], size=25, k_per_seed=10, exclude_ids=range(10))
+    assert len(audience) == 25
+    assert not set(audience["id"]) & set(range(10))
+    assert audience["hits"].is_monotonic_decreasing
@@ -0,0 +1,58 @@
+"""Test artifact manifest: verification, tamper detection, mismatched model/preprocessor."""
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from src.pipelines.features import (
+    build_preprocessor,
+    get_feature_columns,
+    save_preprocessor,
+    transform,
+)
+from src.serving.manifest import (
+    STAMP_NAME,
+    build_manifest,
+    check_compatibility,
+    verify_artifacts,
+    write_manifest,
+)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    num_cols, cat_cols = get_feature_columns()
+    rs = np.random.RandomState(0)
+    df = pd.DataFrame({c: rs.randint(0, 100, 40) for c in num_cols})
+    for c in cat_cols:
+        df[c] = rs.choice(["a", "b", "c"], 40)
+    preprocessor, feature_names = build_preprocessor(df)
+    model = LogisticRegression().fit(transform(preprocessor, df), rs.randint(0, 2, 40))
+    joblib.dump(model, tmp_path / "model.joblib")
+    save_preprocessor(preprocessor, feature_names, tmp_path)
+    write_manifest(build_manifest(tmp_path, model, preprocessor, feature_names), tmp_path)
+    return tmp_path
+
+
+def test_verify_writes_stamp(model_dir):
+    from src.serving.manifest import load_manifest
+    manifest = load_manifest(model_dir)
+    verify_artifacts(model_dir, manifest)
+    assert (model_dir / STAMP_NAME).exists()
+    verify_artifacts(model_dir, manifest)  # stamp hit
+
+
+def test_tampered_artifact_fails(model_dir):
+    from src.serving.manifest import load_manifest
+    manifest = load_manifest(model_dir)
+    with open(model_dir / "preprocessor.joblib", "ab") as f:
+        f.write(b"x")
+    with pytest.raises(ValueError, match="does not match manifest"):
+        verify_artifacts(model_dir, manifest)
+
+
+def test_mismatched_pair_fails(model_dir):
+    model = joblib.load(model_dir / "model.joblib")
+    with pytest.raises(ValueError, match="different training runs"):
+        check_compatibility(None, model, ["only_one_feature"])
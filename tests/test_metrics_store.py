@@ -0,0 +1,79 @@
+"""Test monitoring metrics store: append-only partitions, range queries, rollups."""
+from datetime import datetime, timezone
+
+from src.monitoring.metrics_store import append_results, query, rollup, top_drifting
+
+
+def _drift(age_psi, balance_psi):
+    return {
+        "feature_psi": {"age": age_psi, "balance": balance_psi},
+        "category_psi": {"job": 0.01},
+        "score_psi": 0.05,
+        "segment_drift": {"job": {"admin.": {"feature_psi": {"age": 0.5}, "score_psi": None}}},
+        "drift_detected": age_psi > 0.2,
+    }
+
+
+def test_append_and_query(tmp_path):
+    for day, psi in [(1, 0.1), (2, 0.3), (3, 0.05)]:
+        run_at = datetime(2026, 3, day, 12, tzinfo=timezone.utc)
+        append_results(_drift(psi, 0.01), model_version="v1", run_at=run_at, store_dir=tmp_path)
+    append_results(
+        _drift(0.9, 0.9),
+        model_version="v2",
+        run_at=datetime(2026, 3, 2, tzinfo=timezone.utc),
+        store_dir=tmp_path,
+    )
+
+    assert len(list(tmp_path.rglob("*.parquet"))) == 4
+    rows = query(
+        start="2026-03-02",
+        end="2026-03-03",
+        model_version="v1",
+        metric="feature_psi",
+        store_dir=tmp_path,
+    )
+    assert sorted(rows["value"][rows["feature"] == "age"]) == [0.05, 0.3]
+
+    daily = rollup(metric="feature_psi", model_version="v1", store_dir=tmp_path)
+    assert list(daily.columns) == ["age", "balance"]
+    assert len(daily) == 3
+
+    top = top_drifting(n=1, model_version="v1", store_dir=tmp_path)
+    assert top.iloc[0]["feature"] == "age"
+    with_segments = top_drifting(n=1, model_version="v1", include_segments=True, store_dir=tmp_path)
+    assert with_segments.iloc[0]["segment"] == "job=admin."
+
+
+def test_query_empty_store(tmp_path):
+    assert query(store_dir=tmp_path / "missing").empty
+    assert rollup(store_dir=tmp_path / "missing").empty
+
+
+def test_live_decay_is_not_drift(tmp_path):
+    append_results(
+        {"live_performance": {"roc_auc": 0.61}, "decay_detected": True},
+        model_version="v1",
+        store_dir=tmp_path,
+    )
+    rows = query(store_dir=tmp_path)
+    assert not rows["drift_detected"].any()
+    decay = rows[rows["metric"] == "live_decay_detected"]
+    assert decay["value"].tolist() == [1.0]
+
+
+def test_quality_results_are_stored(tmp_path):
+    quality = {
+        "passed": False,
+        "checks": [
+            {"check": "age_range", "violations": 3, "expected": [0, 120]},
+            {"check": "id_unique", "columns": ["id"], "duplicates": 2},
+        ],
+    }
+    append_results({}, quality_results=quality, model_version="v1", store_dir=tmp_path)
+    rows = query(store_dir=tmp_path)
+    assert not rows["drift_detected"].any()
+    assert rows.loc[rows["metric"] == "dq_passed", "value"].tolist() == [0.0]
+    violations = rows[rows["metric"] == "dq_violations"].set_index("feature")
+    assert violations["value"].to_dict() == {"age_range": 3.0, "id_unique": 2.0}
+    assert violations.loc["id_unique", "segment"] == "id"
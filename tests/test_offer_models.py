@@ -0,0 +1,37 @@
+"""Test per-offer models: labels, feature exclusion, shared-matrix scoring."""
+import numpy as np
+import pandas as pd
+
+from src.pipelines.offer_models import (
+    offer_feature_index,
+    offer_labels,
+    score_offer_matrix,
+    train_offer_models,
+)
+
+
+def test_offer_labels_column_and_expr():
+    df = pd.DataFrame({"y": ["yes", "no", "yes"], "loan": ["no", "yes", "yes"]})
+    labels = offer_labels(df, {
+        "term_deposit": {"column": "y", "positive": "yes"},
+        "combo": {"expr": "(y == 'yes') & (loan == 'yes')"},
+    })
+    assert labels["term_deposit"].tolist() == [1, 0, 1]
+    assert labels["combo"].tolist() == [0, 0, 1]
+
+
+def test_offer_feature_index_excludes_raw_column():
+    names = ["age", "pdays", "day", "loan_yes", "housing_yes"]
+    assert offer_feature_index(names, ["loan", "day"]).tolist() == [0, 1, 4]
+
+
+def test_train_and_score_matrix():
+    rs = np.random.RandomState(0)
+    X = rs.randn(200, 4)
+    names = ["age", "balance", "loan_yes", "housing_yes"]
+    labels = {"term_deposit": (X[:, 0] > 0).astype(int), "personal_loan": (X[:, 2] > 0).astype(int)}
+    bundle = train_offer_models(X, labels, names, n_jobs=1)
+    matrix = score_offer_matrix(bundle, X)
+    assert matrix.shape == (200, 2)
+    assert ((matrix >= 0) & (matrix <= 1)).all()
+    assert bundle["feature_idx"]["personal_loan"].tolist() == [0, 1, 3]
@@ -0,0 +1,131 @@
+"""Test live performance: delayed-label join, histogram metrics, incremental outcome processing."""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import roc_auc_score
+
+from src.monitoring.performance import histogram_metrics, join_outcomes, update_live_performance
+
+CFG = {
+    "window": "1D",
+    "score_bins": 1000,
+    "precision_at": [0.1],
+    "min_labels": 10,
+    "max_delay_days": 5,
+}
+
+
+def _predictions():
+    t0 = pd.Timestamp("2026-03-01", tz="UTC")
+    return pd.DataFrame({
+        "customer_id": [1, 1, 2, 3, 4],
+        "score": [0.2, 0.6, 0.9, 0.4, 0.7],
+        "model_version": ["v1", "v2", "v2", "v2", "v2"],
+        "logged_at": [t0, t0 + pd.Timedelta(days=2), t0, t0, t0 - pd.Timedelta(days=30)],
+    })
+
+
+def test_join_takes_latest_earlier_prediction_within_delay():
+    t0 = pd.Timestamp("2026-03-01", tz="UTC")
+    outcomes = pd.DataFrame(
+        {
+            "customer_id": ["1", "1", "2", "2", "4", "9"],
+            "observed_at": [
+                t0 + pd.Timedelta(days=1),
+                t0 + pd.Timedelta(days=3),
+                t0 + pd.Timedelta(days=1),
+                t0 + pd.Timedelta(days=2),
+                t0,
+                t0,
+            ],
+            "y": ["no", "yes", "yes", "no", "yes", "yes"],
+        }
+    )
+    joined = join_outcomes(_predictions(), outcomes, max_delay_days=5)
+    got = {(str(r.customer_id), r.y): (r.score, r.model_version) for r in joined.itertuples()}
+    # customer 1: each outcome gets the prediction live at the time; customer 2's second
+    # outcome re-uses its only prediction and is dropped; 4 is too late, 9 was never scored
+    assert got == {("1", "no"): (0.2, "v1"), ("1", "yes"): (0.6, "v2"), ("2", "yes"): (0.9, "v2")}
+
+
+def test_histogram_metrics_match_exact_auc():
+    rs = np.random.RandomState(0)
+    scores = rs.rand(5000)
+    y = (rs.rand(5000) < scores).astype(int)
+    bins = np.minimum((scores * 1000).astype(int), 999)
+    m = histogram_metrics(
+        np.bincount(bins, weights=y, minlength=1000),
+        np.bincount(bins, weights=1 - y, minlength=1000),
+        np.bincount(bins, weights=scores, minlength=1000),
+        [0.1],
+    )
+    assert m["roc_auc"] == pytest.approx(roc_auc_score(y, scores), abs=1e-3)
+    top = np.argsort(-scores)[:500]
+    assert m["precision_at_0.1"] == pytest.approx(y[top].mean(), abs=0.02)
+    assert m["ece"] < 0.05
+
+
+def test_update_processes_each_outcome_file_once(tmp_path):
+    rs = np.random.RandomState(1)
+    n = 400
+    day = pd.Timestamp("2026-03-01", tz="UTC")
+    logs = tmp_path / "predictions" / "date=2026-03-01"
+    logs.mkdir(parents=True)
+    scores = rs.rand(n)
+    pd.DataFrame({
+        "customer_id": np.arange(n), "score": scores, "model_version": "v1",
+        "logged_at": day + pd.to_timedelta(rs.randint(0, 86400, n), unit="s"),
+    }).to_parquet(logs / "predictions-000000-000001.parquet", index=False)
+    outcomes = tmp_path / "outcomes"
+    outcomes.mkdir()
+    y = np.where(rs.rand(n) < scores, "yes", "no")
+    for part, rows in enumerate(np.array_split(np.arange(n), 2)):
+        pd.DataFrame({
+            "customer_id": rows, "y": y[rows], "observed_at": day + pd.Timedelta(days=2 + part),
+        }).to_csv(outcomes / f"outcomes-{part}.csv", index=False)
+        kwargs = dict(outcomes_dir=outcomes, predictions_dir=tmp_path / "predictions",
+                      state_dir=tmp_path / "state", cfg=CFG, reference_auc=0.99)
+        res = update_live_performance(**kwargs)
+        assert res["new_matched_outcomes"] == len(rows)
+    rolling = res["model_versions"]["v1"]["rolling"]
+    assert rolling["n"] == n
+    assert rolling["roc_auc"] == pytest.approx(roc_auc_score(y == "yes", scores), abs=1e-3)
+    assert res["decay_detected"]
+    again = update_live_performance(**kwargs)
+    assert again["new_matched_outcomes"] == 0 and again["model_versions"]["v1"]["rolling"]["n"] == n
+
+
+def test_outcomes_ahead_of_their_predictions_stay_pending(tmp_path):
+    day = pd.Timestamp("2026-03-01", tz="UTC")
+    logs = tmp_path / "predictions" / "date=2026-03-01"
+    logs.mkdir(parents=True)
+
+    def log(ids, name):
+        pd.DataFrame({
+            "customer_id": ids, "score": 0.5, "model_version": "v1", "logged_at": day,
+        }).to_parquet(logs / name, index=False)
+
+    log([0, 1], "predictions-000000-1-000001.parquet")
+    outcomes = tmp_path / "outcomes"
+    outcomes.mkdir()
+    pd.DataFrame({
+        "customer_id": [0, 1, 2],
+        "y": ["yes", "no", "yes"],
+        "observed_at": day + pd.Timedelta(1, "D"),
+    }).to_csv(outcomes / "outcomes-0.csv", index=False)
+    kwargs = dict(outcomes_dir=outcomes, predictions_dir=tmp_path / "predictions",
+                  state_dir=tmp_path / "state", cfg=CFG)
+
+    waiting = update_live_performance(**kwargs, now=day + pd.Timedelta(2, "D"))
+    assert waiting["pending_outcome_files"] == 1 and waiting["new_matched_outcomes"] == 0
+    log([2], "predictions-000000-2-000001.parquet")  # customer 2's prediction lands late
+    settled = update_live_performance(**kwargs, now=day + pd.Timedelta(2, "D"))
+    assert settled["pending_outcome_files"] == 0 and settled["new_matched_outcomes"] == 3
+
+    # Past max_delay_days an unmatched outcome no longer holds its file back
+    pd.DataFrame({
+        "customer_id": [0, 9], "y": ["no", "no"], "observed_at": day + pd.Timedelta(3, "D"),
+    }).to_csv(outcomes / "outcomes-1.csv", index=False)
+    late = update_live_performance(**kwargs, now=day + pd.Timedelta(30, "D"))
+    assert late["new_outcome_files"] == 1 and late["new_matched_outcomes"] == 1
+    assert late["model_versions"]["v1"]["rolling"]["n"] == 4
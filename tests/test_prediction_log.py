@@ -0,0 +1,55 @@
+"""Test prediction log sink: rows land on disk, drop policy, drift can consume them."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.monitoring.drift import compute_drift
+from src.serving.prediction_log import PredictionLogSink, read_prediction_logs
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "jsonl"])
+def test_sink_writes_readable_logs(tmp_path, fmt):
+    sink = PredictionLogSink(log_dir=tmp_path, fmt=fmt, batch_rows=3, flush_interval_s=0.05)
+    for i in range(5):
+        df = pd.DataFrame({"age": [30 + i, 40 + i], "contact": ["cellular", "telephone"]})
+        assert sink.log(df, np.array([0.1, 0.2]), model_version="v1", latency_ms=1.5)
+    sink.close()
+    logged = read_prediction_logs(tmp_path)
+    assert len(logged) == 10
+    assert {"age", "contact", "score", "model_version", "latency_ms", "logged_at"} <= set(
+        logged.columns
+    )
+    assert (logged["model_version"] == "v1").all()
+    # Each process writes its own files, so pre-forked workers never collide
+    assert all(f"-{os.getpid()}" in p.name for p in tmp_path.glob("date=*/*"))
+    result = compute_drift(logged, logged["score"].values)
+    assert "drift_detected" in result
+
+
+def test_sink_drops_when_full(tmp_path):
+    import threading
+    gate = threading.Event()
+    sink = PredictionLogSink(log_dir=tmp_path, max_queue=2, batch_rows=1, on_full="drop")
+    sink._write = lambda pending: gate.wait()  # stall the writer
+    df = pd.DataFrame({"age": [30]})
+    accepted = [sink.log(df, [0.5]) for _ in range(5)]
+    assert sum(accepted) <= 3
+    assert sink.stats["dropped"] == 5 - sum(accepted)
+    gate.set()
+    sink.close()
+
+
+def test_sink_snapshots_scores_and_writes_clean_jsonl(tmp_path):
+    sink = PredictionLogSink(log_dir=tmp_path, fmt="jsonl", flush_interval_s=10)
+    scores = np.array([0.1, 0.2])
+    sink.log(pd.DataFrame({"age": [30, 40]}), scores)
+    scores[:] = 0.9
+    sink.log(pd.DataFrame({"age": [99, 40]}), scores)
+    sink.close()
+    logged = read_prediction_logs(tmp_path)
+    assert logged["age"].tolist() == [30, 40, 99, 40]
+    assert logged["score"].tolist() == [0.1, 0.2, 0.9, 0.9]
+    (path,) = tmp_path.glob("date=*/*.jsonl")
+    assert "\n\n" not in path.read_text()
@@ -0,0 +1,33 @@
+"""Test performance profile: all measures present and sane on a tiny model."""
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from src.governance.model_card import _performance_lines
+from src.pipelines.features import (
+    build_preprocessor,
+    get_feature_columns,
+    save_preprocessor,
+    transform,
+)
+from src.pipelines.profile_model import profile_model
+
+
+def test_profile_model(tmp_path):
+    num_cols, cat_cols = get_feature_columns()
+    rs = np.random.RandomState(0)
+    df = pd.DataFrame({c: rs.randint(0, 100, 50) for c in num_cols})
+    for c in cat_cols:
+        df[c] = rs.choice(["a", "b"], 50)
+    preprocessor, feature_names = build_preprocessor(df)
+    model = LogisticRegression().fit(transform(preprocessor, df), rs.randint(0, 2, 50))
+    joblib.dump(model, tmp_path / "model.joblib")
+    save_preprocessor(preprocessor, feature_names, tmp_path)
+
+    profile = profile_model(df, tmp_path, single_row_runs=20, batch_rows=200, load_runs=1)
+    assert profile["artifact_bytes"] > 0
+    assert 0 < profile["single_row_p50_ms"] <= profile["single_row_p99_ms"]
+    assert profile["batch_throughput_rows_per_s"] > 0
+    assert profile["scoring_peak_rss_mb"] >= profile["loaded_rss_mb"] > 0
+    assert any("Single-row latency p99" in line for line in _performance_lines(profile))
@@ -0,0 +1,43 @@
+"""Test pipeline profiling: nested stages, summary and Chrome trace outputs."""
+import json
+
+import numpy as np
+
+from src.utils import paths
+from src.utils.profiling import profiled, stage
+
+
+def test_profiled_entry_writes_summary_and_trace(tmp_path, monkeypatch):
+    monkeypatch.setattr(paths, "get_metrics_dir", lambda: tmp_path)
+    monkeypatch.setenv("PIPELINE_PROFILE_SAMPLING", "1")
+
+    @profiled("unit")
+    def main():
+        with stage("load", rows=1000):
+            data = np.ones((1000, 100))
+            with stage("inner") as st:
+                st.rows = 10
+        with stage("work"):
+            return float(data.sum())
+
+    assert main() == 100_000.0
+    summary = json.loads((tmp_path / "profiles" / "unit_summary.json").read_text())
+    assert [s["path"] for s in summary["stages"]] == [
+        "unit",
+        "unit/load",
+        "unit/load/inner",
+        "unit/work",
+    ]
+    load = summary["stages"][1]
+    assert load["rows"] == 1000 and load["wall_s"] >= 0 and load["cpu_s"] >= 0
+    assert summary["stages"][2]["rows"] == 10
+    trace = json.loads((tmp_path / "profiles" / "unit_trace.json").read_text())
+    slices = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in slices] == ["unit", "load", "inner", "work"]
+    assert all(e["dur"] >= 0 for e in slices)
+
+
+def test_stage_outside_profiled_run_is_unrecorded():
+    with stage("adhoc", rows=5) as st:
+        st.rows = 6
+    assert st.rows == 6
@@ -0,0 +1,113 @@
+"""Test model registry: version resolution, LRU eviction under a memory budget, pinning, metrics."""
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from src.pipelines.features import (
+    build_preprocessor,
+    get_feature_columns,
+    save_preprocessor,
+    transform,
+)
+from src.serving import predict as predict_mod
+from src.serving.manifest import build_manifest, write_manifest
+from src.serving.registry import DEFAULT_NAME, ModelRegistry, list_models, publish
+
+
+def _frame(seed):
+    num_cols, cat_cols = get_feature_columns()
+    rs = np.random.RandomState(seed)
+    df = pd.DataFrame({c: rs.randint(0, 100, 60) for c in num_cols})
+    for c in cat_cols:
+        df[c] = rs.choice(["a", "b", "c"], 60)
+    return df
+
+
+def _package(path, seed):
+    df = _frame(seed)
+    preprocessor, feature_names = build_preprocessor(df)
+    model = LogisticRegression().fit(
+        transform(preprocessor, df), np.random.RandomState(seed).randint(0, 2, 60)
+    )
+    path.mkdir(parents=True)
+    joblib.dump(model, path / "model.joblib")
+    save_preprocessor(preprocessor, feature_names, path)
+    write_manifest(build_manifest(path, model, preprocessor, feature_names), path)
+    return path
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "models"
+    for i, name in enumerate(["north", "south", "east"]):
+        publish(name, _package(tmp_path / f"pkg{i}", i), root=root)
+    publish("north", _package(tmp_path / "pkg_new", 10), root=root)
+    return root
+
+
+def test_publish_and_resolve_latest(root, tmp_path):
+    models = list_models(root)
+    assert sorted(models) == ["east", "north", "south"] and len(models["north"]) == 2
+    registry = ModelRegistry(root)
+    assert registry.resolve("north") == models["north"][-1]
+    old = registry.get("north", models["north"][0])
+    assert old["version"] == models["north"][0]
+    scores = old["model"].predict_proba(transform(old["preprocessor"], _frame(5)))[:, 1]
+    assert scores.shape == (60,)
+    with pytest.raises(FileNotFoundError):
+        registry.get("west")
+
+
+def test_lru_eviction_respects_budget_and_pins(root):
+    one = ModelRegistry(root).get("south")["bytes"]
+    registry = ModelRegistry(root, memory_budget_mb=2.5 * one / 2**20, pinned=["east"])
+    registry.get("north")
+    registry.get("south")  # evicts north (LRU, unpinned); east stays pinned
+    assert [r.split("@")[0] for r in registry.resident()] == ["east", "south"]
+    registry.get("south")
+    registry.get("north")
+    stats = registry.stats()
+    assert stats["resident_bytes"] <= registry.budget_bytes
+    north = next(v for k, v in stats["models"].items() if k.startswith("north@"))
+    south = next(v for k, v in stats["models"].items() if k.startswith("south@"))
+    assert north["loads"] == 2 and north["evictions"] == 1 and north["last_load_s"] > 0
+    assert south["hit_rate"] == 0.5 and not south["resident"]
+    assert next(v for k, v in stats["models"].items() if k.startswith("east@"))["pinned"]
+    assert not registry._loading  # per-key load locks are dropped once loaded
+
+
+def test_latest_version_cached_until_publish(root, tmp_path, monkeypatch):
+    registry = ModelRegistry(root, latest_ttl_s=3600)
+    latest = registry.resolve("south")
+    calls = []
+    monkeypatch.setattr(
+        "src.serving.registry.list_versions", lambda *a: calls.append(a) or [latest]
+    )
+    assert registry.resolve("south") == latest and calls == []
+    monkeypatch.undo()
+    new = publish("south", _package(tmp_path / "pkg_south_new", 20), root=root)
+    assert registry.resolve("south") == new
+
+
+def test_default_reuses_primary_model_and_follows_retrain(root, tmp_path, monkeypatch):
+    monkeypatch.setenv("ARTIFACTS_DIR", str(tmp_path))
+    _package(tmp_path / "model", 1)
+    predict_mod._model_cache = None
+    try:
+        registry = ModelRegistry(root, latest_ttl_s=0)
+        entry = registry.get(DEFAULT_NAME)
+        assert entry["model"] is predict_mod.load_model()[0]
+        assert entry["version"] == predict_mod.get_model_version()
+        assert registry.resident() == []
+
+        shutil.rmtree(tmp_path / "model")
+        _package(tmp_path / "model", 2)  # retrain
+        retrained = registry.get(DEFAULT_NAME)
+        assert retrained["version"] != entry["version"]
+        assert retrained["model"] is predict_mod.load_model()[0]
+    finally:
+        predict_mod._model_cache = None  # later tests reload their own artifacts
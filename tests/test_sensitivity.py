@@ -0,0 +1,61 @@
+"""Test what-if grid construction and sweep scoring."""
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+import src.serving.predict as predict_mod
+from src.pipelines.features import (
+    build_preprocessor,
+    get_feature_columns,
+    save_preprocessor,
+    transform,
+)
+from src.serving.predict import predict_batch
+from src.serving.sensitivity import axis_values, build_grid, sensitivity_sweep
+
+
+def test_build_grid_2d():
+    base = {"age": 40, "duration": 300, "contact": "cellular"}
+    grid = build_grid(base, "duration", [0, 100, 200], "contact", ["cellular", "telephone"])
+    assert len(grid) == 6
+    assert (grid["age"] == 40).all()
+    assert grid.groupby("contact")["duration"].apply(list).to_dict() == {
+        "cellular": [0, 100, 200],
+        "telephone": [0, 100, 200],
+    }
+
+
+def test_axis_values():
+    values = axis_values("duration", 5)
+    assert values[0] == 0 and len(values) == 5
+    assert axis_values("contact", 5) == ["cellular", "telephone", "unknown"]
+
+
+def test_sweep_scores_every_grid_point(tmp_path, monkeypatch):
+    num_cols, cat_cols = get_feature_columns()
+    rs = np.random.RandomState(0)
+    df = pd.DataFrame({c: rs.randint(0, 2000, 400) for c in num_cols})
+    for c in cat_cols:
+        df[c] = rs.choice(["cellular", "telephone", "unknown"], 400)
+    preprocessor, feature_names = build_preprocessor(df)
+    model_dir = tmp_path / "model"
+    model = LogisticRegression().fit(
+        transform(preprocessor, df), (df["duration"] > 1000).astype(int)
+    )
+    model_dir.mkdir()
+    joblib.dump(model, model_dir / "model.joblib")
+    save_preprocessor(preprocessor, feature_names, model_dir)
+    monkeypatch.setenv("ARTIFACTS_DIR", str(tmp_path))
+    predict_mod._model_cache = None
+    try:
+        base = df.iloc[0].to_dict()
+        grid = sensitivity_sweep(base, "duration", "contact", n_points=6)
+        assert len(grid) == 6 * 3 and grid["score"].between(0, 1).all()
+        np.testing.assert_allclose(
+            grid["score"], predict_batch(grid.drop(columns="score"), log=False)
+        )
+        for _, curve in grid.groupby("contact"):
+            assert curve.sort_values("duration")["score"].is_monotonic_increasing
+    finally:
+        predict_mod._model_cache = None  # later tests reload their own artifacts
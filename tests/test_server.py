@@ -0,0 +1,137 @@
+"""Test pre-forking server: scoring endpoint, worker restart, graceful reload, clean shutdown."""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from src.governance.audit import query_audit
+from src.pipelines.features import (
+    build_preprocessor,
+    get_feature_columns,
+    save_preprocessor,
+    transform,
+)
+from src.serving.prediction_log import read_prediction_logs
+from src.serving.server import _records
+
+
+def test_records_accepts_record_list_or_wrapper():
+    assert _records(b'{"age": 1}') == [{"age": 1}]
+    assert _records(b'[{"age": 1}, {"age": 2}]') == [{"age": 1}, {"age": 2}]
+    assert _records(b'{"records": [{"age": 1}]}') == [{"age": 1}]
+    with pytest.raises(ValueError):
+        _records(b"[1, 2]")
+
+
+def _get(url, data=None):
+    with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=5) as r:
+        return json.loads(r.read())
+
+
+def _wait_for_pid(url, not_pid, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            pid = _get(url)["pid"]
+            if pid != not_pid:
+                return pid
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise AssertionError("worker was not replaced")
+
+
+def _package(tmp_path):
+    num_cols, cat_cols = get_feature_columns()
+    rs = np.random.RandomState(0)
+    df = pd.DataFrame({c: rs.randint(1, 30, 60) for c in num_cols})
+    for c in cat_cols:
+        df[c] = rs.choice(["a", "b"], 60)
+    preprocessor, feature_names = build_preprocessor(df)
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    joblib.dump(
+        LogisticRegression().fit(transform(preprocessor, df), rs.randint(0, 2, 60)),
+        model_dir / "model.joblib",
+    )
+    save_preprocessor(preprocessor, feature_names, model_dir)
+    return df
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(tmp_path, code=None):
+    """Server subprocess on a free port; code (if given) runs first, e.g. to patch config."""
+    port = _free_port()
+    args = ["--workers", "1", "--host", "127.0.0.1", "--port", str(port)]
+    cmd = [sys.executable, "-m", "src.serving.server", *args]
+    if code is not None:
+        cmd = [sys.executable, "-c", f"{code}\nimport sys\nfrom src.serving.server import main\n"
+               f"sys.argv = ['server', *{args!r}]\nmain()"]
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.DEVNULL, env={**os.environ, "ARTIFACTS_DIR": str(tmp_path)}
+    )
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def test_supervisor_restarts_reloads_and_stops(tmp_path):
+    df = _package(tmp_path)
+    proc, base = _start(tmp_path)
+    try:
+        health = f"{base}/health"
+        first = _wait_for_pid(health, None)
+        body = json.dumps(df.head(3).to_dict(orient="records") + [{"age": 1}]).encode()
+        scores = _get(f"{base}/predict", body)["scores"]
+        assert len(scores) == 4 and scores[3] is None and all(0 <= s <= 1 for s in scores[:3])
+
+        os.kill(first, signal.SIGKILL)
+        restarted = _wait_for_pid(health, first)
+        proc.send_signal(signal.SIGHUP)
+        reloaded = _wait_for_pid(health, restarted)
+        assert len({first, restarted, reloaded}) == 3
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=15) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+
+
+def test_reload_flushes_prediction_log_and_audit(tmp_path):
+    df = _package(tmp_path)
+    # a flush interval far beyond the test: only the worker's exit path can write the row
+    proc, base = _start(
+        tmp_path,
+        "from src.utils.config import get_app_config\n"
+        "get_app_config()['prediction_log'].update(enabled=True, flush_interval_s=3600)",
+    )
+    try:
+        first = _wait_for_pid(f"{base}/health", None)
+        _get(f"{base}/predict", json.dumps(df.head(1).to_dict(orient="records")).encode())
+        proc.send_signal(signal.SIGHUP)
+        _wait_for_pid(f"{base}/health", first)
+        deadline = time.monotonic() + 15
+        # until the old worker has drained and been reaped
+        while time.monotonic() < deadline and os.path.exists(f"/proc/{first}"):
+            time.sleep(0.1)
+        logged = read_prediction_logs(tmp_path / "predictions")
+        assert len(logged) == 1 and logged["age"].iloc[0] == df["age"].iloc[0]
+        (audited,) = query_audit(action="score", path=tmp_path / "audit_log.jsonl")
+        assert audited["metadata"]["endpoint"] == "/predict" and audited["metadata"]["rows"] == 1
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=15)
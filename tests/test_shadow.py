@@ -0,0 +1,66 @@
+"""Test shadow scoring: challengers score the shared matrix off-path; never blocks when full."""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from src.serving.prediction_log import PredictionLogSink, read_prediction_logs
+from src.serving.shadow import ShadowScorer
+
+
+def _challenger():
+    rs = np.random.RandomState(0)
+    X = rs.randn(100, 3)
+    return LogisticRegression().fit(X, (X[:, 0] > 0).astype(int))
+
+
+def test_challenger_scores_logged_with_champion_score(tmp_path):
+    challenger = _challenger()
+    sink = PredictionLogSink(log_dir=tmp_path, flush_interval_s=0.05)
+    scorer = ShadowScorer({"logistic_regression": challenger}, sink)
+    X = np.random.RandomState(1).randn(4, 3)
+    features = pd.DataFrame({"age": [30, 40, 50, 60]})
+    assert scorer.submit(X, features, np.array([0.1, 0.2, 0.3, 0.4]), "v1")
+    scorer.close()
+    logged = read_prediction_logs(tmp_path)
+    assert len(logged) == 4
+    assert (logged["model_version"] == "v1:logistic_regression").all()
+    np.testing.assert_allclose(logged["score"], challenger.predict_proba(X)[:, 1])
+    assert logged["champion_score"].tolist() == [0.1, 0.2, 0.3, 0.4]
+
+
+def test_full_queue_drops(tmp_path):
+    gate = threading.Event()
+
+    class Stalled:
+        def predict_proba(self, X):
+            gate.wait()
+            return np.zeros((len(X), 2))
+
+    scorer = ShadowScorer({"stalled": Stalled()}, PredictionLogSink(log_dir=tmp_path), max_queue=2)
+    X, features = np.zeros((1, 3)), pd.DataFrame({"age": [30]})
+    accepted = [scorer.submit(X, features, np.array([0.5])) for _ in range(6)]
+    assert sum(accepted) <= 3
+    assert scorer.stats["dropped"] == 6 - sum(accepted)
+    gate.set()
+    scorer.close()
+
+
+def test_close_returns_when_queue_stays_full(tmp_path):
+    gate = threading.Event()
+
+    class Stalled:
+        def predict_proba(self, X):
+            gate.wait()
+            return np.zeros((len(X), 2))
+
+    scorer = ShadowScorer({"stalled": Stalled()}, PredictionLogSink(log_dir=tmp_path), max_queue=1)
+    X, features = np.zeros((1, 3)), pd.DataFrame({"age": [30]})
+    while scorer.submit(X, features, np.array([0.5])):
+        pass
+    t0 = time.monotonic()
+    scorer.close(timeout=0.2)
+    assert time.monotonic() - t0 < 5
+    gate.set()
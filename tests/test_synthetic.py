@@ -0,0 +1,57 @@
+"""Test synthetic generator: schema, determinism, marginals, dependencies and drift."""
+import numpy as np
+import pandas as pd
+
+from src.pipelines.ingest import EXPECTED_COLUMNS
+from src.pipelines.synthetic import default_spec, fit_spec, iter_chunks, write_dataset
+
+
+def _generate(n_rows, chunk_rows=20_000, seed=0, drift=None, spec=None):
+    return pd.concat(
+        list(iter_chunks(spec or default_spec(), n_rows, chunk_rows, seed, drift)),
+        ignore_index=True,
+    )
+
+
+def test_bundled_spec_schema_marginals_and_dependencies():
+    df = _generate(40_000)
+    assert list(df.columns) == EXPECTED_COLUMNS
+    assert abs((df["y"] == "yes").mean() - 0.117) < 0.01
+    assert abs(df["age"].median() - 39) <= 1
+    long_calls = df["duration"] > df["duration"].median()
+    assert (df.loc[long_calls, "y"] == "yes").mean() > 2 * (
+        df.loc[~long_calls, "y"] == "yes"
+    ).mean()
+
+
+def test_deterministic_and_chunks_regenerate(tmp_path):
+    a = _generate(30_000, seed=7)
+    pd.testing.assert_frame_equal(a, _generate(30_000, seed=7))
+    assert not a.equals(_generate(30_000, seed=8))
+    path = write_dataset(default_spec(), 30_000, tmp_path / "out.csv", chunk_rows=20_000, seed=7)
+    back = pd.read_csv(path, sep=";")
+    assert len(back) == 30_000
+    np.testing.assert_array_equal(back["balance"], a["balance"])
+
+
+def test_drift_only_after_start():
+    drift = {
+        "start_fraction": 0.5,
+        "ramp_fraction": 0.0,
+        "columns": {"age": {"shift": 1.0}, "job": {"weights": {"student": 5.0}}},
+    }
+    base, drifted = _generate(40_000), _generate(40_000, drift=drift)
+    pd.testing.assert_frame_equal(base.iloc[:20_000], drifted.iloc[:20_000])
+    assert drifted["age"].iloc[20_000:].mean() > base["age"].iloc[20_000:].mean() + 5
+    assert (drifted["job"].iloc[20_000:] == "student").mean() > 3 * (
+        base["job"] == "student"
+    ).mean()
+
+
+def test_fit_spec_round_trip():
+    source = _generate(20_000)
+    spec = fit_spec(source)
+    refit = _generate(20_000, spec=spec, seed=1)
+    assert abs((refit["y"] == "yes").mean() - (source["y"] == "yes").mean()) < 0.01
+    assert abs(refit["balance"].median() - source["balance"].median()) < 50
+    assert any({a, b} == {"duration", "y"} and rho > 0.1 for a, b, rho in spec["correlations"])